@@ -0,0 +1 @@
+# algorithms包初始化文件 
\ No newline at end of file
@@ -0,0 +1,184 @@
+# 微区作物分配优化
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+from algorithms.recommendation import (
+    CropCatalog, environmental_scores, estimated_yield, get_crop_catalog, group_best
+)
+from utils.constants import PLANTING_SEASONS, ZONE_CONFIG
+
+# 收益矩阵分块计算的微区行数, 控制 (微区, 品种, 维度) 临时矩阵的内存
+ALLOCATION_CHUNK = 4096
+
+# 面积比较的容差(亩)
+AREA_EPS = 1e-9
+
+
+def zone_profit_matrix(catalog: CropCatalog, zone_conditions: np.ndarray, zone_areas: np.ndarray,
+                       season: str, crops: Optional[Sequence[str]] = None,
+                       chunk_size: int = ALLOCATION_CHUNK) -> Dict:
+    """计算 (n_zones, n_crops) 的微区-作物期望收益矩阵
+
+    每个微区对每种作物取期望收益最高的品种; 期望收益(元) = 面积 ×
+    (预期产量 × 价格 - 成本), 预期产量随该微区的环境适应性变化。
+    """
+    rows = np.arange(len(catalog))
+    if crops is not None:
+        rows = np.flatnonzero(np.isin(catalog.crops, list(crops)))
+    subset = catalog.take(rows)
+    _, groups = np.unique(subset.crop_codes, return_inverse=True)
+    first = np.unique(groups, return_index=True)[1]
+    crop_names = catalog.crops[subset.source_index[first]]
+
+    n_zones = zone_conditions.shape[0]
+    n_crops = len(crop_names)
+    profit = np.empty((n_zones, n_crops))
+    variety = np.empty((n_zones, n_crops), dtype=np.intp)
+    suitability = np.empty((n_zones, n_crops))
+    for start in range(0, n_zones, chunk_size):
+        stop = min(start + chunk_size, n_zones)
+        env = environmental_scores(subset, zone_conditions[start:stop], season)
+        margin = estimated_yield(subset, env) * subset.price - subset.cost
+        best, best_index = group_best(margin, groups)
+        profit[start:stop] = best * zone_areas[start:stop, None]
+        variety[start:stop] = subset.source_index[best_index]
+        suitability[start:stop] = np.take_along_axis(env, best_index, axis=1)
+    return {"crops": crop_names, "profit": profit, "variety": variety, "suitability": suitability}
+
+
+def _accept_within_capacity(targets: np.ndarray, areas: np.ndarray, remaining: np.ndarray) -> np.ndarray:
+    """按顺序接受迁入各目标作物的微区, 每个目标累计面积不超过剩余容量"""
+    order = np.argsort(targets, kind="stable")
+    sorted_targets = targets[order]
+    cumulative = np.cumsum(areas[order])
+    starts = np.flatnonzero(np.r_[True, sorted_targets[1:] != sorted_targets[:-1]])
+    base = np.repeat(cumulative[starts] - areas[order][starts], np.diff(np.r_[starts, len(order)]))
+    accepted = np.empty(len(order), dtype=bool)
+    accepted[order] = cumulative - base <= remaining[sorted_targets] + AREA_EPS
+    return accepted
+
+
+def repair_area_caps(profit: np.ndarray, areas: np.ndarray, assignment: np.ndarray,
+                     capacity: np.ndarray) -> np.ndarray:
+    """面积约束修复: 超出容量的作物把损失最小的微区迁往仍有余量的作物
+
+    每轮对每个超限作物计算其微区改种最优可用作物的收益损失(regret),
+    按损失升序迁出恰好覆盖超出面积的微区, 并保证迁入方不超限。
+    """
+    n_crops = profit.shape[1]
+    for _ in range(len(areas)):
+        used = np.bincount(assignment, weights=areas, minlength=n_crops)
+        excess = used - capacity
+        over = np.flatnonzero(excess > AREA_EPS)
+        remaining = np.maximum(capacity - used, 0.0)
+        if len(over) == 0 or not (remaining > AREA_EPS).any():
+            break
+        moved = False
+        for crop in over:
+            members = np.flatnonzero(assignment == crop)
+            member_areas = areas[members]
+            alternatives = np.where(remaining > AREA_EPS, profit[members], -np.inf)
+            targets = alternatives.argmax(axis=1)
+            regret = profit[members, crop] - alternatives[np.arange(len(members)), targets]
+            fits = member_areas <= remaining[targets] + AREA_EPS
+            order = np.argsort(np.where(fits, regret, np.inf), kind="stable")[:fits.sum()]
+            # 按损失升序取恰好覆盖超出面积的微区
+            n_move = np.searchsorted(np.cumsum(member_areas[order]), excess[crop] - AREA_EPS) + 1
+            order = order[:n_move]
+            if len(order) == 0:
+                continue
+            accepted = _accept_within_capacity(targets[order], member_areas[order], remaining)
+            if accepted.any():
+                chosen = order[accepted]
+                assignment[members[chosen]] = targets[chosen]
+                remaining -= np.bincount(targets[chosen], weights=member_areas[chosen], minlength=n_crops)
+                moved = True
+        if not moved:
+            break
+    return assignment
+
+
+def repair_diversity(profit: np.ndarray, areas: np.ndarray, assignment: np.ndarray,
+                     min_crops: int, capacity: np.ndarray) -> np.ndarray:
+    """多样性约束修复: 作物种类不足时, 每次以最小收益损失把一个微区改种未使用的作物
+
+    只从种植微区数大于1的作物中调出, 保证已有作物种类不减少。
+    """
+    n_zones, n_crops = profit.shape
+    zones = np.arange(n_zones)
+    while True:
+        counts = np.bincount(assignment, minlength=n_crops)
+        unused = np.flatnonzero(counts == 0)
+        if n_crops - len(unused) >= min_crops or len(unused) == 0:
+            break
+        donors = counts[assignment] > 1
+        fits = areas[:, None] <= capacity[unused] + AREA_EPS
+        loss = profit[zones, assignment][:, None] - profit[:, unused]
+        loss = np.where(donors[:, None] & fits, loss, np.inf)
+        zone, column = np.unravel_index(np.argmin(loss), loss.shape)
+        if not np.isfinite(loss[zone, column]):
+            break
+        assignment[zone] = unused[column]
+    return assignment
+
+
+def allocate_crops(profit: np.ndarray, areas: np.ndarray, min_crops: int = 1,
+                   max_share: float = ZONE_CONFIG["max_crop_share"]) -> np.ndarray:
+    """在收益矩阵上求解微区作物分配, 返回每个微区的作物列下标
+
+    先逐微区取收益最高的作物(无约束最优), 再依次修复面积上限与作物种类下限。
+    全部步骤为矩阵运算, 修复轮数与作物数相关而与微区数无关。
+    """
+    n_zones, n_crops = profit.shape
+    areas = np.asarray(areas, dtype=float)
+    total_area = areas.sum()
+    # 容量必须足以容纳全部面积: 单作物上限至少为 1/作物数
+    share = max(max_share, 1.0 / max(n_crops, 1))
+    capacity = np.full(n_crops, share * total_area)
+
+    assignment = profit.argmax(axis=1)
+    assignment = repair_area_caps(profit, areas, assignment, capacity)
+    return repair_diversity(profit, areas, assignment, min(min_crops, n_crops, n_zones), capacity)
+
+
+def allocate_zones(zone_conditions, zone_areas=None, crops: Optional[Sequence[str]] = None,
+                   season: str = PLANTING_SEASONS[0], crop_diversity: int = 1,
+                   max_crop_share: float = ZONE_CONFIG["max_crop_share"],
+                   catalog: Optional[CropCatalog] = None) -> Dict:
+    """微区作物分配: 在多样性与面积约束下最大化地块期望总收益
+
+    zone_conditions 为 (n_zones, n_features) 的微区传感器读数矩阵, zone_areas
+    缺省时每个微区取 ZONE_CONFIG["default_zone_size"]。返回每个微区的作物、
+    品种、适应性、预期产量与收益, 以及约束前后的总收益。
+    """
+    catalog = get_crop_catalog() if catalog is None else catalog
+    conditions = np.atleast_2d(np.asarray(zone_conditions, dtype=float))
+    n_zones = conditions.shape[0]
+    if zone_areas is None:
+        zone_areas = np.full(n_zones, float(ZONE_CONFIG["default_zone_size"]))
+    areas = np.broadcast_to(np.asarray(zone_areas, dtype=float), (n_zones,))
+
+    matrix = zone_profit_matrix(catalog, conditions, areas, season, crops)
+    profit = matrix["profit"]
+    assignment = allocate_crops(profit, areas, crop_diversity, max_crop_share)
+
+    zones = np.arange(n_zones)
+    variety = matrix["variety"][zones, assignment]
+    suitability = matrix["suitability"][zones, assignment]
+    zone_yield = estimated_yield(catalog.take(variety), suitability)
+    zone_profit = profit[zones, assignment]
+    return {
+        "assignment": assignment,
+        "crop": matrix["crops"][assignment],
+        "variety": catalog.names[variety],
+        "variety_index": variety,
+        "suitability": suitability,
+        "yield": zone_yield,
+        "cost": catalog.cost[variety],
+        "revenue": zone_yield * catalog.price[variety],
+        "profit": zone_profit,
+        "crops": matrix["crops"],
+        "crop_area": np.bincount(assignment, weights=areas, minlength=len(matrix["crops"])),
+        "total_profit": float(zone_profit.sum()),
+        "unconstrained_profit": float(profit.max(axis=1).sum())
+    }
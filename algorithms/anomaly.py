@@ -0,0 +1,235 @@
+# 传感器数据流式异常检测(尖峰 / 卡死 / 漂移)
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from utils.constants import ANOMALY_CONFIG, SENSOR_CONFIG
+
+# 指标顺序, 与 SENSOR_CONFIG["data_ranges"] 保持一致
+METRIC_NAMES = tuple(SENSOR_CONFIG["data_ranges"].keys())
+METRIC_SPAN = np.array([SENSOR_CONFIG["data_ranges"][m]["max"] - SENSOR_CONFIG["data_ranges"][m]["min"]
+                        for m in METRIC_NAMES], dtype=np.float32)
+
+# 异常类型(位标志)
+SPIKE = 1
+FLATLINE = 2
+DRIFT = 4
+ANOMALY_NAMES = {SPIKE: "尖峰", FLATLINE: "数据卡死", DRIFT: "漂移"}
+
+# 传感器状态
+STATUS_NORMAL = "正常"
+STATUS_WARNING = "警告"
+STATUS_ABNORMAL = "异常"
+STATUS_OFFLINE = "离线"
+
+# 正态分布下平均绝对偏差换算为标准差的系数 sqrt(pi/2)
+MAD_TO_SIGMA = 1.2533
+
+# 告警记录(环形缓冲区)
+ALERT_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("sensor", "<u4"),
+    ("metric", "u1"),
+    ("kind", "u1"),
+    ("value", "<f4"),
+    ("score", "<f4"),
+])
+
+
+class StreamingAnomalyDetector:
+    """逐条读数在线更新的异常检测器
+
+    每个 (传感器, 指标) 单元格只保存少量 float32/整数状态, 按行(传感器) × 列(指标)
+    存放在紧凑数组中, 每条读数的更新是常数时间, 一批读数整体向量化处理:
+    - 尖峰: 快速 EWMA 均值与 EW 平均绝对偏差给出稳健 z 分数, 超过 spike_z 即告警;
+      均值与尺度更新时偏差按 huber 倍尺度截断, 单个尖峰不会拖动基线
+    - 卡死: 连续 flatline_readings 条读数几乎不变
+    - 漂移: 快速均值偏离慢速基线, 偏离量超过快速均值自身波动(标准误)的 drift_z 倍
+    单元格出现保持期(alert_hold 秒)内未出现过的异常类型时写入告警缓冲区,
+    异常状态在最后一次触发后保持 alert_hold 秒。
+    """
+
+    def __init__(self, capacity: int = 1024, config: Optional[Dict] = None):
+        self.config = {**ANOMALY_CONFIG, **(config or {})}
+        self._lock = threading.Lock()
+        self._rows: Dict[int, int] = {}
+        self._codes = np.zeros(capacity, dtype=np.uint32)
+        n_metrics = len(METRIC_NAMES)
+        self._floor = METRIC_SPAN * np.float32(self.config["scale_floor"])
+        self._flat_tolerance = METRIC_SPAN * np.float32(self.config["flatline_tolerance"])
+        self._state = {
+            "mean": np.zeros((capacity, n_metrics), dtype=np.float32),
+            "mad": np.zeros((capacity, n_metrics), dtype=np.float32),
+            "slow": np.zeros((capacity, n_metrics), dtype=np.float32),
+            "last": np.zeros((capacity, n_metrics), dtype=np.float32),
+            "count": np.zeros((capacity, n_metrics), dtype=np.uint32),
+            "flat_run": np.zeros((capacity, n_metrics), dtype=np.uint16),
+            "flags": np.zeros((capacity, n_metrics), dtype=np.uint8),
+            "flag_time": np.full((capacity, n_metrics), -np.inf),
+            "seen": np.full(capacity, -np.inf),
+        }
+        self._alerts = np.zeros(self.config["alert_capacity"], dtype=ALERT_DTYPE)
+        self._alert_count = 0
+        self.readings = 0
+
+    def _row_indices(self, codes: np.ndarray) -> np.ndarray:
+        """传感器编码映射为行号, 新传感器自动分配行并按需扩容"""
+        unique, inverse = np.unique(codes, return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.intp)
+        for i, code in enumerate(unique.tolist()):
+            row = self._rows.get(code)
+            if row is None:
+                row = self._rows[code] = len(self._rows)
+            rows[i] = row
+        capacity = len(self._codes)
+        if len(self._rows) > capacity:
+            grow = max(len(self._rows), 2 * capacity) - capacity
+            self._codes = np.concatenate([self._codes, np.zeros(grow, dtype=np.uint32)])
+            for name, array in self._state.items():
+                fill = -np.inf if name in ("flag_time", "seen") else 0
+                pad = np.full((grow,) + array.shape[1:], fill, dtype=array.dtype)
+                self._state[name] = np.concatenate([array, pad])
+        self._codes[rows] = unique
+        return rows[inverse]
+
+    def update(self, readings: np.ndarray) -> int:
+        """并入一批已校验的读数(READING_DTYPE), 返回新产生的告警数"""
+        if len(readings) == 0:
+            return 0
+        with self._lock:
+            rows = self._row_indices(readings["sensor"])
+            metric = readings["metric"].astype(np.intp)
+            # 同一单元格在一批内出现多次时按时间先后分轮处理, 每轮内单元格不重复
+            cell = rows * len(METRIC_NAMES) + metric
+            order = np.lexsort((readings["timestamp"], cell))
+            cell_sorted = cell[order]
+            starts = np.flatnonzero(np.r_[True, cell_sorted[1:] != cell_sorted[:-1]])
+            rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+            new_alerts = 0
+            for r in range(int(rank.max()) + 1):
+                batch = order[rank == r]
+                new_alerts += self._update_cells(rows[batch], metric[batch], readings["value"][batch],
+                                                 readings["timestamp"][batch])
+            self.readings += len(readings)
+            return new_alerts
+
+    def _update_cells(self, rows, metric, x, timestamp) -> int:
+        """更新一组互不重复的单元格(调用方持锁)"""
+        cfg = self.config
+        s = self._state
+        alpha = np.float32(cfg["alpha"])
+        gamma = np.float32(cfg["scale_alpha"])
+        beta = np.float32(cfg["drift_alpha"])
+        huber = np.float32(cfg["huber"])
+        x = x.astype(np.float32)
+
+        mean = s["mean"][rows, metric]
+        mad = s["mad"][rows, metric]
+        slow = s["slow"][rows, metric]
+        count = s["count"][rows, metric]
+        floor = self._floor[metric]
+        first = count == 0
+        warm = count >= cfg["warmup"]
+        # 读数不足时以 1/n 为步长(即算术平均), 避免初值偏差
+        n = count.astype(np.float32)
+        a_step = np.maximum(alpha, 1 / (n + 1))
+        g_step = np.maximum(gamma, 1 / np.maximum(n, 1))
+        b_step = np.maximum(beta, 1 / (n + 1))
+
+        # 尖峰: 稳健 z 分数
+        dev = x - mean
+        scale = np.maximum(MAD_TO_SIGMA * mad, floor)
+        z = np.where(first, 0, dev / scale)
+        spike = warm & (np.abs(z) > cfg["spike_z"])
+        # 预热后按 huber 截断偏差再更新, 尖峰对基线与尺度的影响有界
+        limit = np.where(warm, huber * scale, np.inf)
+        mean = mean + a_step * np.clip(dev, -limit, limit)
+        mad = np.where(first, 0, mad + g_step * (np.minimum(np.abs(dev), limit) - mad))
+
+        # 漂移: 快速均值相对慢速基线的偏离, 以快速均值的标准误 sigma*sqrt(alpha/(2-alpha)) 为单位
+        slow = slow + b_step * (x - slow)
+        drift_score = (mean - slow) / (scale * np.sqrt(alpha / (2 - alpha)))
+        drift = (count >= cfg["drift_warmup"]) & (np.abs(drift_score) > cfg["drift_z"])
+
+        # 卡死: 连续多条读数变化不超过容差
+        same = ~first & (np.abs(x - s["last"][rows, metric]) <= self._flat_tolerance[metric])
+        flat_run = np.where(same, np.minimum(s["flat_run"][rows, metric].astype(np.int64) + 1, 65535), 0)
+        flatline = flat_run >= cfg["flatline_readings"]
+
+        # 告警保持期内已出现过的异常类型不重复告警, 避免阈值附近反复触发
+        flags = (spike * SPIKE) | (flatline * FLATLINE) | (drift * DRIFT)
+        flag_time = s["flag_time"][rows, metric]
+        held = np.where(timestamp - flag_time <= cfg["alert_hold"], s["flags"][rows, metric], 0)
+        raised = flags & ~held
+
+        s["mean"][rows, metric] = mean
+        s["mad"][rows, metric] = mad
+        s["slow"][rows, metric] = slow
+        s["last"][rows, metric] = x
+        s["count"][rows, metric] = count + 1
+        s["flat_run"][rows, metric] = flat_run
+        s["flags"][rows, metric] = flags | held
+        s["flag_time"][rows, metric] = np.where(flags > 0, timestamp, flag_time)
+        np.maximum.at(s["seen"], rows, timestamp)
+
+        hits = np.flatnonzero(raised)
+        if len(hits):
+            kind = np.where(raised[hits] & SPIKE, SPIKE, np.where(raised[hits] & FLATLINE, FLATLINE, DRIFT))
+            score = np.where(kind == SPIKE, z[hits], np.where(kind == DRIFT, drift_score[hits], flat_run[hits]))
+            self._record_alerts(timestamp[hits], self._codes[rows[hits]], metric[hits], kind, x[hits], score)
+        return len(hits)
+
+    def _record_alerts(self, timestamp, sensor, metric, kind, value, score):
+        """写入告警环形缓冲区(调用方持锁)"""
+        capacity = len(self._alerts)
+        positions = (self._alert_count + np.arange(len(timestamp))) % capacity
+        records = self._alerts[positions]
+        records["timestamp"] = timestamp
+        records["sensor"] = sensor
+        records["metric"] = metric
+        records["kind"] = kind
+        records["value"] = value
+        records["score"] = score
+        self._alerts[positions] = records
+        self._alert_count += len(timestamp)
+
+    def status(self, codes: Sequence[int], now: Optional[float] = None) -> np.ndarray:
+        """批量查询传感器状态: 保持期内有尖峰为异常, 有卡死或漂移为警告, 长时间无数据为离线"""
+        now = time.time() if now is None else now
+        codes = np.asarray(codes, dtype=np.int64)
+        result = np.full(len(codes), STATUS_OFFLINE, dtype=object)
+        with self._lock:
+            rows = np.array([self._rows.get(int(code), -1) for code in codes], dtype=np.intp)
+            known = rows >= 0
+            rows = rows[known]
+            seen = self._state["seen"][rows]
+            recent = self._state["flag_time"][rows] >= now - self.config["alert_hold"]
+            flags = np.bitwise_or.reduce(np.where(recent, self._state["flags"][rows], 0), axis=1)
+        status = np.where(flags & SPIKE, STATUS_ABNORMAL,
+                          np.where(flags > 0, STATUS_WARNING, STATUS_NORMAL)).astype(object)
+        status[seen < now - self.config["offline_after"]] = STATUS_OFFLINE
+        result[known] = status
+        return result
+
+    def alerts(self, codes: Optional[Sequence[int]] = None, limit: int = 20) -> List[Dict]:
+        """最近的告警(新的在前), 可按传感器编码过滤"""
+        with self._lock:
+            capacity = len(self._alerts)
+            count = min(self._alert_count, capacity)
+            positions = (self._alert_count - 1 - np.arange(count)) % capacity
+            records = self._alerts[positions]
+        if codes is not None:
+            records = records[np.isin(records["sensor"], np.asarray(codes, dtype=np.uint32))]
+        records = records[:limit]
+        return [
+            {"timestamp": float(t), "sensor": int(sensor), "metric": METRIC_NAMES[m],
+             "kind": ANOMALY_NAMES[int(kind)], "value": float(value), "score": float(score)}
+            for t, sensor, m, kind, value, score in zip(
+                records["timestamp"], records["sensor"], records["metric"],
+                records["kind"], records["value"], records["score"])
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"sensors": len(self._rows), "readings": self.readings, "alerts": self._alert_count}
@@ -0,0 +1,76 @@
+# 相邻两次航拍植被指数的变化检测(逐块比较, 分微区汇总, 稀疏变化掩膜)
+import numpy as np
+from typing import Dict, Tuple
+
+from utils.constants import CHANGE_CONFIG
+
+
+def tile_changes(previous: np.ndarray, current: np.ndarray,
+                 threshold: float = CHANGE_CONFIG["threshold"]) -> Tuple[np.ndarray, np.ndarray]:
+    """同一瓦片两次航拍的指数差 (current - previous) 与显著变化掩膜 |差值| >= threshold
+
+    任一次无数据的像元差值为 NaN, 不计为变化。
+    """
+    delta = np.asarray(current, dtype=np.float32) - np.asarray(previous, dtype=np.float32)
+    changed = np.abs(np.nan_to_num(delta, nan=0.0)) >= threshold
+    return delta, changed
+
+
+class ChangeSummary:
+    """变化检测结果的累加器: 分块累加、合并
+
+    按微区统计显著增长/退化的像元数与指数差之和, 并以稀疏形式(全图行列号与差值)
+    保存显著变化的像元, 未比较的瓦片视为没有变化。
+    """
+
+    def __init__(self, n_zones: int):
+        self.n_zones = n_zones
+        self.gain = np.zeros(n_zones, dtype=np.int64)
+        self.loss = np.zeros(n_zones, dtype=np.int64)
+        self.delta_sum = np.zeros(n_zones)
+        self._rows, self._cols, self._delta = [], [], []
+
+    def add(self, labels: np.ndarray, delta: np.ndarray, changed: np.ndarray, row0: int = 0, col0: int = 0):
+        """累加一个瓦片(有效部分), row0/col0 为瓦片左上角在全图中的行列号"""
+        inside = (labels >= 0) & (labels < self.n_zones) & ~np.isnan(delta)
+        zone = labels[inside].astype(np.intp)
+        self.delta_sum += np.bincount(zone, weights=delta[inside], minlength=self.n_zones)
+        self.gain += np.bincount(zone, weights=(changed & (delta > 0))[inside], minlength=self.n_zones).astype(np.int64)
+        self.loss += np.bincount(zone, weights=(changed & (delta < 0))[inside], minlength=self.n_zones).astype(np.int64)
+        rows, cols = np.nonzero(changed)
+        self._rows.append((rows + row0).astype(np.int32))
+        self._cols.append((cols + col0).astype(np.int32))
+        self._delta.append(delta[rows, cols].astype(np.float32))
+        return self
+
+    def merge(self, other: "ChangeSummary") -> "ChangeSummary":
+        self.gain += other.gain
+        self.loss += other.loss
+        self.delta_sum += other.delta_sum
+        self._rows.extend(other._rows)
+        self._cols.extend(other._cols)
+        self._delta.extend(other._delta)
+        return self
+
+    def mask(self) -> Dict[str, np.ndarray]:
+        """稀疏变化掩膜: 显著变化像元的 rows/cols(按行优先排序)与 delta"""
+        rows = np.concatenate(self._rows) if self._rows else np.empty(0, dtype=np.int32)
+        cols = np.concatenate(self._cols) if self._cols else np.empty(0, dtype=np.int32)
+        delta = np.concatenate(self._delta) if self._delta else np.empty(0, dtype=np.float32)
+        order = np.lexsort((cols, rows))
+        return {"rows": rows[order], "cols": cols[order], "delta": delta[order]}
+
+
+def bin_changes(rows: np.ndarray, cols: np.ndarray, delta: np.ndarray,
+                shape: Tuple[int, int], factor: int) -> np.ndarray:
+    """稀疏变化按 factor × factor 像元汇总为平均指数差栅格(未变化像元按 0 计)
+
+    返回形状 (ceil(高 / factor), ceil(宽 / factor)), 行由北向南。
+    """
+    grid = (-(-shape[0] // factor), -(-shape[1] // factor))
+    cell = (rows // factor) * grid[1] + cols // factor
+    total = np.bincount(cell, weights=delta, minlength=grid[0] * grid[1]).reshape(grid)
+    # 边缘单元不足 factor × factor 像元, 按实际像元数求平均
+    height = np.minimum(factor, shape[0] - np.arange(grid[0]) * factor)
+    width = np.minimum(factor, shape[1] - np.arange(grid[1]) * factor)
+    return total / np.outer(height, width)
@@ -0,0 +1,103 @@
+# 作物适宜条件可行性筛选
+import numpy as np
+
+# 可行性判定的放宽倍数: 读数超出适宜区间不足 FEASIBILITY_MARGIN 个容差时仍保留,
+# 超出该距离的品种环境得分已低于 e^-4(约2%), 不再进入评分阶段
+FEASIBILITY_MARGIN = 2.0
+
+
+class ConditionIntervalIndex:
+    """作物适宜条件区间索引
+
+    对温度、湿度、pH、盐碱度每个维度, 分别按区间下界和上界预排序。
+    查询时每个维度用两次二分查找得到"下界<=读数"的前缀与"上界>=读数"的后缀,
+    再对各维度的候选集合求交, 只返回读数落在(放宽后)全部区间内的品种。
+    求交采用计数方式: 每个前缀/后缀内的品种计数加一, 计数等于集合个数即属于交集,
+    避免 intersect1d 的重复排序。
+    """
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, tolerance: np.ndarray,
+                 feature_index: np.ndarray, margin: float = FEASIBILITY_MARGIN):
+        self.size = lower.shape[0]
+        self.feature_index = np.asarray(feature_index, dtype=np.intp)
+        slack = margin * np.asarray(tolerance, dtype=float)
+        # 放宽后的区间 (n_varieties, n_dims), 供逐行批量判定使用
+        self._low = np.asarray(lower, dtype=float) - slack
+        self._high = np.asarray(upper, dtype=float) + slack
+        self._lower_order = []
+        self._lower_sorted = []
+        self._upper_order = []
+        self._upper_sorted = []
+        for dim in range(lower.shape[1]):
+            low = lower[:, dim] - slack[dim]
+            high = upper[:, dim] + slack[dim]
+            lower_order = np.argsort(low, kind="stable")
+            upper_order = np.argsort(high, kind="stable")
+            self._lower_order.append(lower_order)
+            self._lower_sorted.append(low[lower_order])
+            self._upper_order.append(upper_order)
+            self._upper_sorted.append(high[upper_order])
+
+    @classmethod
+    def from_catalog(cls, catalog, margin: float = FEASIBILITY_MARGIN) -> "ConditionIntervalIndex":
+        """由品种特征矩阵构建索引"""
+        return cls(catalog.lower, catalog.upper, catalog.tolerance, catalog.condition_index, margin)
+
+    def query(self, sensor: np.ndarray) -> np.ndarray:
+        """返回适宜区间容纳当前读数的品种下标(升序), 缺失读数的维度不参与筛选"""
+        sensor = np.asarray(sensor, dtype=float)
+        hits = np.zeros(self.size, dtype=np.uint8)
+        n_sets = 0
+        for dim, feature in enumerate(self.feature_index):
+            value = sensor[feature]
+            if np.isnan(value):
+                continue
+            # 下界 <= value 的品种是按下界排序后的前缀
+            n_low = np.searchsorted(self._lower_sorted[dim], value, side="right")
+            # 上界 >= value 的品种是按上界排序后的后缀
+            n_high = np.searchsorted(self._upper_sorted[dim], value, side="left")
+            if n_low == 0 or n_high == self.size:
+                return np.empty(0, dtype=np.intp)
+            hits[self._lower_order[dim][:n_low]] += 1
+            hits[self._upper_order[dim][n_high:]] += 1
+            n_sets += 2
+        if n_sets == 0:
+            return np.arange(self.size)
+        return np.flatnonzero(hits == n_sets)
+
+    def query_rows(self, conditions: np.ndarray) -> np.ndarray:
+        """批量判定: conditions 为 (n_rows, n_features), 返回 (n_rows, n_varieties) 可行掩膜
+
+        判定规则与 query() 相同(区间两端均包含, 缺失读数的维度不参与筛选)。
+        """
+        conditions = np.atleast_2d(np.asarray(conditions, dtype=float))
+        mask = np.ones((conditions.shape[0], self.size), dtype=bool)
+        for dim, feature in enumerate(self.feature_index):
+            value = conditions[:, feature, None]
+            inside = (self._low[:, dim] <= value) & (value <= self._high[:, dim])
+            mask &= inside | np.isnan(value)
+        return mask
+
+
+def get_interval_index(catalog) -> ConditionIntervalIndex:
+    """获取品种特征矩阵对应的区间索引(随特征矩阵一起缓存)"""
+    index = getattr(catalog, "_interval_index", None)
+    if index is None:
+        index = ConditionIntervalIndex.from_catalog(catalog)
+        catalog._interval_index = index
+    return index
+
+
+def feasible_indices(catalog, sensor: np.ndarray) -> np.ndarray:
+    """筛选可行品种; 没有任何品种可行时退回全部品种, 保证仍能给出排序结果"""
+    candidates = get_interval_index(catalog).query(sensor)
+    if len(candidates) == 0:
+        return np.arange(len(catalog))
+    return candidates
+
+
+def feasible_mask(catalog, conditions: np.ndarray) -> np.ndarray:
+    """逐行筛选可行品种的掩膜 (n_rows, n_varieties); 某行没有任何品种可行时该行退回全部品种"""
+    mask = get_interval_index(catalog).query_rows(conditions)
+    mask[~mask.any(axis=1)] = True
+    return mask
@@ -0,0 +1,178 @@
+# 传感器点数据的空间插值(反距离加权 / 普通克里金), 生成连续场栅格
+import time
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from algorithms.spatial_index import GridIndex, project
+from utils.cache import TTLLRUCache
+from utils.constants import INTERPOLATION_CONFIG
+
+METHODS = ("idw", "kriging")
+METHOD_NAMES = {"idw": "反距离加权", "kriging": "普通克里金"}
+
+# 与传感器重合的判定距离(米), 重合时直接取该传感器读数
+EXACT_DISTANCE = 1e-3
+# 拟合变差函数时参与两两配对的最多传感器数
+MAX_VARIOGRAM_POINTS = 1000
+# 变差函数变程的候选数
+RANGE_CANDIDATES = 24
+
+
+def raster_grid(south: float, west: float, north: float, east: float, resolution: float) -> Dict:
+    """覆盖经纬度矩形的规则栅格, 返回各行/列单元中心的纬度与经度(行由南向北)"""
+    corners = project([south, north], [west, east], (south, west))
+    width, height = np.abs(corners[1] - corners[0])
+    rows = max(int(np.ceil(height / resolution)), 1)
+    cols = max(int(np.ceil(width / resolution)), 1)
+    return {
+        "lat": south + (np.arange(rows) + 0.5) * (north - south) / rows,
+        "lon": west + (np.arange(cols) + 0.5) * (east - west) / cols,
+    }
+
+
+def idw(index: GridIndex, values: np.ndarray, lat, lon, k: int, power: float) -> np.ndarray:
+    """反距离加权: 每个查询点取 k 个最近传感器, 权重为 1 / 距离^power"""
+    neighbors, distance = index.nearest(lat, lon, k)
+    v = values[neighbors]
+    weight = 1 / np.maximum(distance, EXACT_DISTANCE) ** power
+    estimate = (weight * v).sum(axis=1) / weight.sum(axis=1)
+    exact = distance[:, 0] < EXACT_DISTANCE
+    estimate[exact] = v[exact, 0]
+    return estimate
+
+
+def exponential_variogram(h: np.ndarray, nugget: float, sill: float, range_: float) -> np.ndarray:
+    """指数变差函数, range_ 为有效变程(达到 95% 基台值的距离); h = 0 时为 0"""
+    gamma = nugget + (sill - nugget) * (1 - np.exp(-3 * h / range_))
+    return np.where(h > 0, gamma, 0.0)
+
+
+def fit_variogram(points: np.ndarray, values: np.ndarray,
+                  bins: int = INTERPOLATION_CONFIG["variogram_bins"]) -> Optional[Tuple[float, float, float]]:
+    """由经验半变异函数拟合指数模型 (块金值, 基台值, 变程), 数据不足时返回 None
+
+    距离取到最大间距的一半并等宽分箱; 对每个候选变程按配对数加权最小二乘求块金值与
+    偏基台值(均非负), 取残差最小者。
+    """
+    if len(values) > MAX_VARIOGRAM_POINTS:
+        keep = np.random.default_rng(0).choice(len(values), MAX_VARIOGRAM_POINTS, replace=False)
+        points, values = points[keep], values[keep]
+    i, j = np.triu_indices(len(values), k=1)
+    h = np.hypot(*(points[i] - points[j]).T)
+    semivariance = 0.5 * (values[i] - values[j]) ** 2
+    if len(h) < bins or h.max() <= 0 or semivariance.max() <= 0:
+        return None
+    edges = np.linspace(0, h.max() / 2, bins + 1)
+    which = np.digitize(h, edges) - 1
+    used = (which >= 0) & (which < bins)
+    count = np.bincount(which[used], minlength=bins)
+    lag = np.bincount(which[used], weights=h[used], minlength=bins)
+    gamma = np.bincount(which[used], weights=semivariance[used], minlength=bins)
+    has = count > 0
+    lag, gamma, count = lag[has] / count[has], gamma[has] / count[has], count[has]
+    if len(lag) < 2:
+        return None
+
+    weight = np.sqrt(count)
+    best = None
+    for range_ in np.geomspace(lag[0], 2 * edges[-1], RANGE_CANDIDATES):
+        basis = np.column_stack([np.ones(len(lag)), 1 - np.exp(-3 * lag / range_)])
+        coef = np.maximum(np.linalg.lstsq(basis * weight[:, None], gamma * weight, rcond=None)[0], 0)
+        residual = float(np.sum(count * (basis @ coef - gamma) ** 2))
+        if best is None or residual < best[0]:
+            best = (residual, float(coef[0]), float(coef[0] + coef[1]), float(range_))
+    _, nugget, sill, range_ = best
+    return (nugget, sill, range_) if sill > 0 else None
+
+
+def ordinary_kriging(index: GridIndex, values: np.ndarray, lat, lon, k: int,
+                     variogram: Tuple[float, float, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """局部普通克里金: 每个查询点以 k 个最近传感器建立克里金方程组, 全部方程组批量求解
+
+    返回 (估计值, 克里金方差)。
+    """
+    neighbors, distance = index.nearest(lat, lon, k)
+    k = neighbors.shape[1]
+    points = index.points[neighbors]
+    pairwise = np.hypot(*(points[:, :, None, :] - points[:, None, :, :]).transpose(3, 0, 1, 2))
+
+    system = np.ones((len(neighbors), k + 1, k + 1))
+    system[:, :k, :k] = exponential_variogram(pairwise, *variogram)
+    system[:, k, k] = 0.0
+    # 传感器重合时方程组奇异, 对角线加极小的扰动
+    system[:, np.arange(k), np.arange(k)] -= 1e-9 * variogram[1]
+    rhs = np.ones((len(neighbors), k + 1))
+    rhs[:, :k] = exponential_variogram(distance, *variogram)
+    solution = np.linalg.solve(system, rhs[..., None])[..., 0]
+
+    estimate = (solution[:, :k] * values[neighbors]).sum(axis=1)
+    variance = np.maximum((solution * rhs).sum(axis=1), 0.0)
+    return estimate, variance
+
+
+def interpolate_field(lat, lon, values, bounds: Tuple[float, float, float, float],
+                      resolution: Optional[float] = None, method: str = "idw",
+                      k: Optional[int] = None) -> Dict:
+    """将传感器点读数插值为覆盖 bounds=(南, 西, 北, 东) 的场栅格
+
+    缺失读数(NaN)的传感器不参与插值; 克里金所需的变差函数无法拟合时(传感器过少
+    或读数无差异)退回反距离加权。返回 lat/lon 轴、z 栅格(行由南向北)、实际使用的
+    方法, 克里金时另含方差栅格 variance。
+    """
+    cfg = INTERPOLATION_CONFIG
+    if method not in METHODS:
+        raise ValueError(f"未知插值方法: {method}")
+    resolution = cfg["resolution"] if resolution is None else resolution
+    k = cfg["neighbors"] if k is None else k
+    lat, lon, values = (np.asarray(v, dtype=float) for v in (lat, lon, values))
+    valid = ~np.isnan(values)
+    grid = raster_grid(*bounds, resolution)
+    shape = (len(grid["lat"]), len(grid["lon"]))
+    result = {"lat": grid["lat"], "lon": grid["lon"], "method": method, "variance": None,
+              "sensors": int(valid.sum())}
+    if not valid.any():
+        result["z"] = np.full(shape, np.nan)
+        return result
+
+    index = GridIndex(lat[valid], lon[valid])
+    values = values[valid]
+    query_lat = np.repeat(grid["lat"], shape[1])
+    query_lon = np.tile(grid["lon"], shape[0])
+    variogram = fit_variogram(index.points, values) if method == "kriging" else None
+    if variogram is None:
+        result["method"] = "idw"
+        result["z"] = idw(index, values, query_lat, query_lon, k, cfg["idw_power"]).reshape(shape)
+    else:
+        estimate, variance = ordinary_kriging(index, values, query_lat, query_lon, k, variogram)
+        result["z"] = estimate.reshape(shape)
+        result["variance"] = variance.reshape(shape)
+    return result
+
+
+_field_cache = TTLLRUCache(maxsize=INTERPOLATION_CONFIG["cache_maxsize"], ttl=INTERPOLATION_CONFIG["cache_ttl"])
+
+
+def cached_interpolate_field(plot_id: str, metric: str, lat, lon, values,
+                             bounds: Tuple[float, float, float, float], timestamp: Optional[float] = None,
+                             resolution: Optional[float] = None, method: str = "idw") -> Dict:
+    """带缓存的场栅格插值: 以 (地块, 指标, 时间桶, 方法, 分辨率) 为键
+
+    同一时间桶内重复查看同一地块指标时直接复用栅格; values 可以是返回读数的函数,
+    只在未命中时调用。
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    bucket = int(timestamp // INTERPOLATION_CONFIG["time_bucket"])
+    resolution = INTERPOLATION_CONFIG["resolution"] if resolution is None else resolution
+    key = (plot_id, metric, bucket, method, float(resolution))
+    return _field_cache.get_or_compute(
+        key, lambda: interpolate_field(lat, lon, values() if callable(values) else values, bounds,
+                                       resolution=resolution, method=method))
+
+
+def interpolation_cache_stats() -> Dict:
+    """场栅格缓存的命中/未命中等统计"""
+    return _field_cache.stats()
+
+
+def clear_interpolation_cache():
+    _field_cache.clear()
@@ -0,0 +1,212 @@
+# 航拍影像病虫害识别: 切分图块、提取光谱/纹理特征、多项逻辑回归分类、按微区汇总
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from utils.constants import PEST_CONFIG, RASTER_CONFIG
+
+# 识别类别, 下标即类别编号, 0 为健康
+PEST_CLASSES = ("健康", "玉米螟", "蚜虫", "叶斑病")
+HEALTHY = 0
+
+# 各类症状(严重度为 1 时)对冠层反射率的影响: 各波段的乘数(波段顺序与 RASTER_CONFIG["bands"]
+# 一致)与像元间斑点噪声的强度
+PEST_SIGNATURES = {
+    1: (np.array([1.05, 1.00, 1.20, 0.85, 0.70]), 0.30),  # 玉米螟: 叶片蛀孔, 冠层残缺
+    2: (np.array([1.00, 1.15, 1.25, 0.95, 0.85]), 0.05),  # 蚜虫: 叶片黄化
+    3: (np.array([1.15, 0.90, 1.40, 0.85, 0.80]), 0.15),  # 叶斑病: 褐色病斑
+}
+
+_BANDS = RASTER_CONFIG["bands"]
+_NIR, _RED, _GREEN, _EDGE = (_BANDS.index(b) for b in ("nir", "red", "green", "red_edge"))
+# 避免除零与对数发散的下限
+_EPS = 1e-6
+
+
+def apply_symptoms(reflectance: np.ndarray, pest: np.ndarray, severity: np.ndarray,
+                   rng: np.random.Generator) -> np.ndarray:
+    """按像元的病虫害类别与严重度(0-1)修改反射率 (波段, 行, 列), 用于生成模拟影像"""
+    multiplier = np.ones_like(reflectance)
+    speckle = np.zeros(severity.shape)
+    for label, (bands, noise) in PEST_SIGNATURES.items():
+        hit = np.where(pest == label, severity, 0)
+        multiplier += hit[None] * (bands[:, None, None] - 1)
+        speckle += hit * noise
+    return reflectance * multiplier * np.maximum(1 + speckle * rng.standard_normal(severity.shape), 0.05)[None]
+
+
+def extract_patches(stack: np.ndarray, size: int = PEST_CONFIG["patch_size"]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """将 (波段, 行, 列) 影像切分为 size × size 的图块, 不足一个图块的末行/列舍弃
+
+    返回 patches (n, 波段, size, size)(连续数组)与各图块左上角的行、列号, 按行优先排列。
+    """
+    n_bands, rows, cols = stack.shape
+    grid_rows, grid_cols = rows // size, cols // size
+    patches = (stack[:, :grid_rows * size, :grid_cols * size]
+               .reshape(n_bands, grid_rows, size, grid_cols, size)
+               .transpose(1, 3, 0, 2, 4)
+               .reshape(grid_rows * grid_cols, n_bands, size, size))
+    row, col = np.divmod(np.arange(grid_rows * grid_cols), grid_cols)
+    return np.ascontiguousarray(patches), row * size, col * size
+
+
+def patch_features(patches: np.ndarray) -> np.ndarray:
+    """图块的特征向量 (n, 特征数) float32
+
+    包括归一化光谱形状(各波段均值 / 总亮度)、各波段变异系数的对数(纹理)、NDVI 的均值与
+    标准差、GNDVI 与 NDRE 的均值以及总亮度的对数, 一批图块整体向量化计算。
+    """
+    p = np.asarray(patches, dtype=np.float32)
+    mean = p.mean(axis=(2, 3))
+    brightness = mean.sum(axis=1, keepdims=True)
+    texture = np.log(p.std(axis=(2, 3)) / (mean + _EPS) + 1e-3)
+
+    def difference(a, b):
+        return (p[:, a] - p[:, b]) / (p[:, a] + p[:, b] + _EPS)
+
+    ndvi = difference(_NIR, _RED)
+    return np.column_stack([
+        mean / (brightness + _EPS),
+        texture,
+        ndvi.mean(axis=(1, 2)),
+        ndvi.std(axis=(1, 2)),
+        difference(_NIR, _GREEN).mean(axis=(1, 2)),
+        difference(_NIR, _EDGE).mean(axis=(1, 2)),
+        np.log(brightness + _EPS),
+    ]).astype(np.float32)
+
+
+def synthesize_patches(n_per_class: int, soil: np.ndarray, canopy: np.ndarray,
+                       size: int = PEST_CONFIG["patch_size"], seed: int = 0,
+                       noise: float = 0.04) -> Tuple[np.ndarray, np.ndarray]:
+    """合成带标签的训练图块: 覆盖度随机(块内有缓变梯度)的裸土/冠层混合光谱,
+    受害图块按随机严重度叠加症状, 最后加入与模拟航拍相同的乘性噪声
+
+    返回 patches (n, 波段, size, size) 与类别编号 labels (n,)。
+    """
+    rng = np.random.default_rng(seed)
+    n = n_per_class * len(PEST_CLASSES)
+    labels = np.repeat(np.arange(len(PEST_CLASSES)), n_per_class)
+    ramp = np.linspace(-0.5, 0.5, size)
+    slope = rng.uniform(-0.3, 0.3, (n, 2))
+    # 受害图块只取冠层较密处(稀疏冠层上的症状与健康图块难以区分)
+    level = np.where(labels == HEALTHY, rng.uniform(0.05, 1.0, n), rng.uniform(0.3, 1.0, n))
+    cover = np.clip(level[:, None, None] + slope[:, 0, None, None] * ramp[:, None]
+                    + slope[:, 1, None, None] * ramp[None, :], 0, 1)
+    severity = np.where(labels == HEALTHY, 0, rng.uniform(0.4, 1.0, n))[:, None, None] * cover
+    patches = np.empty((n, len(soil), size, size))
+    for i in range(n):
+        reflectance = soil[:, None, None] + cover[i][None] * (canopy - soil)[:, None, None]
+        reflectance = apply_symptoms(reflectance, np.full((size, size), labels[i]), severity[i], rng)
+        patches[i] = reflectance * (1 + rng.normal(0, noise, reflectance.shape))
+    return patches, labels
+
+
+class SoftmaxClassifier:
+    """多项逻辑回归(softmax)分类器
+
+    特征先按训练集的均值/标准差标准化, 以带 L2 正则的全批量梯度下降训练。推理只是一次
+    矩阵乘法与 softmax, 适合一次处理成千上万个图块。
+    """
+
+    def __init__(self, n_features: int, n_classes: int = len(PEST_CLASSES)):
+        self.weights = np.zeros((n_features, n_classes), dtype=np.float32)
+        self.bias = np.zeros(n_classes, dtype=np.float32)
+        self.center = np.zeros(n_features, dtype=np.float32)
+        self.scale = np.ones(n_features, dtype=np.float32)
+
+    def fit(self, features: np.ndarray, labels: np.ndarray, epochs: int = PEST_CONFIG["epochs"],
+            learning_rate: float = PEST_CONFIG["learning_rate"], l2: float = PEST_CONFIG["l2"]) -> "SoftmaxClassifier":
+        features = np.asarray(features, dtype=np.float64)
+        self.center = features.mean(axis=0).astype(np.float32)
+        self.scale = np.maximum(features.std(axis=0), _EPS).astype(np.float32)
+        x = (features - self.center) / self.scale
+        target = np.eye(self.weights.shape[1])[labels]
+        weights, bias = np.zeros(self.weights.shape), np.zeros(self.bias.shape)
+        for _ in range(epochs):
+            error = (self._softmax(x @ weights + bias) - target) / len(x)
+            weights -= learning_rate * (x.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        self.weights, self.bias = weights.astype(np.float32), bias.astype(np.float32)
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """各图块属于各类别的概率 (n, 类别数)"""
+        return self._softmax(((features - self.center) / self.scale) @ self.weights + self.bias)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.predict_proba(features).argmax(axis=1)
+
+
+class PestAccumulator:
+    """图块识别结果的累加器: 分批累加、合并, 最后给出各微区的病虫害概率
+
+    按微区累加图块数、各类别概率之和、判为各类别的图块数及其最大概率之和, 均由
+    np.bincount 完成。标签为负(不在任何微区内)的图块只计入全地块的类别计数。
+    """
+
+    def __init__(self, n_zones: int, n_classes: int = len(PEST_CLASSES)):
+        self.n_zones = n_zones
+        self.n_classes = n_classes
+        self.patches = np.zeros(n_zones, dtype=np.int64)
+        self.probability = np.zeros((n_zones, n_classes))
+        self.votes = np.zeros((n_zones, n_classes), dtype=np.int64)
+        self.confidence = np.zeros((n_zones, n_classes))
+        self.classes = np.zeros(n_classes, dtype=np.int64)
+
+    def add(self, zones: np.ndarray, proba: np.ndarray) -> "PestAccumulator":
+        """累加一批图块, zones 为各图块所在微区 (n,), proba 为分类概率 (n, 类别数)"""
+        predicted = proba.argmax(axis=1)
+        self.classes += np.bincount(predicted, minlength=self.n_classes)
+        inside = (zones >= 0) & (zones < self.n_zones)
+        zone, proba, predicted = zones[inside].astype(np.intp), proba[inside], predicted[inside]
+        size = self.n_zones * self.n_classes
+        self.patches += np.bincount(zone, minlength=self.n_zones)
+        for c in range(self.n_classes):
+            self.probability[:, c] += np.bincount(zone, weights=proba[:, c], minlength=self.n_zones)
+        cell = zone * self.n_classes + predicted
+        self.votes += np.bincount(cell, minlength=size).reshape(self.n_zones, self.n_classes)
+        self.confidence += np.bincount(cell, weights=proba.max(axis=1), minlength=size).reshape(self.votes.shape)
+        return self
+
+    def merge(self, other: "PestAccumulator") -> "PestAccumulator":
+        self.patches += other.patches
+        self.probability += other.probability
+        self.votes += other.votes
+        self.confidence += other.confidence
+        self.classes += other.classes
+        return self
+
+    def result(self) -> Dict[str, np.ndarray]:
+        """各微区的 patches(图块数)、probability(平均类别概率)、share(判为各类别的图块占比)、
+        confidence(判为该类别的图块的平均最大概率, 无此类图块为 NaN) 与全地块的 classes 计数"""
+        n = np.maximum(self.patches, 1)[:, None]
+        has = self.votes > 0
+        return {
+            "patches": self.patches.copy(),
+            "probability": self.probability / n,
+            "share": self.votes / n,
+            "confidence": np.where(has, self.confidence / np.maximum(self.votes, 1), np.nan),
+            "classes": self.classes.copy(),
+        }
+
+
+def classify_patches(model: SoftmaxClassifier, stack: np.ndarray, zone_labels: Optional[np.ndarray],
+                     n_zones: int, size: int = PEST_CONFIG["patch_size"]) -> PestAccumulator:
+    """对一块影像 (波段, 行, 列) 切片并整批分类, 图块所在微区取其中心像元的标签
+
+    含无数据像元(反射率为 0)的图块不参与识别。
+    """
+    patches, row, col = extract_patches(stack, size)
+    valid = (patches > 0).all(axis=(1, 2, 3))
+    accumulator = PestAccumulator(n_zones, model.weights.shape[1])
+    if not valid.any():
+        return accumulator
+    zones = (zone_labels[row + size // 2, col + size // 2] if zone_labels is not None
+             else np.full(len(row), -1, dtype=np.int32))
+    return accumulator.add(zones[valid], model.predict_proba(patch_features(patches[valid])))
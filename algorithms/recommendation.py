@@ -0,0 +1,620 @@
+# 作物推荐算法
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional
+
+from algorithms.feasibility import feasible_indices, feasible_mask
+from algorithms.risk_simulation import risk_metrics
+from utils.cache import TTLLRUCache
+from utils.constants import (
+    ALGORITHM_WEIGHTS, CROP_CATEGORIES, CROP_PROFILES, CROPS_DATABASE,
+    PLANTING_SEASONS, RISK_PREFERENCES, SENSOR_CONFIG, YIELD_PREFERENCES
+)
+
+# 传感器特征顺序, 与 SENSOR_CONFIG["data_ranges"] 保持一致
+FEATURE_NAMES = tuple(SENSOR_CONFIG["data_ranges"].keys())
+
+# 适宜条件维度: (optimal_conditions 键, 对应传感器特征, 容差)
+# 读数超出适宜区间一个容差时, 该维度得分衰减到 e^-1
+CONDITION_DIMENSIONS = (
+    ("temperature", "temperature", 5.0),
+    ("humidity", "humidity", 15.0),
+    ("ph", "ph_value", 0.8),
+    ("salinity", "salinity", 0.3),
+)
+
+# 评分维度, 顺序与 ALGORITHM_WEIGHTS 一致
+SCORE_DIMENSIONS = tuple(ALGORITHM_WEIGHTS.keys())
+
+# 各评分维度依赖的推荐输入, 输入变化时只需重算受影响的维度
+SCORE_DEPENDENCIES = {
+    "environmental": ("sensor", "season"),
+    "profit": ("budget", "expected_yield"),
+    "risk": ("risk_preference",),
+    "technical": ("budget",),
+    "market": ("target_use",),
+}
+
+# 依赖传感器读数、需按可行品种子集计算的维度
+SENSOR_DIMENSIONS = tuple(dim for dim, inputs in SCORE_DEPENDENCIES.items() if "sensor" in inputs)
+
+# 非适宜季节的环境得分折减系数
+OFF_SEASON_FACTOR = 0.3
+
+# 非目标用途作物的市场得分折减系数
+OFF_TARGET_FACTOR = 0.6
+
+# 环境适应性为0时的产量比例, 预期产量在该比例与基准产量之间随适应性线性变化
+YIELD_FLOOR = 0.6
+
+# 预算滑块范围(元/亩), 用于技术难度的预算补偿
+BUDGET_RANGE = (500, 5000)
+
+# 推荐配置量化步长: 落在同一步长内的配置视为相同, 共享缓存结果
+QUANTIZATION_STEPS = {
+    "temperature": 0.5,
+    "humidity": 1.0,
+    "ph_value": 0.1,
+    "salinity": 0.05,
+    "nitrogen": 5.0,
+    "phosphorus": 5.0,
+    "potassium": 10.0,
+}
+BUDGET_STEP = 100
+
+# 推荐结果缓存容量与有效期(秒)
+CACHE_MAXSIZE = 1024
+CACHE_TTL = 900
+
+# 缺少农艺参数时使用的默认值
+DEFAULT_PROFILE = {
+    "emoji": "🌱", "description": "",
+    "optimal_conditions": {},
+    "yield": 400, "price": 3.0, "cost": 800, "yield_cv": 0.20, "price_cv": 0.15,
+    "difficulty": 0.50, "market": 0.60, "nitrogen_demand": 50, "legume": False,
+    "seasons": list(PLANTING_SEASONS[:2])
+}
+
+
+class CropCatalog:
+    """作物品种特征矩阵
+
+    每个品种占一行, 环境适宜区间、经济参数等按列存放为 NumPy 数组,
+    以便对全部品种一次性向量化评分。
+    """
+
+    # 按品种逐行对齐的数值列, take() 取子集时需要同步切片;
+    # 名称等文本列不切片, 子集通过 source_index 访问完整品种库中的文本
+    ROW_ARRAYS = ("source_index", "crop_codes", "category_codes", "lower", "upper",
+                  "yield_base", "price", "cost", "yield_cv", "price_cv", "difficulty",
+                  "market", "nitrogen_demand", "legume", "season_mask")
+
+    def __init__(self, entries: List[Dict]):
+        def labels(getter):
+            # 文本属性存为 object 数组, 取子集时与数值列一样走 NumPy 花式索引
+            values = np.empty(len(entries), dtype=object)
+            values[:] = [getter(e) for e in entries]
+            return values
+
+        self.names = labels(lambda e: e["name"])
+        self.crops = labels(lambda e: e["crop"])
+        self.varieties = labels(lambda e: e["variety"])
+        self.categories = labels(lambda e: e["category"])
+        self.emojis = labels(lambda e: e["profile"]["emoji"])
+        self.descriptions = labels(lambda e: e["profile"]["description"])
+        # 在完整品种库中的下标, 子集中保持不变
+        self.source_index = np.arange(len(entries))
+        # 作物编码, 用于推荐结果按作物去重
+        _, self.crop_codes = np.unique(self.crops.astype(str), return_inverse=True)
+        self.category_names = list(dict.fromkeys(self.categories))
+        self.category_codes = np.array(
+            [self.category_names.index(category) for category in self.categories], dtype=np.intp
+        )
+
+        self.condition_index = np.array(
+            [FEATURE_NAMES.index(feature) for _, feature, _ in CONDITION_DIMENSIONS], dtype=np.intp
+        )
+        self.tolerance = np.array([tol for _, _, tol in CONDITION_DIMENSIONS])
+        self.lower = np.array(
+            [[e["conditions"].get(key, {}).get("min", -np.inf) for key, _, _ in CONDITION_DIMENSIONS]
+             for e in entries], dtype=float
+        ).reshape(len(entries), len(CONDITION_DIMENSIONS))
+        self.upper = np.array(
+            [[e["conditions"].get(key, {}).get("max", np.inf) for key, _, _ in CONDITION_DIMENSIONS]
+             for e in entries], dtype=float
+        ).reshape(len(entries), len(CONDITION_DIMENSIONS))
+
+        def column(field):
+            return np.array([e["profile"][field] for e in entries], dtype=float)
+
+        self.yield_base = column("yield")
+        self.price = column("price")
+        self.cost = column("cost")
+        self.yield_cv = column("yield_cv")
+        self.price_cv = column("price_cv")
+        self.difficulty = column("difficulty")
+        self.market = column("market")
+        self.nitrogen_demand = column("nitrogen_demand")
+        self.legume = column("legume").astype(bool)
+        self.season_mask = np.array(
+            [[season in e["profile"]["seasons"] for season in PLANTING_SEASONS] for e in entries],
+            dtype=bool
+        ).reshape(len(entries), len(PLANTING_SEASONS))
+
+        # 收益归一化基准按整个品种库计算, 使不同候选子集的得分可比
+        margin = self.yield_base * self.price - self.cost
+        self.profit_reference = {
+            mode: max(float(_profit_value(self, mode, margin).max(initial=0.0)), 1e-9)
+            for mode in YIELD_PREFERENCES
+        }
+        # 子集与完整品种库共享 root 及其蒙特卡洛风险指标缓存
+        self.root = self
+        self.risk_cache = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def take(self, indices) -> "CropCatalog":
+        """按下标取品种子集, 归一化基准等全局属性与原品种库共享"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if len(indices) == len(self) and np.array_equal(indices, np.arange(len(self))):
+            return self
+        subset = object.__new__(CropCatalog)
+        subset.__dict__.update(self.__dict__)
+        subset.__dict__.pop("_interval_index", None)
+        for name in self.ROW_ARRAYS:
+            setattr(subset, name, getattr(self, name).take(indices, axis=0))
+        return subset
+
+
+def _profit_value(catalog: CropCatalog, mode: str, margin: np.ndarray) -> np.ndarray:
+    """按期望产量模式计算收益原始值"""
+    if mode == "稳产优先":
+        return margin * (1 - catalog.yield_cv)
+    if mode == "成本优先":
+        return margin / catalog.cost
+    return margin
+
+
+def build_crop_catalog(crop_categories: Optional[Dict] = None,
+                       crops_database: Optional[Dict] = None,
+                       profiles: Optional[Dict] = None) -> CropCatalog:
+    """由 CROP_CATEGORIES 与 CROPS_DATABASE 构建品种特征矩阵"""
+    crop_categories = CROP_CATEGORIES if crop_categories is None else crop_categories
+    crops_database = CROPS_DATABASE if crops_database is None else crops_database
+    profiles = CROP_PROFILES if profiles is None else profiles
+
+    entries = []
+    seen = set()
+    crop_category = {}
+
+    def append(crop, variety, category):
+        name = f"{crop} {variety}".strip()
+        if name in seen:
+            return
+        seen.add(name)
+        profile = {**DEFAULT_PROFILE, **profiles.get(crop, {})}
+        conditions = dict(profile.get("optimal_conditions", {}))
+        conditions.update(crops_database.get(crop, {}).get("optimal_conditions", {}))
+        entries.append({
+            "name": name, "crop": crop, "variety": variety, "category": category,
+            "profile": profile, "conditions": conditions
+        })
+
+    for category, items in crop_categories.items():
+        for item in items:
+            crop, _, variety = item.partition(" ")
+            crop_category.setdefault(crop, category)
+            append(crop, variety.strip(), category)
+
+    for crop, info in crops_database.items():
+        for variety in info.get("varieties", []):
+            append(crop, variety, crop_category.get(crop, "其他"))
+
+    return CropCatalog(entries)
+
+
+def catalog_fingerprint() -> str:
+    """作物库、农艺参数与算法权重的内容指纹, 任一配置被修改时指纹随之变化
+
+    覆盖 CROPS_DATABASE、CROP_CATEGORIES、CROP_PROFILES(价格、产量、成本等收益输入)
+    与 ALGORITHM_WEIGHTS, 每次请求都会计算(约零点几毫秒)。
+    """
+    payload = repr([CROPS_DATABASE, CROP_CATEGORIES, CROP_PROFILES, ALGORITHM_WEIGHTS])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+_catalog = None
+_catalog_fingerprint = None
+
+
+def get_crop_catalog() -> CropCatalog:
+    """获取进程内共享的品种特征矩阵, 作物库变化时自动重建"""
+    global _catalog, _catalog_fingerprint
+    fingerprint = catalog_fingerprint()
+    if _catalog is None or fingerprint != _catalog_fingerprint:
+        _catalog = build_crop_catalog()
+        _catalog_fingerprint = fingerprint
+    return _catalog
+
+
+def sensor_vector(readings: Dict) -> np.ndarray:
+    """将传感器读数字典转换为特征向量, 缺失项记为 NaN(不参与惩罚)"""
+    return np.array([readings.get(name, np.nan) for name in FEATURE_NAMES], dtype=float)
+
+
+def environmental_scores(catalog: CropCatalog, sensor: np.ndarray, season: str) -> np.ndarray:
+    """环境适应性得分, sensor 形状为 (..., n_features), 返回 (..., n_varieties)"""
+    x = np.asarray(sensor, dtype=float)[..., catalog.condition_index][..., None, :]
+    # fmax 忽略 NaN, 缺失读数的距离视为0
+    distance = np.fmax(np.fmax(catalog.lower - x, x - catalog.upper), 0.0)
+    penalty = np.square(distance / catalog.tolerance).sum(axis=-1)
+    scores = np.exp(-penalty)
+
+    nitrogen = np.asarray(sensor, dtype=float)[..., FEATURE_NAMES.index("nitrogen")][..., None]
+    fertility = np.nan_to_num(np.clip(nitrogen / catalog.nitrogen_demand, 0.0, 1.0), nan=1.0)
+    scores *= 0.7 + 0.3 * fertility
+
+    if season in PLANTING_SEASONS:
+        in_season = catalog.season_mask[:, PLANTING_SEASONS.index(season)]
+        scores *= np.where(in_season, 1.0, OFF_SEASON_FACTOR)
+    return scores
+
+
+def profit_scores(catalog: CropCatalog, budget: float, expected_yield: str) -> np.ndarray:
+    """经济效益得分: 按期望产量模式对数归一化的收益, 并对预算不足的作物折减"""
+    margin = catalog.yield_base * catalog.price - catalog.cost
+    reference = catalog.profit_reference.get(expected_yield, catalog.profit_reference[YIELD_PREFERENCES[0]])
+    value = np.log1p(np.maximum(_profit_value(catalog, expected_yield, margin), 0.0)) / np.log1p(reference)
+    affordability = np.clip(budget / catalog.cost, 0.0, 1.0) ** 2
+    return value * affordability
+
+
+def risk_scores(catalog: CropCatalog, risk_preference: str) -> np.ndarray:
+    """风险评估得分: 由蒙特卡洛模拟的尾部收益缺口(CVaR)折算, 置信水平随风险偏好变化"""
+    return risk_metrics(catalog, risk_preference)["score"]
+
+
+def technical_scores(catalog: CropCatalog, budget: float) -> np.ndarray:
+    """技术难度得分: 预算越充足, 越有条件购买技术服务弥补难度"""
+    low, high = BUDGET_RANGE
+    budget_share = np.clip((budget - low) / (high - low), 0.0, 1.0)
+    return 1 - catalog.difficulty * (1 - 0.3 * budget_share)
+
+
+def market_scores(catalog: CropCatalog, target_use: str) -> np.ndarray:
+    """市场前景得分: 与种植目标一致的作物保留全部市场分"""
+    target = catalog.category_names.index(target_use) if target_use in catalog.category_names else -1
+    matches = catalog.category_codes == target
+    return catalog.market * np.where(matches, 1.0, OFF_TARGET_FACTOR)
+
+
+# 各评分维度的计算函数, 参数为 (catalog, config, sensor)
+SCORE_FUNCTIONS = {
+    "environmental": lambda catalog, config, sensor: environmental_scores(catalog, sensor, config["season"]),
+    "profit": lambda catalog, config, sensor: profit_scores(catalog, config["budget"], config["expected_yield"]),
+    "risk": lambda catalog, config, sensor: risk_scores(catalog, config["risk_preference"]),
+    "technical": lambda catalog, config, sensor: technical_scores(catalog, config["budget"]),
+    "market": lambda catalog, config, sensor: market_scores(catalog, config["target_use"]),
+}
+
+
+def weighted_total(scores: Dict[str, np.ndarray]) -> np.ndarray:
+    """按 ALGORITHM_WEIGHTS 加权求和得到总分"""
+    return sum(ALGORITHM_WEIGHTS[dim] * scores[dim] for dim in SCORE_DIMENSIONS)
+
+
+def score_crops(catalog: CropCatalog, config: Dict, sensor: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """一次向量化计算全部品种的五维得分与加权总分
+
+    sensor 缺省时取 config["sensor"]; 传入 (n_plots, n_features) 矩阵时
+    环境得分与总分形状为 (n_plots, n_varieties), 其余维度与地块无关按行广播。
+    """
+    sensor = sensor_vector(config["sensor"]) if sensor is None else sensor
+    scores = {dim: SCORE_FUNCTIONS[dim](catalog, config, sensor) for dim in SCORE_DIMENSIONS}
+    scores["total"] = weighted_total(scores)
+    return scores
+
+
+def top_k_indices(total: np.ndarray, k: int, groups: Optional[np.ndarray] = None) -> np.ndarray:
+    """按总分降序取前k个品种下标, 指定 groups 时每组只保留得分最高的一个"""
+    if groups is not None:
+        order = np.argsort(-total, kind="stable")
+        _, first = np.unique(groups[order], return_index=True)
+        return order[np.sort(first)][:k]
+    k = min(k, total.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(-total, k - 1)[:k]
+    return candidates[np.argsort(-total[candidates], kind="stable")]
+
+
+def group_best(total: np.ndarray, groups: np.ndarray):
+    """按组(作物)取每行得分最高的品种
+
+    total 形状为 (n_rows, n_varieties), 返回每组最高分 (n_rows, n_groups)
+    及对应品种下标 (n_rows, n_groups), 全部以 reduceat 广播完成。
+    """
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+
+    ordered = total[:, order]
+    best = np.maximum.reduceat(ordered, starts, axis=1)
+    # 每组内第一个取得最高分的列
+    is_best = ordered == np.repeat(best, counts, axis=1)
+    columns = np.where(is_best, np.arange(len(order)), len(order))
+    best_index = order[np.minimum.reduceat(columns, starts, axis=1)]
+    return best, best_index
+
+
+def rank_rows(total: np.ndarray, k: int, groups: Optional[np.ndarray] = None):
+    """对 (n_rows, n_varieties) 总分矩阵逐行取前k, 返回品种下标与得分(均为 (n_rows, k))
+
+    指定 groups 时每组(作物)只保留得分最高的品种。
+    """
+    if groups is not None:
+        candidate_scores, candidate_index = group_best(total, groups)
+    else:
+        candidate_scores = total
+        candidate_index = np.broadcast_to(np.arange(total.shape[1]), total.shape)
+
+    k = min(k, candidate_scores.shape[1])
+    top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(candidate_scores, top, axis=1)
+    rank = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, rank, axis=1)
+    return np.take_along_axis(candidate_index, top, axis=1), np.take_along_axis(top_scores, rank, axis=1)
+
+
+def recommend_batch(plot_conditions, config: Dict, top_k: int = 3,
+                    catalog: Optional[CropCatalog] = None, unique_crops: bool = True,
+                    chunk_size: int = 4096) -> Dict[str, np.ndarray]:
+    """批量推荐: 对 (n_plots, n_features) 的地块条件矩阵一次性计算前k个推荐
+
+    plot_conditions 的列顺序与 FEATURE_NAMES 一致(可为 DataFrame, 按列名对齐),
+    config 中除传感器读数外的推荐参数对所有地块共用。返回:
+    - indices: (n_plots, k) 品种下标, 对应 catalog.names
+    - scores: (n_plots, k) 加权总分(0-1)
+    - suitability: (n_plots, k) 环境适应性得分(0-1)
+    与 recommend_crops 一样只在区间索引判定可行的品种中排序; 某地块可行的作物
+    不足k种时, 多出的名次下标为 -1、得分为 NaN。
+    为控制内存, 大批量按 chunk_size 行分块, 块内全部为广播矩阵运算。
+    """
+    catalog = get_crop_catalog() if catalog is None else catalog
+    if hasattr(plot_conditions, "reindex"):
+        plot_conditions = plot_conditions.reindex(columns=list(FEATURE_NAMES)).to_numpy(dtype=float)
+    conditions = np.atleast_2d(np.asarray(plot_conditions, dtype=float))
+
+    n_plots = conditions.shape[0]
+    n_groups = len(np.unique(catalog.crop_codes)) if unique_crops else len(catalog)
+    k = min(top_k, n_groups)
+    indices = np.empty((n_plots, k), dtype=np.intp)
+    totals = np.empty((n_plots, k))
+    suitability = np.empty((n_plots, k))
+
+    for start in range(0, n_plots, chunk_size):
+        stop = min(start + chunk_size, n_plots)
+        scores = score_crops(catalog, config, sensor=conditions[start:stop])
+        feasible = feasible_mask(catalog, conditions[start:stop])
+        total = np.where(feasible, scores["total"], -np.inf)
+        chosen, top = rank_rows(total, k, catalog.crop_codes if unique_crops else None)
+        missing = np.isneginf(top)
+        indices[start:stop] = np.where(missing, -1, chosen)
+        totals[start:stop] = np.where(missing, np.nan, top)
+        suitability[start:stop] = np.where(missing, np.nan, np.take_along_axis(scores["environmental"], chosen, axis=1))
+
+    return {"indices": indices, "scores": totals, "suitability": suitability}
+
+
+def estimated_yield(catalog: CropCatalog, environmental: np.ndarray) -> np.ndarray:
+    """由环境适应性得分估算预期产量(kg/亩), 形状与 environmental 相同"""
+    return catalog.yield_base * (YIELD_FLOOR + (1 - YIELD_FLOOR) * environmental)
+
+
+def format_recommendations(catalog: CropCatalog, scores: Dict[str, np.ndarray], indices,
+                           risk_preference: str = RISK_PREFERENCES[1]) -> List[Dict]:
+    """将评分结果整理为推荐卡片数据, 风险指标取自对应风险偏好的蒙特卡洛模拟"""
+    results = []
+    risk = risk_metrics(catalog, risk_preference)
+    yields = estimated_yield(catalog, scores["environmental"])
+    for i in indices:
+        row = catalog.source_index[i]
+        environmental = float(scores["environmental"][i])
+        expected_yield = yields[i]
+        results.append({
+            "name": catalog.crops[row],
+            "variety": catalog.varieties[row] or catalog.crops[row],
+            "category": catalog.categories[row],
+            "emoji": catalog.emojis[row],
+            "suitability": int(round(environmental * 100)),
+            "profit": int(round(float(scores["profit"][i]) * 100)),
+            "risk": int(round(float(risk["risk_index"][i]) * 100)),
+            "confidence": int(round(risk["confidence"] * 100)),
+            "var": f"{risk['var'][i]:.0f}元/亩",
+            "cvar": f"{risk['cvar'][i]:.0f}元/亩",
+            "loss_probability": round(float(risk["loss_probability"][i]) * 100, 1),
+            "score": round(float(scores["total"][i]) * 100, 1),
+            "yield": f"{expected_yield:.0f}kg/亩",
+            "revenue": f"{expected_yield * catalog.price[i]:.0f}元/亩",
+            "description": catalog.descriptions[row]
+        })
+    return results
+
+
+def recommend_crops(config: Dict, top_k: int = 3, catalog: Optional[CropCatalog] = None) -> List[Dict]:
+    """根据推荐配置与传感器读数生成前k个推荐作物(每种作物取最优品种)
+
+    先用区间索引筛出适宜条件容纳当前读数的品种, 只对该子集评分。
+    """
+    catalog = get_crop_catalog() if catalog is None else catalog
+    sensor = sensor_vector(config["sensor"])
+    candidates = catalog.take(feasible_indices(catalog, sensor))
+    scores = score_crops(candidates, config, sensor=sensor)
+    indices = top_k_indices(scores["total"], top_k, groups=candidates.crop_codes)
+    return format_recommendations(candidates, scores, indices, config["risk_preference"])
+
+
+def quantize_config(config: Dict) -> Dict:
+    """将推荐配置量化为规范形式, 传感器读数与预算按步长取整"""
+    sensor = {}
+    for name in FEATURE_NAMES:
+        value = config["sensor"].get(name)
+        if value is None or value != value:
+            continue
+        step = QUANTIZATION_STEPS.get(name, 1.0)
+        sensor[name] = round(round(float(value) / step) * step, 6)
+    return {
+        "season": config["season"],
+        "target_use": config["target_use"],
+        "risk_preference": config["risk_preference"],
+        "budget": int(round(config["budget"] / BUDGET_STEP) * BUDGET_STEP),
+        "expected_yield": config["expected_yield"],
+        "sensor": sensor
+    }
+
+
+def config_key(config: Dict) -> tuple:
+    """由量化后的配置生成可哈希的规范缓存键"""
+    canonical = quantize_config(config)
+    return (
+        canonical["season"], canonical["target_use"], canonical["risk_preference"],
+        canonical["budget"], canonical["expected_yield"],
+        tuple(sorted(canonical["sensor"].items()))
+    )
+
+
+class IncrementalScorer:
+    """增量评分器
+
+    保存上一次的量化输入与各维度得分, 新配置到来时按 SCORE_DEPENDENCIES
+    只重算输入发生变化的维度, 其余维度直接复用。例如拖动预算滑块只重算
+    经济效益与技术难度两个维度。每个会话持有一个实例。
+
+    依赖传感器读数的维度只对区间索引筛出的可行品种计算; 其余维度与读数无关,
+    对整个品种库计算一次后按可行子集取值, 可行子集变化时无需重算。
+    """
+
+    def __init__(self, catalog: Optional[CropCatalog] = None):
+        self._fixed_catalog = catalog
+        self.catalog = None
+        self.candidates = None
+        self.subset = None
+        self._inputs = {}
+        self._scores = {}
+        self.last_recomputed = ()
+        self.recompute_counts = dict.fromkeys(SCORE_DIMENSIONS, 0)
+
+    @staticmethod
+    def _input_values(canonical: Dict) -> Dict:
+        """提取参与依赖比较的输入值"""
+        return {
+            "sensor": tuple(sorted(canonical["sensor"].items())),
+            "season": canonical["season"],
+            "target_use": canonical["target_use"],
+            "risk_preference": canonical["risk_preference"],
+            "budget": canonical["budget"],
+            "expected_yield": canonical["expected_yield"],
+        }
+
+    def score(self, config: Dict) -> Dict[str, np.ndarray]:
+        """计算(或复用)各维度得分, 返回与 score_crops 相同结构的结果"""
+        catalog = self._fixed_catalog if self._fixed_catalog is not None else get_crop_catalog()
+        if catalog is not self.catalog:
+            # 作物库重建后所有缓存的部分结果都失效
+            self.catalog = catalog
+            self.candidates = None
+            self._inputs = {}
+            self._scores = {}
+
+        canonical = quantize_config(config)
+        inputs = self._input_values(canonical)
+        changed = {name for name, value in inputs.items() if self._inputs.get(name) != value}
+        sensor = sensor_vector(canonical["sensor"])
+
+        if self.candidates is None or "sensor" in changed:
+            candidates = feasible_indices(catalog, sensor)
+            if self.candidates is None or not np.array_equal(candidates, self.candidates):
+                self.candidates = candidates
+                self.subset = catalog.take(candidates)
+                for dim in SENSOR_DIMENSIONS:
+                    self._scores.pop(dim, None)
+
+        stale = [
+            dim for dim in SCORE_DIMENSIONS
+            if dim not in self._scores or changed.intersection(SCORE_DEPENDENCIES[dim])
+        ]
+        for dim in stale:
+            target = self.subset if dim in SENSOR_DIMENSIONS else catalog
+            self._scores[dim] = SCORE_FUNCTIONS[dim](target, canonical, sensor)
+            self.recompute_counts[dim] += 1
+        self._inputs = inputs
+        self.last_recomputed = tuple(stale)
+
+        scores = {
+            dim: self._scores[dim] if dim in SENSOR_DIMENSIONS else self._scores[dim][self.candidates]
+            for dim in SCORE_DIMENSIONS
+        }
+        scores["total"] = weighted_total(scores)
+        return scores
+
+    def recommend(self, config: Dict, top_k: int = 3) -> List[Dict]:
+        """增量评分后生成前k个推荐作物"""
+        scores = self.score(config)
+        indices = top_k_indices(scores["total"], top_k, groups=self.subset.crop_codes)
+        return format_recommendations(self.subset, scores, indices, config["risk_preference"])
+
+
+_recommendation_cache = TTLLRUCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+_cache_fingerprint = None
+
+
+def _checked_cache() -> tuple:
+    """返回推荐缓存及当前指纹, 作物库或权重变化时先清空缓存"""
+    global _cache_fingerprint
+    fingerprint = catalog_fingerprint()
+    if fingerprint != _cache_fingerprint:
+        _recommendation_cache.clear()
+        _cache_fingerprint = fingerprint
+    return _recommendation_cache, fingerprint
+
+
+def cached_recommend_crops(config: Dict, top_k: int = 3,
+                           scorer: Optional[IncrementalScorer] = None) -> List[Dict]:
+    """带缓存的推荐: 量化配置相同的请求在所有会话间共享结果
+
+    未命中时若提供了会话的增量评分器, 则只重算变化输入影响的维度。
+    """
+    cache, fingerprint = _checked_cache()
+    key = ("crops", fingerprint, top_k, config_key(config))
+    if scorer is not None:
+        compute = lambda: scorer.recommend(config, top_k=top_k)
+    else:
+        compute = lambda: recommend_crops(quantize_config(config), top_k=top_k)
+    results = cache.get_or_compute(key, compute)
+    return [dict(result) for result in results]
+
+
+def cached_recommend_batch(plot_conditions, config: Dict, top_k: int = 3) -> Dict[str, np.ndarray]:
+    """带缓存的批量推荐, 地块条件矩阵按内容参与缓存键"""
+    if hasattr(plot_conditions, "reindex"):
+        plot_conditions = plot_conditions.reindex(columns=list(FEATURE_NAMES)).to_numpy(dtype=float)
+    conditions = np.ascontiguousarray(np.atleast_2d(np.asarray(plot_conditions, dtype=float)))
+    cache, fingerprint = _checked_cache()
+    digest = hashlib.sha1(conditions.tobytes()).hexdigest()
+    key = ("batch", fingerprint, top_k, conditions.shape, digest, config_key({**config, "sensor": {}}))
+    result = cache.get_or_compute(key, lambda: recommend_batch(conditions, quantize_config(config), top_k=top_k))
+    return {name: array.copy() for name, array in result.items()}
+
+
+def recommendation_cache_stats() -> Dict:
+    """推荐缓存的命中/未命中等统计"""
+    return _recommendation_cache.stats()
+
+
+def clear_recommendation_cache():
+    """清空推荐缓存并在下次请求时重建品种特征矩阵"""
+    global _catalog
+    _recommendation_cache.clear()
+    _catalog = None
@@ -0,0 +1,114 @@
+# 作物收益蒙特卡洛风险模拟
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Optional
+
+from utils.constants import RISK_PREFERENCES
+
+# 每个品种的模拟次数与默认随机种子
+DEFAULT_DRAWS = 10000
+DEFAULT_SEED = 20240501
+
+# 各风险偏好计算 VaR/CVaR 的置信水平: 越保守越关注更深的尾部损失
+RISK_CONFIDENCE = dict(zip(RISK_PREFERENCES, (0.95, 0.90, 0.80)))
+
+# 产量与价格冲击的相关系数: 丰产年份价格往往偏低
+YIELD_PRICE_CORRELATION = -0.3
+
+# 尾部平均收益缺口(CVaR)达到期望产值的该比例时, 风险得分降为0
+RISK_SHORTFALL_SCALE = 0.6
+
+# 分块模拟的品种行数, 控制 (行数, 模拟次数) 临时矩阵的内存占用
+SIMULATION_BLOCK = 256
+
+
+@lru_cache(maxsize=8)
+def standard_draws(n_draws: int = DEFAULT_DRAWS, seed: int = DEFAULT_SEED) -> np.ndarray:
+    """生成 (2, n_draws) 的相关标准正态冲击, 第0行为产量、第1行为价格
+
+    所有品种共用同一组冲击(公共随机数), 品种之间的风险差异只来自各自的
+    波动参数, 排序不受抽样噪声影响; 相同种子的结果完全可复现。
+    """
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((2, n_draws))
+    rho = YIELD_PRICE_CORRELATION
+    z[1] = rho * z[0] + np.sqrt(1 - rho ** 2) * z[1]
+    z.setflags(write=False)
+    return z
+
+
+def _lognormal_sigma(cv: np.ndarray) -> np.ndarray:
+    """由变异系数求对数正态分布的 sigma"""
+    return np.sqrt(np.log1p(np.square(cv)))
+
+
+def simulate_profit(catalog, n_draws: int = DEFAULT_DRAWS, seed: int = DEFAULT_SEED,
+                    rows: Optional[slice] = None) -> np.ndarray:
+    """模拟各品种每亩收益, 返回 (n_varieties, n_draws) 矩阵(元/亩)
+
+    产量与价格服从均值为品种基准值、变异系数为 yield_cv/price_cv 的对数正态分布,
+    产值 = 产量 × 价格 合并为一次指数运算, 全部品种与全部模拟一次广播完成。
+    """
+    rows = slice(None) if rows is None else rows
+    z_yield, z_price = standard_draws(n_draws, seed)
+    sigma_yield = _lognormal_sigma(catalog.yield_cv[rows])[:, None]
+    sigma_price = _lognormal_sigma(catalog.price_cv[rows])[:, None]
+    # 对数正态均值修正项使模拟产量、价格的期望等于基准值
+    exponent = sigma_yield * z_yield + sigma_price * z_price
+    exponent -= (np.square(sigma_yield) + np.square(sigma_price)) / 2
+    revenue = (catalog.yield_base[rows] * catalog.price[rows])[:, None] * np.exp(exponent)
+    return revenue - catalog.cost[rows][:, None]
+
+
+def simulate_risk(catalog, confidence: float, n_draws: int = DEFAULT_DRAWS,
+                  seed: int = DEFAULT_SEED) -> Dict[str, np.ndarray]:
+    """由收益模拟结果计算各品种的风险指标
+
+    - expected: 期望收益(元/亩)
+    - var: 置信水平下的在险价值, 即期望收益与 (1-置信水平) 分位收益之差(元/亩)
+    - cvar: 条件在险价值, 即期望收益与最差 (1-置信水平) 尾部平均收益之差(元/亩)
+    - loss_probability: 收益为负的概率
+    - risk_index: CVaR 占期望产值的比例
+    - score: 风险评估得分(0-1), 尾部缺口越大得分越低
+    """
+    n = len(catalog)
+    tail = max(int(np.ceil((1 - confidence) * n_draws)), 1)
+    metrics = {name: np.empty(n) for name in ("expected", "var", "cvar", "loss_probability")}
+    for start in range(0, n, SIMULATION_BLOCK):
+        rows = slice(start, min(start + SIMULATION_BLOCK, n))
+        profit = simulate_profit(catalog, n_draws, seed, rows)
+        expected = profit.mean(axis=1)
+        # 部分排序即可取出最差尾部, 第 tail-1 个元素为分位收益
+        worst = np.partition(profit, tail - 1, axis=1)[:, :tail]
+        metrics["expected"][rows] = expected
+        metrics["var"][rows] = expected - worst.max(axis=1)
+        metrics["cvar"][rows] = expected - worst.mean(axis=1)
+        metrics["loss_probability"][rows] = (profit < 0).mean(axis=1)
+
+    revenue = np.maximum(catalog.yield_base * catalog.price, 1e-9)
+    metrics["risk_index"] = metrics["cvar"] / revenue
+    metrics["score"] = np.clip(1 - metrics["risk_index"] / RISK_SHORTFALL_SCALE, 0.0, 1.0)
+    metrics["confidence"] = confidence
+    return metrics
+
+
+def risk_metrics(catalog, risk_preference: str, n_draws: int = DEFAULT_DRAWS,
+                 seed: int = DEFAULT_SEED) -> Dict[str, np.ndarray]:
+    """按风险偏好取各品种的风险指标
+
+    各品种的模拟互相独立, 因此只对完整品种库模拟一次并按 (置信水平, 模拟次数, 种子)
+    缓存在品种库上, 品种子集按 source_index 取值, 每次推荐请求只需一次索引。
+    """
+    confidence = RISK_CONFIDENCE.get(risk_preference, RISK_CONFIDENCE[RISK_PREFERENCES[1]])
+    root = catalog.root
+    key = (confidence, n_draws, seed)
+    metrics = root.risk_cache.get(key)
+    if metrics is None:
+        metrics = simulate_risk(root, confidence, n_draws, seed)
+        root.risk_cache[key] = metrics
+    if catalog is root:
+        return metrics
+    return {
+        name: values if np.ndim(values) == 0 else values[catalog.source_index]
+        for name, values in metrics.items()
+    }
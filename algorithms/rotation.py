@@ -0,0 +1,194 @@
+# 多年轮作规划(动态规划)
+import numpy as np
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+from algorithms.recommendation import (
+    FEATURE_NAMES, CropCatalog, YIELD_FLOOR, environmental_scores, get_crop_catalog
+)
+from utils.constants import PLANTING_SEASONS, ZONE_CONFIG
+
+# 默认参与轮作的作物
+DEFAULT_ROTATION_CROPS = ("玉米", "大豆", "向日葵", "小麦")
+
+# 绿肥休耕: 不产生销售收入, 只投入绿肥种子成本并补充土壤氮素
+FALLOW = "绿肥休耕"
+FALLOW_COST = 150.0
+
+# 土壤速效氮离散化: 每档 NITROGEN_STEP mg/kg, 上限取传感器量程
+NITROGEN_STEP = 10.0
+NITROGEN_MAX = 300.0
+
+# 氮素年际变化(mg/kg): 作物按需氮量的比例消耗, 豆科与绿肥固氮, 土壤每年矿化补充
+NITROGEN_REMOVAL = 0.6
+LEGUME_CREDIT = 25.0
+FALLOW_CREDIT = 40.0
+MINERALIZATION = 10.0
+
+# 连作障碍: 同一作物连续种植时的病害减产比例
+CONTINUOUS_CROPPING_PENALTY = 0.2
+
+# 轮作年数范围
+MIN_YEARS = 3
+MAX_YEARS = 5
+
+
+def nitrogen_levels() -> np.ndarray:
+    """氮素状态档位对应的速效氮含量(mg/kg)"""
+    return np.arange(0.0, NITROGEN_MAX + NITROGEN_STEP, NITROGEN_STEP)
+
+
+def nitrogen_state(nitrogen) -> np.ndarray:
+    """将速效氮读数映射到状态档位, 缺失读数取中间档"""
+    levels = nitrogen_levels()
+    values = np.nan_to_num(np.asarray(nitrogen, dtype=float), nan=levels[len(levels) // 2])
+    return np.clip(np.rint(values / NITROGEN_STEP), 0, len(levels) - 1).astype(np.intp)
+
+
+@lru_cache(maxsize=64)
+def transition_table(nitrogen_demand: tuple, legume: tuple, fallow: tuple):
+    """轮作状态转移表(与价格无关, 按作物农艺参数缓存)
+
+    返回 (yield_factor, next_state), 形状均为 (n_levels, n_crops + 1, n_crops):
+    在氮素档位 n、前茬 p 下种植作物 c 时的产量系数与下一年的氮素档位。
+    前茬下标 n_crops 表示前茬未知, 不计连作障碍。产量系数包含氮素供应
+    (与环境适应性得分的肥力项一致)与连作病害减产。
+    """
+    levels = nitrogen_levels()
+    demand = np.asarray(nitrogen_demand, dtype=float)
+    legume = np.asarray(legume, dtype=bool)
+    fallow = np.asarray(fallow, dtype=bool)
+    n_crops = len(demand)
+
+    fertility = np.clip(levels[:, None] / demand, 0.0, 1.0)
+    yield_factor = np.broadcast_to((0.7 + 0.3 * fertility)[:, None, :], (len(levels), n_crops + 1, n_crops)).copy()
+    repeated = np.eye(n_crops + 1, n_crops, dtype=bool)
+    yield_factor[:, repeated & ~fallow] *= 1 - CONTINUOUS_CROPPING_PENALTY
+
+    credit = np.where(fallow, FALLOW_CREDIT, np.where(legume, LEGUME_CREDIT, 0.0))
+    removal = np.where(fallow, 0.0, NITROGEN_REMOVAL * demand)
+    following = levels[:, None] - removal + credit + MINERALIZATION
+    next_state = nitrogen_state(np.clip(following, 0.0, NITROGEN_MAX))
+    next_state = np.broadcast_to(next_state[:, None, :], yield_factor.shape).copy()
+    yield_factor.setflags(write=False)
+    next_state.setflags(write=False)
+    return yield_factor, next_state
+
+
+def rotation_crops(catalog: CropCatalog, crops: Sequence[str], include_fallow: bool = True) -> Dict:
+    """汇总参与轮作作物的农艺与经济参数(每种作物取品种库中首个品种)"""
+    rows = [int(np.flatnonzero(catalog.crops == crop)[0]) for crop in crops if (catalog.crops == crop).any()]
+    names = list(catalog.crops[rows])
+    params = {
+        "names": names,
+        "rows": np.asarray(rows, dtype=np.intp),
+        "yield_base": catalog.yield_base[rows],
+        "price": catalog.price[rows],
+        "cost": catalog.cost[rows],
+        "nitrogen_demand": catalog.nitrogen_demand[rows],
+        "legume": catalog.legume[rows],
+        "fallow": np.zeros(len(rows), dtype=bool),
+    }
+    if include_fallow:
+        params["names"].append(FALLOW)
+        for name, value in (("yield_base", 0.0), ("price", 0.0), ("cost", FALLOW_COST),
+                            ("nitrogen_demand", 1.0), ("legume", False), ("fallow", True)):
+            params[name] = np.append(params[name], value)
+    return params
+
+
+def plan_rotation(zone_conditions, zone_areas=None, crops: Sequence[str] = DEFAULT_ROTATION_CROPS,
+                  years: int = MIN_YEARS, prices: Optional[Dict[str, float]] = None,
+                  previous_crops: Optional[Sequence[Optional[str]]] = None,
+                  first_crops: Optional[Sequence[Optional[str]]] = None,
+                  season: str = PLANTING_SEASONS[0], include_fallow: bool = True,
+                  discount: float = 1.0, catalog: Optional[CropCatalog] = None) -> Dict:
+    """为地块全部微区规划多年轮作序列
+
+    状态为 (微区氮素档位, 前茬作物), 按年份逆向动态规划, 全部微区的
+    值函数一起以 (n_zones, n_levels, n_prev) 数组计算; 与价格无关的转移表
+    按作物参数缓存, 价格变化时只需重算收益矩阵, 可随行情实时重规划。
+    - prices: 覆盖作物单价(元/kg)
+    - previous_crops: 各微区上一年作物, 用于判断连作
+    - first_crops: 固定各微区第一年作物(例如沿用当年分配结果), None 表示不固定
+    返回每个微区的逐年作物、逐年收益(元)与累计收益。
+    """
+    catalog = get_crop_catalog() if catalog is None else catalog
+    years = int(np.clip(years, 1, MAX_YEARS))
+    conditions = np.atleast_2d(np.asarray(zone_conditions, dtype=float))
+    n_zones = conditions.shape[0]
+    if zone_areas is None:
+        zone_areas = np.full(n_zones, float(ZONE_CONFIG["default_zone_size"]))
+    areas = np.broadcast_to(np.asarray(zone_areas, dtype=float), (n_zones,))
+
+    params = rotation_crops(catalog, crops, include_fallow)
+    names = params["names"]
+    n_crops = len(names)
+    price = params["price"].copy()
+    for crop, value in (prices or {}).items():
+        if crop in names:
+            price[names.index(crop)] = value
+
+    yield_factor, next_state = transition_table(
+        tuple(params["nitrogen_demand"]), tuple(params["legume"]), tuple(params["fallow"])
+    )
+
+    # 微区环境适应性(不含肥力项, 肥力由氮素状态单独建模)
+    nitrogen = conditions[:, FEATURE_NAMES.index("nitrogen")]
+    climate = conditions.copy()
+    climate[:, FEATURE_NAMES.index("nitrogen")] = np.nan
+    suitability = np.ones((n_zones, n_crops))
+    suitability[:, :len(params["rows"])] = environmental_scores(catalog.take(params["rows"]), climate, season)
+
+    # 收益矩阵 (n_zones, n_levels, n_prev, n_crops), 单位: 元
+    potential = params["yield_base"] * (YIELD_FLOOR + (1 - YIELD_FLOOR) * suitability) * price
+    payoff = (potential[:, None, None, :] * yield_factor - params["cost"]) * areas[:, None, None, None]
+
+    allowed = np.ones((years, n_zones, n_crops), dtype=bool)
+    if first_crops is not None:
+        fixed = np.array([names.index(c) if c in names else -1 for c in first_crops])
+        rows = fixed >= 0
+        allowed[0, rows] = np.arange(n_crops) == fixed[rows, None]
+
+    # 逆向递推: value[z, n, p] 为从当年起的最大累计收益
+    n_levels = yield_factor.shape[0]
+    value = np.zeros((n_zones, n_levels, n_crops + 1))
+    policy = np.empty((years, n_zones, n_levels, n_crops + 1), dtype=np.intp)
+    crop_index = np.arange(n_crops)
+    for year in range(years - 1, -1, -1):
+        future = value[:, next_state, crop_index]
+        q = payoff + discount * future
+        q = np.where(allowed[year][:, None, None, :], q, -np.inf)
+        policy[year] = q.argmax(axis=-1)
+        value = np.take_along_axis(q, policy[year][..., None], axis=-1)[..., 0]
+
+    # 正向回溯各微区的最优序列
+    zones = np.arange(n_zones)
+    state = nitrogen_state(nitrogen)
+    previous = np.full(n_zones, n_crops)
+    if previous_crops is not None:
+        previous = np.array([names.index(c) if c in names else n_crops for c in previous_crops])
+    sequence = np.empty((n_zones, years), dtype=np.intp)
+    yearly_profit = np.empty((n_zones, years))
+    for year in range(years):
+        choice = policy[year, zones, state, previous]
+        sequence[:, year] = choice
+        yearly_profit[:, year] = payoff[zones, state, previous, choice]
+        state = next_state[state, previous, choice]
+        previous = choice
+
+    labels = np.asarray(names, dtype=object)
+    return {
+        "crops": names,
+        "sequence": labels[sequence],
+        "sequence_index": sequence,
+        "yearly_profit": yearly_profit,
+        "total_profit": yearly_profit.sum(axis=1)
+    }
+
+
+def summarize_rotation(plan: Dict) -> str:
+    """取微区中最常见的轮作序列, 形如 "玉米-大豆-向日葵" """
+    counts = Counter(tuple(row) for row in plan["sequence"])
+    return "-".join(counts.most_common(1)[0][0]) if counts else ""
@@ -0,0 +1,122 @@
+# 推荐情景推演(预算 × 风险偏好 × 种植季节)
+import atexit
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Sequence
+
+from algorithms.feasibility import feasible_indices
+from algorithms.recommendation import (
+    BUDGET_RANGE, BUDGET_STEP, SCORE_DIMENSIONS, SCORE_FUNCTIONS, get_crop_catalog,
+    quantize_config, rank_rows, sensor_vector, weighted_total
+)
+from utils.constants import PLANTING_SEASONS, RISK_PREFERENCES
+
+# 默认预算网格: 与页面预算滑块一致(500-5000 元/亩, 步长100)
+DEFAULT_BUDGETS = tuple(range(BUDGET_RANGE[0], BUDGET_RANGE[1] + 1, BUDGET_STEP))
+
+# 随预算变化、需要按预算网格广播计算的评分维度
+BUDGET_DIMENSIONS = ("profit", "technical")
+
+_pool = None
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """获取进程内共享的进程池, 避免每次推演重复启动工作进程"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1))
+        atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+
+def _reset_process_pool():
+    """进程池异常后丢弃, 下次推演时重建"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+def sweep_cell(config: Dict, risk_preference: str, season: str,
+               budgets: Sequence[int], top_k: int):
+    """计算单个(风险偏好, 季节)组合在整条预算网格上的前k推荐
+
+    与预算无关的维度只算一次, 经济效益与技术难度以 (n_budgets, 1) 的预算列
+    广播成 (n_budgets, n_varieties) 矩阵, 整个预算网格一次排序。
+    返回品种在完整品种库中的下标与总分, 形状均为 (n_budgets, top_k)。
+    """
+    catalog = get_crop_catalog()
+    canonical = quantize_config({**config, "risk_preference": risk_preference, "season": season})
+    sensor = sensor_vector(canonical["sensor"])
+    subset = catalog.take(feasible_indices(catalog, sensor))
+
+    budget_column = np.asarray(budgets, dtype=float)[:, None]
+    scores = {}
+    for dim in SCORE_DIMENSIONS:
+        if dim in BUDGET_DIMENSIONS:
+            scores[dim] = SCORE_FUNCTIONS[dim](subset, {**canonical, "budget": budget_column}, sensor)
+        else:
+            scores[dim] = SCORE_FUNCTIONS[dim](subset, canonical, sensor)
+    total = np.broadcast_to(weighted_total(scores), (len(budgets), len(subset)))
+
+    indices, top_scores = rank_rows(total, top_k, subset.crop_codes)
+    return subset.source_index[indices], top_scores
+
+
+def _sweep_task(args):
+    """进程池任务入口"""
+    return sweep_cell(*args)
+
+
+def run_scenario_sweep(config: Dict, budgets: Sequence[int] = DEFAULT_BUDGETS,
+                       risk_preferences: Sequence[str] = tuple(RISK_PREFERENCES),
+                       seasons: Sequence[str] = tuple(PLANTING_SEASONS),
+                       top_k: int = 3, reference_budget: Optional[int] = None,
+                       parallel: bool = True) -> Dict:
+    """在预算 × 风险偏好 × 季节网格上推演前k推荐
+
+    每个(风险偏好, 季节)组合作为一个任务提交到进程池并行计算; 进程池不可用时
+    退回当前进程顺序计算。返回结果立方体:
+    - top_indices / top_scores: (n_budgets, n_risks, n_seasons, k)
+    - overlap: (n_budgets, n_risks, n_seasons), 与参考预算下前k推荐的重合比例
+    - stability: (n_risks, n_seasons), 前k推荐集合与参考预算完全一致的预算点占比
+    """
+    budgets = list(budgets)
+    tasks = [(config, risk, season, budgets, top_k) for risk in risk_preferences for season in seasons]
+
+    results = None
+    if parallel and len(tasks) > 1:
+        try:
+            results = list(get_process_pool().map(_sweep_task, tasks))
+        except (BrokenProcessPool, OSError):
+            _reset_process_pool()
+    if results is None:
+        results = [_sweep_task(task) for task in tasks]
+
+    k = min(result[0].shape[1] for result in results)
+    shape = (len(risk_preferences), len(seasons), len(budgets), k)
+    top_indices = np.stack([result[0][:, :k] for result in results]).reshape(shape).transpose(2, 0, 1, 3)
+    top_scores = np.stack([result[1][:, :k] for result in results]).reshape(shape).transpose(2, 0, 1, 3)
+
+    if reference_budget is None:
+        reference_budget = config.get("budget", budgets[len(budgets) // 2])
+    reference = int(np.argmin(np.abs(np.asarray(budgets) - reference_budget)))
+    reference_top = top_indices[reference]
+    # 集合重合度: 逐个比较前k推荐是否出现在参考推荐中
+    matched = (top_indices[..., :, None] == reference_top[None, ..., None, :]).any(axis=-1)
+    overlap = matched.sum(axis=-1) / max(k, 1)
+    stability = (overlap == 1.0).mean(axis=0)
+
+    return {
+        "budgets": np.asarray(budgets),
+        "risk_preferences": list(risk_preferences),
+        "seasons": list(seasons),
+        "reference_budget": budgets[reference],
+        "top_indices": top_indices,
+        "top_scores": top_scores,
+        "overlap": overlap,
+        "stability": stability,
+        "names": get_crop_catalog().names
+    }
@@ -0,0 +1,240 @@
+# 传感器与微区的空间索引(均匀网格哈希)
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+from utils.constants import ZONE_CONFIG
+
+# 经纬度换算为米(以索引中心为原点的局部等距投影, 地块尺度下误差可忽略)
+METERS_PER_DEGREE_LAT = 110540.0
+METERS_PER_DEGREE_LON = 111320.0
+
+# 自动选择网格边长时每个网格的平均点数
+POINTS_PER_CELL = 2
+# 网格数上限(相对点数的倍数), 点分布极不均匀时放大网格边长
+MAX_CELLS_PER_POINT = 4
+
+
+def project(lat, lon, origin: Tuple[float, float]) -> np.ndarray:
+    """经纬度投影为以 origin 为原点的平面坐标(米), 返回 (n, 2): 东向 x, 北向 y"""
+    lat = np.atleast_1d(np.asarray(lat, dtype=float))
+    lon = np.atleast_1d(np.asarray(lon, dtype=float))
+    x = (lon - origin[1]) * METERS_PER_DEGREE_LON * np.cos(np.radians(origin[0]))
+    y = (lat - origin[0]) * METERS_PER_DEGREE_LAT
+    return np.column_stack([x, y])
+
+
+def ring_offsets(r: int) -> np.ndarray:
+    """与中心网格切比雪夫距离恰为 r 的网格偏移"""
+    if r == 0:
+        return np.zeros((1, 2), dtype=np.intp)
+    side = np.arange(-r, r + 1)
+    return np.concatenate([
+        np.column_stack([side, np.full(len(side), -r)]),
+        np.column_stack([side, np.full(len(side), r)]),
+        np.column_stack([np.full(len(side) - 2, -r), side[1:-1]]),
+        np.column_stack([np.full(len(side) - 2, r), side[1:-1]]),
+    ])
+
+
+def expand_ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """将若干 [lo, hi) 区间展开为下标数组, 同时返回每个下标所属的区间序号"""
+    counts = hi - lo
+    owner = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return lo[owner] + offsets, owner
+
+
+class _Grid:
+    """覆盖一组平面坐标范围的均匀网格"""
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, cell_size: float):
+        self.lower = lower
+        self.cell_size = float(cell_size)
+        self.shape = np.maximum(np.floor((upper - lower) / self.cell_size).astype(np.intp) + 1, 1)
+
+    def cell(self, xy: np.ndarray) -> np.ndarray:
+        """坐标所在网格(越界时截断到边缘网格)"""
+        cells = np.floor((xy - self.lower) / self.cell_size).astype(np.intp)
+        return np.clip(cells, 0, self.shape - 1)
+
+    def inside(self, xy: np.ndarray) -> np.ndarray:
+        cells = np.floor((xy - self.lower) / self.cell_size)
+        return ((cells >= 0) & (cells < self.shape)).all(axis=1)
+
+    def cell_id(self, cells: np.ndarray) -> np.ndarray:
+        return cells[..., 0] * self.shape[1] + cells[..., 1]
+
+
+class GridIndex:
+    """点(传感器位置)的网格哈希索引
+
+    点按所在网格排序后以 CSR 形式存放(order + 每个网格的起始位置),
+    查询只访问相关网格内的点: k 近邻按环形逐圈扩展, 全部查询点一起向量化处理;
+    矩形范围查询按网格行取连续切片。距离单位为米。
+    """
+
+    def __init__(self, lat, lon, cell_size: Optional[float] = None,
+                 origin: Optional[Tuple[float, float]] = None):
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        self.origin = (float(lat.mean()), float(lon.mean())) if origin is None else origin
+        self.points = project(lat, lon, self.origin)
+        n = len(self.points)
+        lower = self.points.min(axis=0) if n else np.zeros(2)
+        upper = self.points.max(axis=0) if n else np.zeros(2)
+        extent = np.maximum(upper - lower, 1.0)
+        if cell_size is None:
+            cell_size = np.sqrt(extent.prod() * POINTS_PER_CELL / max(n, 1))
+        # 网格数过多时放大边长, 控制 starts 数组的内存
+        cell_size = max(cell_size, np.sqrt(extent.prod() / (MAX_CELLS_PER_POINT * max(n, 1))), 1e-6)
+        self.grid = _Grid(lower, upper, cell_size)
+        cell_id = self.grid.cell_id(self.grid.cell(self.points))
+        self.order = np.argsort(cell_id, kind="stable")
+        self.starts = np.searchsorted(cell_id[self.order], np.arange(self.grid.shape.prod() + 1))
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, lat, lon, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """批量 k 近邻查询, 返回 (indices, distances), 形状均为 (n_queries, k), 按距离升序
+
+        对每个查询点由所在网格逐圈向外扩展; 处理完第 r 圈后, 未访问的点与查询点在
+        网格范围上的投影相距不小于 r 个网格边长, 再计入查询点到网格范围的距离即得
+        下界, 当第 k 近距离不超过该下界时该查询结束。
+        """
+        queries = project(lat, lon, self.origin)
+        m = len(queries)
+        k = min(k, len(self))
+        best_d = np.full((m, k), np.inf)
+        best_i = np.full((m, k), -1, dtype=np.intp)
+        if k == 0 or m == 0:
+            return best_i, best_d
+        home = self.grid.cell(queries)
+        upper = self.grid.lower + self.grid.shape * self.grid.cell_size
+        gap = np.square(queries - np.clip(queries, self.grid.lower, upper)).sum(axis=1)
+        active = np.arange(m)
+        max_ring = int(self.grid.shape.max())
+        r = 0
+        while len(active):
+            cells = home[active][:, None, :] + ring_offsets(r)[None]
+            valid = ((cells >= 0) & (cells < self.grid.shape)).all(axis=2)
+            query_pos, offset_pos = np.nonzero(valid)
+            cell_id = self.grid.cell_id(cells[query_pos, offset_pos])
+            positions, owner = expand_ranges(self.starts[cell_id], self.starts[cell_id + 1])
+            if len(positions):
+                candidate = self.order[positions]
+                query_pos = query_pos[owner]
+                distance = np.hypot(*(self.points[candidate] - queries[active[query_pos]]).T)
+                # 与当前最优 k 个合并后按 (查询, 距离) 排序, 每个查询保留前 k 个
+                n_active = len(active)
+                groups = np.concatenate([np.repeat(np.arange(n_active), k), query_pos])
+                dists = np.concatenate([best_d[active].ravel(), distance])
+                ids = np.concatenate([best_i[active].ravel(), candidate])
+                order = np.lexsort((dists, groups))
+                sizes = np.bincount(groups, minlength=n_active)
+                rank = np.arange(len(order)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+                keep = order[rank < k]
+                best_d[active] = dists[keep].reshape(n_active, k)
+                best_i[active] = ids[keep].reshape(n_active, k)
+            bound = np.sqrt(gap[active] + (r * self.grid.cell_size) ** 2)
+            done = (best_d[active, -1] <= bound) | (r >= max_ring)
+            active = active[~done]
+            r += 1
+        return best_i, best_d
+
+    def within_bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """经纬度矩形范围内的点下标(升序)"""
+        corners = project([south, north], [west, east], self.origin)
+        low, high = corners.min(axis=0), corners.max(axis=0)
+        first, last = self.grid.cell(low[None])[0], self.grid.cell(high[None])[0]
+        # 固定网格列号 cx 时, cy 连续的网格在 CSR 中也连续
+        columns = np.arange(first[0], last[0] + 1)
+        lo = self.starts[columns * self.grid.shape[1] + first[1]]
+        hi = self.starts[columns * self.grid.shape[1] + last[1] + 1]
+        candidate = self.order[expand_ranges(lo, hi)[0]]
+        xy = self.points[candidate]
+        inside = ((xy >= low) & (xy <= high)).all(axis=1)
+        return np.sort(candidate[inside])
+
+
+class ZoneIndex:
+    """微区几何(经纬度矩形)的网格索引
+
+    每个微区登记到其覆盖的全部网格, 以网格为键按 CSR 存放;
+    点定位只检查所在网格内登记的微区。
+    """
+
+    def __init__(self, south, west, north, east, cell_size: Optional[float] = None,
+                 origin: Optional[Tuple[float, float]] = None):
+        south, west, north, east = (np.atleast_1d(np.asarray(v, dtype=float)) for v in (south, west, north, east))
+        self.origin = (float((south.mean() + north.mean()) / 2),
+                       float((west.mean() + east.mean()) / 2)) if origin is None else origin
+        low = project(south, west, self.origin)
+        high = project(north, east, self.origin)
+        self.low = np.minimum(low, high)
+        self.high = np.maximum(low, high)
+        if cell_size is None:
+            cell_size = float(np.median((self.high - self.low).max(axis=1))) if len(self.low) else 1.0
+        self.grid = _Grid(self.low.min(axis=0), self.high.max(axis=0), max(cell_size, 1e-6))
+
+        # 展开每个微区覆盖的 (微区, 网格) 对
+        first = self.grid.cell(self.low)
+        last = self.grid.cell(self.high)
+        span = last - first + 1
+        offset, zone = expand_ranges(np.zeros(len(span), dtype=np.intp), span.prod(axis=1))
+        cells = first[zone] + np.column_stack([offset // span[zone, 1], offset % span[zone, 1]])
+        cell_id = self.grid.cell_id(cells)
+        order = np.argsort(cell_id, kind="stable")
+        self.zones = zone[order]
+        self.starts = np.searchsorted(cell_id[order], np.arange(self.grid.shape.prod() + 1))
+
+    def __len__(self):
+        return len(self.low)
+
+    def locate(self, lat, lon) -> np.ndarray:
+        """批量点定位, 返回所在微区下标(边界上取下标较小者), 不在任何微区内为 -1"""
+        points = project(lat, lon, self.origin)
+        result = np.full(len(points), len(self), dtype=np.intp)
+        inside = np.flatnonzero(self.grid.inside(points))
+        cell_id = self.grid.cell_id(self.grid.cell(points[inside]))
+        positions, owner = expand_ranges(self.starts[cell_id], self.starts[cell_id + 1])
+        zone = self.zones[positions]
+        point = inside[owner]
+        hit = ((points[point] >= self.low[zone]) & (points[point] <= self.high[zone])).all(axis=1)
+        np.minimum.at(result, point[hit], zone[hit])
+        result[result == len(self)] = -1
+        return result
+
+    def intersecting(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """与经纬度矩形相交的微区下标(升序)"""
+        corners = project([south, north], [west, east], self.origin)
+        low, high = corners.min(axis=0), corners.max(axis=0)
+        return np.flatnonzero(((self.low <= high) & (self.high >= low)).all(axis=1))
+
+
+def zone_layout(n_zones: int, sensors_per_zone: int = 2,
+                origin: Sequence[float] = ZONE_CONFIG["layout_origin"],
+                spacing: float = ZONE_CONFIG["layout_spacing"],
+                rows: int = ZONE_CONFIG["layout_rows"]) -> Dict:
+    """地块内微区与传感器的布局
+
+    微区按列优先排成 rows 行的网格, 每个微区是边长 spacing 度、以网格点为中心的矩形;
+    每个微区的传感器沿其对角线等距布设。传感器 j 属于微区 j // sensors_per_zone。
+    """
+    zone = np.arange(n_zones)
+    zone_lat = origin[0] + (zone % rows) * spacing
+    zone_lon = origin[1] + (zone // rows) * spacing
+    half = spacing / 2
+    fraction = (np.arange(sensors_per_zone) + 0.5) / sensors_per_zone - 0.5
+    sensor_lat = (zone_lat[:, None] + fraction * half).ravel()
+    sensor_lon = (zone_lon[:, None] + fraction * half).ravel()
+    return {
+        "zone_lat": zone_lat,
+        "zone_lon": zone_lon,
+        "south": zone_lat - half,
+        "west": zone_lon - half,
+        "north": zone_lat + half,
+        "east": zone_lon + half,
+        "sensor_lat": sensor_lat,
+        "sensor_lon": sensor_lon,
+    }
@@ -0,0 +1,126 @@
+# 栅格图层的分区统计(按微区汇总均值/极值/标准差/分位数)
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+# 默认输出的分位数
+DEFAULT_PERCENTILES = (10, 50, 90)
+# 估计分位数的直方图分箱数
+DEFAULT_BINS = 256
+
+
+def rasterize_boxes(south, west, north, east, lat, lon) -> np.ndarray:
+    """将矩形微区栅格化为标签数组 (len(lat), len(lon)), 值为微区下标, 不在任何微区内为 -1
+
+    lat/lon 为各行/列像元中心的坐标, 升序或降序均可; 像元中心落在 [南, 北) × [西, 东)
+    内即属于该微区, 微区重叠时取下标较大者。每个微区只写入其覆盖的行列区间。
+    """
+    south, west, north, east = (np.atleast_1d(np.asarray(v, dtype=float)) for v in (south, west, north, east))
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    row_order, col_order = np.argsort(lat, kind="stable"), np.argsort(lon, kind="stable")
+    row_lo = np.searchsorted(lat[row_order], south, side="left")
+    row_hi = np.searchsorted(lat[row_order], north, side="left")
+    col_lo = np.searchsorted(lon[col_order], west, side="left")
+    col_hi = np.searchsorted(lon[col_order], east, side="left")
+    labels = np.full((len(lat), len(lon)), -1, dtype=np.int32)
+    for zone in np.flatnonzero((row_hi > row_lo) & (col_hi > col_lo)):
+        rows = row_order[row_lo[zone]:row_hi[zone]]
+        cols = col_order[col_lo[zone]:col_hi[zone]]
+        labels[np.ix_(rows, cols)] = zone
+    return labels
+
+
+class ZonalAccumulator:
+    """分区统计的累加器: 可分块累加、合并, 最后一次性给出各微区统计量
+
+    计数/和/平方和由 np.bincount 累加, 极值由 np.minimum.at / np.maximum.at 累加,
+    分位数由各微区在 value_range 上的等宽直方图插值估计(误差不超过一个分箱宽度,
+    并截断到该微区的实际极值)。平方和以 value_range 中点为偏移累加, 减小相消误差。
+    NaN 与标签为负的像元不参与统计。
+    """
+
+    def __init__(self, n_zones: int, value_range: Tuple[float, float], bins: int = DEFAULT_BINS):
+        self.n_zones = n_zones
+        self.low, self.high = float(value_range[0]), float(value_range[1])
+        if not self.high > self.low:
+            self.high = self.low + 1.0
+        self.bins = bins
+        self.shift = (self.low + self.high) / 2
+        self.count = np.zeros(n_zones, dtype=np.int64)
+        self.total = np.zeros(n_zones)
+        self.squares = np.zeros(n_zones)
+        self.minimum = np.full(n_zones, np.inf)
+        self.maximum = np.full(n_zones, -np.inf)
+        self.histogram = np.zeros((n_zones, bins), dtype=np.int64)
+
+    def add(self, labels: np.ndarray, values: np.ndarray) -> "ZonalAccumulator":
+        """累加一块图层数据, labels 与 values 形状相同"""
+        labels = np.asarray(labels).ravel()
+        values = np.asarray(values).ravel()
+        keep = (labels >= 0) & (labels < self.n_zones) & ~np.isnan(values)
+        labels = labels[keep].astype(np.intp)
+        values = values[keep].astype(float)
+        if len(values) == 0:
+            return self
+        centered = values - self.shift
+        self.count += np.bincount(labels, minlength=self.n_zones)
+        self.total += np.bincount(labels, weights=centered, minlength=self.n_zones)
+        self.squares += np.bincount(labels, weights=centered * centered, minlength=self.n_zones)
+        np.minimum.at(self.minimum, labels, values)
+        np.maximum.at(self.maximum, labels, values)
+        which = np.clip(((values - self.low) / (self.high - self.low) * self.bins).astype(np.intp), 0, self.bins - 1)
+        self.histogram += np.bincount(labels * self.bins + which,
+                                      minlength=self.n_zones * self.bins).reshape(self.n_zones, self.bins)
+        return self
+
+    def merge(self, other: "ZonalAccumulator") -> "ZonalAccumulator":
+        """合并另一块的累加结果(微区数、值域与分箱须一致)"""
+        if (other.n_zones, other.low, other.high, other.bins) != (self.n_zones, self.low, self.high, self.bins):
+            raise ValueError("累加器的微区数、值域或分箱不一致")
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+        np.minimum(self.minimum, other.minimum, out=self.minimum)
+        np.maximum(self.maximum, other.maximum, out=self.maximum)
+        self.histogram += other.histogram
+        return self
+
+    def percentile(self, q: float) -> np.ndarray:
+        """各微区的 q 分位数估计, 无数据的微区为 NaN"""
+        cumulative = np.cumsum(self.histogram, axis=1)
+        target = q / 100 * self.count
+        which = np.minimum((cumulative < target[:, None]).sum(axis=1), self.bins - 1)
+        rows = np.arange(self.n_zones)
+        before = np.where(which > 0, cumulative[rows, np.maximum(which - 1, 0)], 0)
+        inside = self.histogram[rows, which]
+        fraction = np.divide(target - before, inside, out=np.zeros(self.n_zones), where=inside > 0)
+        width = (self.high - self.low) / self.bins
+        value = np.clip(self.low + (which + fraction) * width, self.minimum, self.maximum)
+        return np.where(self.count > 0, value, np.nan)
+
+    def result(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, np.ndarray]:
+        """各微区的 count/mean/std/min/max 与 p<q> 分位数, 无数据的微区除 count 外为 NaN"""
+        has = self.count > 0
+        n = np.maximum(self.count, 1)
+        mean = self.total / n
+        variance = np.maximum(self.squares / n - mean ** 2, 0)
+        stats = {
+            "count": self.count.copy(),
+            "mean": np.where(has, mean + self.shift, np.nan),
+            "std": np.where(has, np.sqrt(variance), np.nan),
+            "min": np.where(has, self.minimum, np.nan),
+            "max": np.where(has, self.maximum, np.nan),
+        }
+        for q in percentiles:
+            stats[f"p{q:g}"] = self.percentile(q)
+        return stats
+
+
+def zonal_stats(labels: np.ndarray, values: np.ndarray, n_zones: int,
+                percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                value_range: Optional[Tuple[float, float]] = None, bins: int = DEFAULT_BINS) -> Dict[str, np.ndarray]:
+    """单个图层的分区统计, 一次向量化遍历完成; 未给出 value_range 时取图层的有效值范围"""
+    values = np.asarray(values)
+    if value_range is None:
+        finite = values[~np.isnan(values)]
+        value_range = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 1.0)
+    return ZonalAccumulator(n_zones, value_range, bins).add(labels, values).result(percentiles)
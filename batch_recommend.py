@@ -0,0 +1,151 @@
+# 批量作物推荐命令行入口(脱离 Streamlit 运行, 可用于定时任务)
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from algorithms.recommendation import FEATURE_NAMES, get_crop_catalog, recommend_batch
+from utils.constants import PLANTING_SEASONS, RISK_PREFERENCES, TARGET_USES, YIELD_PREFERENCES
+
+# 每次从输入文件读取的行数; 内存占用只与该值有关, 与文件大小无关
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def parse_args(argv=None):
+    """解析命令行参数, 推荐参数与作物推荐页面的配置面板一致"""
+    parser = argparse.ArgumentParser(description="按地块传感器读数批量生成作物推荐")
+    parser.add_argument("input", help="输入文件(.csv 或 .parquet), 列名与传感器特征一致")
+    parser.add_argument("-o", "--output", required=True, help="输出文件(.csv 或 .parquet)")
+    parser.add_argument("--id-column", default="plot_id", help="地块编号列, 缺失时使用行号")
+    parser.add_argument("--season", choices=PLANTING_SEASONS, default=PLANTING_SEASONS[0])
+    parser.add_argument("--target-use", choices=TARGET_USES, default=TARGET_USES[0])
+    parser.add_argument("--risk-preference", choices=RISK_PREFERENCES, default=RISK_PREFERENCES[0])
+    parser.add_argument("--budget", type=float, default=1500, help="投资预算(元/亩)")
+    parser.add_argument("--expected-yield", choices=YIELD_PREFERENCES, default=YIELD_PREFERENCES[0])
+    parser.add_argument("--top-k", type=int, default=3, help="每个地块输出的推荐数")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块读取的行数")
+    return parser.parse_args(argv)
+
+
+def input_columns(path):
+    """输入文件的列名(只读取表头或 Parquet 元数据)"""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("读取 Parquet 文件需要安装 pyarrow: pip install pyarrow")
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def check_columns(path):
+    """输入文件须包含全部传感器特征列, 缺列时直接退出, 避免以 NaN 计算出得分"""
+    missing = [name for name in FEATURE_NAMES if name not in input_columns(path)]
+    if missing:
+        raise SystemExit(f"输入文件缺少传感器特征列: {', '.join(missing)}")
+
+
+def read_chunks(path, id_column, chunk_size):
+    """按块读取输入文件, 逐块产出 DataFrame(只读取编号列与传感器特征列)"""
+    wanted = {id_column, *FEATURE_NAMES}
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("读取 Parquet 文件需要安装 pyarrow: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in parquet.schema_arrow.names if name in wanted]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=lambda name: name in wanted, chunksize=chunk_size)
+
+
+class ResultWriter:
+    """逐块追加写出推荐结果, 已写出的块不再驻留内存"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = path.endswith(".parquet")
+        self._writer = None
+        self._header = True
+
+    def write(self, frame):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def rank_frame(ids, result, catalog):
+    """将 (n_plots, k) 的推荐结果展开为每个地块至多 k 行的长表(可行作物不足 k 种的地块行数更少)"""
+    n_plots, k = result["indices"].shape
+    indices = result["indices"].ravel()
+    found = indices >= 0
+    indices = indices[found]
+    # 没有品种的作物以作物名作为品种, 与推荐页面一致
+    varieties = catalog.varieties[indices]
+    varieties = np.where(varieties.astype(bool), varieties, catalog.crops[indices])
+    return pd.DataFrame({
+        "plot_id": np.repeat(ids, k)[found],
+        "rank": np.tile(np.arange(1, k + 1), n_plots)[found],
+        "crop": catalog.crops[indices],
+        "variety": varieties,
+        "score": (result["scores"].ravel()[found] * 100).round(1),
+        "suitability": (result["suitability"].ravel()[found] * 100).round(1),
+    })
+
+
+def run(args):
+    """流式读取、评分并写出, 返回 (处理行数, 耗时秒)"""
+    config = {
+        "season": args.season,
+        "target_use": args.target_use,
+        "risk_preference": args.risk_preference,
+        "budget": args.budget,
+        "expected_yield": args.expected_yield,
+        "sensor": {}
+    }
+    check_columns(args.input)
+    catalog = get_crop_catalog()
+    writer = ResultWriter(args.output)
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in read_chunks(args.input, args.id_column, args.chunk_size):
+            if args.id_column in chunk.columns:
+                ids = chunk[args.id_column].to_numpy()
+            else:
+                ids = np.arange(rows, rows + len(chunk))
+            result = recommend_batch(chunk, config, top_k=args.top_k, catalog=catalog)
+            writer.write(rank_frame(ids, result, catalog))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows, elapsed = run(args)
+    rate = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"已处理 {rows} 个地块, 耗时 {elapsed:.2f} 秒, 吞吐量 {rate:,.0f} 行/秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
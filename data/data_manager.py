@@ -0,0 +1,223 @@
+# 进程级共享数据层: 页面数据构建一次, 所有会话按引用共享
+import mmap
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import DATA_LAYER_CONFIG
+
+
+def _mapped(array: np.ndarray) -> bool:
+    """数组是否是内存映射文件或其视图(数据在页缓存中, 不计入进程内存)"""
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+
+def estimate_nbytes(value: Any, _seen: Optional[set] = None) -> int:
+    """估算对象占用的内存(字节): 数组按缓冲区大小(内存映射只计对象本身), DataFrame 含对象列
+    内容, 容器与普通对象(逐个属性)递归累加, 同一对象只计一次"""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) if _mapped(value) else value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k, seen) + estimate_nbytes(v, seen)
+                                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item, seen) for item in value)
+    attributes = getattr(value, "__dict__", None)
+    if isinstance(attributes, dict) and not isinstance(value, type):
+        # 自定义对象(如空间索引、瓦片金字塔)按其属性中持有的数组等累加
+        return sys.getsizeof(value) + estimate_nbytes(attributes, seen)
+    return sys.getsizeof(value)
+
+
+def freeze(value: Any) -> Any:
+    """将共享结果中的 NumPy 数组设为只读, 防止某个会话原地修改影响其他会话
+
+    DataFrame 无法整体设为只读, 使用方需要增删列时应先 copy() 或 assign()。
+    """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, dict):
+        for item in value.values():
+            freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            freeze(item)
+    return value
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "built_at", "expires_at", "build_seconds", "hits")
+
+    def __init__(self, value, nbytes, built_at, expires_at, build_seconds):
+        self.value = value
+        self.nbytes = nbytes
+        self.built_at = built_at
+        self.expires_at = expires_at
+        self.build_seconds = build_seconds
+        self.hits = 0
+
+
+class _KeyLock:
+    """单个键的构建锁, waiters 为正在使用(等待或持有)该锁的调用数"""
+    __slots__ = ("lock", "waiters")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+
+
+class SharedDataManager:
+    """进程内所有 Streamlit 会话共享的数据层
+
+    以元组为键保存页面所需的数据(地块清单、传感器网格、分配结果、趋势等):
+    - 同一键只构建一次, 并发会话请求同一键时由该键的锁串行化, 后到者直接复用结果,
+      不同键之间互不阻塞
+    - 结果按引用返回, 其中的数组被设为只读
+    - 逐键记录内存占用, 总量超过 memory_budget 时淘汰最久未使用的条目
+    - 支持按键或键前缀显式失效, 条目也可设置过期时间
+    """
+
+    def __init__(self, memory_budget: int = DATA_LAYER_CONFIG["memory_budget"], timer=time.monotonic):
+        self.memory_budget = memory_budget
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._key_locks: Dict[Hashable, _KeyLock] = {}
+        self._nbytes = 0
+        self.builds = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable) -> Optional[_Entry]:
+        """读取未过期的条目并刷新 LRU 顺序(调用方持锁)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= self._timer():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._nbytes -= entry.nbytes
+
+    def get(self, key: Hashable, build: Callable[[], Any], ttl: Optional[float] = DATA_LAYER_CONFIG["static_ttl"]) -> Any:
+        """返回键对应的共享数据, 不存在或已过期时调用 build() 构建(构建时不持全局锁)"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                entry.hits += 1
+                self.hits += 1
+                return entry.value
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.waiters += 1
+
+        try:
+            with key_lock.lock:
+                with self._lock:
+                    entry = self._lookup(key)
+                    if entry is not None:
+                        # 等待期间已由其他会话构建完成
+                        entry.hits += 1
+                        self.hits += 1
+                        return entry.value
+                started = time.perf_counter()
+                value = freeze(build())
+                elapsed = time.perf_counter() - started
+                nbytes = estimate_nbytes(value)
+                with self._lock:
+                    if key in self._entries:
+                        self._remove(key)
+                    now = self._timer()
+                    # 顺带清理已过期的条目(如按时间窗口取键的趋势数据)
+                    for expired in [k for k, e in self._entries.items()
+                                    if e.expires_at is not None and e.expires_at <= now]:
+                        self._remove(expired)
+                    self._entries[key] = _Entry(value, nbytes, now, None if ttl is None else now + ttl, elapsed)
+                    self._nbytes += nbytes
+                    self.builds += 1
+                    while self._nbytes > self.memory_budget and len(self._entries) > 1:
+                        self._remove(next(iter(self._entries)))
+                        self.evictions += 1
+                return value
+        finally:
+            # 最后一个使用者离开时移除键锁(构建失败时同样), 避免锁字典无限增长; 仍有调用在等待
+            # 或持有时保留, 使失效/过期后新到的调用与它们共用同一把锁
+            with self._lock:
+                key_lock.waiters -= 1
+                if key_lock.waiters == 0 and self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+
+    def invalidate(self, key: Optional[Hashable] = None, prefix: Optional[Tuple] = None) -> int:
+        """使条目失效: 指定 key 时精确匹配, 指定 prefix 时匹配以该前缀开头的元组键,
+        都不指定时清空全部, 返回失效的条目数"""
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+            elif prefix is not None:
+                keys = [k for k in self._entries
+                        if isinstance(k, tuple) and k[:len(prefix)] == tuple(prefix)]
+            else:
+                keys = list(self._entries)
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def memory_usage(self) -> Dict[Hashable, int]:
+        """各键占用的内存(字节)"""
+        with self._lock:
+            return {key: entry.nbytes for key, entry in self._entries.items()}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nbytes": self._nbytes,
+                "memory_budget": self.memory_budget,
+                "builds": self.builds,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "build_seconds": sum(entry.build_seconds for entry in self._entries.values())
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry.expires_at is None or entry.expires_at > self._timer())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_data_manager() -> SharedDataManager:
+    """获取进程内共享的数据层"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SharedDataManager()
+        return _manager
@@ -0,0 +1,113 @@
+# 传感器最新读数表(顺序锁, 页面读取无锁)
+import threading
+import time
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+from utils.constants import INGEST_CONFIG, SENSOR_CONFIG
+
+# 指标顺序, 与 SENSOR_CONFIG["data_ranges"] 保持一致
+METRIC_NAMES = tuple(SENSOR_CONFIG["data_ranges"].keys())
+
+# 读取时遇到写入的最大重试次数, 超过后退回持锁读取
+MAX_READ_RETRIES = 64
+
+
+class LastValueTable:
+    """按 (传感器行, 指标) 稠密存放的最新读数与时间戳
+
+    写入方(接入服务)持写锁原地更新; 读取方(页面渲染)不加锁, 以顺序锁保证一致性:
+    写入前后各递增一次序号(写入期间为奇数), 读取方在序号为偶数且读前读后不变时
+    得到一致的副本, 否则重试。扩容时整体替换数组元组, 新传感器的行号在扩容完成后
+    才登记, 读取方不会拿到越界的行号。
+    """
+
+    def __init__(self, capacity: int = 1024, stale_after: float = INGEST_CONFIG["stale_after"]):
+        self.stale_after = stale_after
+        self._write_lock = threading.Lock()
+        self._sequence = 0
+        self._rows: Dict[int, int] = {}
+        self._arrays = (np.full((capacity, len(METRIC_NAMES)), np.nan),
+                        np.full((capacity, len(METRIC_NAMES)), -np.inf))
+
+    def _row_indices(self, codes: np.ndarray) -> np.ndarray:
+        """传感器编码映射为行号, 新传感器自动分配行并按需扩容(调用方持写锁且序号为奇数)"""
+        unique, inverse = np.unique(codes, return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.intp)
+        new_codes = []
+        for i, code in enumerate(unique.tolist()):
+            row = self._rows.get(code)
+            if row is None:
+                row = len(self._rows) + len(new_codes)
+                new_codes.append(code)
+            rows[i] = row
+        values, timestamps = self._arrays
+        required = len(self._rows) + len(new_codes)
+        if required > len(values):
+            grow = max(required, 2 * len(values)) - len(values)
+            self._arrays = (np.vstack([values, np.full((grow, len(METRIC_NAMES)), np.nan)]),
+                            np.vstack([timestamps, np.full((grow, len(METRIC_NAMES)), -np.inf)]))
+        for offset, code in enumerate(new_codes):
+            self._rows[code] = required - len(new_codes) + offset
+        return rows[inverse]
+
+    def update(self, readings: np.ndarray):
+        """原地写入一批已校验的读数, 同一单元格只保留时间戳最新的一条"""
+        if len(readings) == 0:
+            return
+        with self._write_lock:
+            self._sequence += 1
+            try:
+                rows = self._row_indices(readings["sensor"])
+                metric = readings["metric"].astype(np.intp)
+                # 按 (单元格, 时间戳) 排序后取每个单元格的最后一条
+                cell = rows * len(METRIC_NAMES) + metric
+                order = np.lexsort((readings["timestamp"], cell))
+                cell_sorted = cell[order]
+                last = order[np.r_[cell_sorted[1:] != cell_sorted[:-1], True]]
+                values, timestamps = self._arrays
+                rows, metric = rows[last], metric[last]
+                newer = readings["timestamp"][last] >= timestamps[rows, metric]
+                rows, metric, last = rows[newer], metric[newer], last[newer]
+                values[rows, metric] = readings["value"][last]
+                timestamps[rows, metric] = readings["timestamp"][last]
+            finally:
+                self._sequence += 1
+
+    def _copy_rows(self, rows: np.ndarray):
+        values, timestamps = self._arrays
+        return values[rows], timestamps[rows]
+
+    def read(self, codes: Sequence[int], now: Optional[float] = None) -> Dict:
+        """无锁批量读取多个传感器的最新读数
+
+        返回 values/timestamps (n, n_metrics, 未上报为 NaN / -inf)、stale (n, n_metrics,
+        未上报或超过 stale_after 秒未更新为 True) 与 last_seen (n,, 最近上报时间, 未上报为 NaN)。
+        """
+        now = time.time() if now is None else now
+        rows = np.array([self._rows.get(int(code), -1) for code in codes], dtype=np.intp)
+        known = rows >= 0
+        rows = np.where(known, rows, 0)
+        for _ in range(MAX_READ_RETRIES):
+            sequence = self._sequence
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            values, timestamps = self._copy_rows(rows)
+            if self._sequence == sequence:
+                break
+        else:
+            with self._write_lock:
+                values, timestamps = self._copy_rows(rows)
+        values[~known] = np.nan
+        timestamps[~known] = -np.inf
+        last_seen = timestamps.max(axis=1) if len(rows) else np.empty(0)
+        return {
+            "values": values,
+            "timestamps": timestamps,
+            "stale": timestamps < now - self.stale_after,
+            "last_seen": np.where(np.isfinite(last_seen), last_seen, np.nan)
+        }
+
+    def __len__(self):
+        return len(self._rows)
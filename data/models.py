@@ -0,0 +1,147 @@
+# 传感器读数的紧凑表示: 结构化数组(类别字段以整数编码)与单条读数的记录类
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence
+
+from algorithms.anomaly import STATUS_ABNORMAL, STATUS_NORMAL, STATUS_OFFLINE, STATUS_WARNING
+from utils.constants import SENSOR_CONFIG
+
+# 指标顺序, 与 SENSOR_CONFIG["data_ranges"] 保持一致
+METRIC_NAMES = tuple(SENSOR_CONFIG["data_ranges"].keys())
+# 类别字段的取值表, 记录中保存其下标
+STATUS_NAMES = (STATUS_NORMAL, STATUS_WARNING, STATUS_ABNORMAL, STATUS_OFFLINE)
+SENSOR_TYPES = tuple(SENSOR_CONFIG["supported_types"])
+
+# 一条传感器读数(某一时刻的全部指标), 每条 60 字节, 无填充
+SENSOR_RECORD_DTYPE = np.dtype([
+    ("sensor", "<u4"),      # 传感器编码, 见 sensor_code()
+    ("zone", "<i2"),        # 所属微区下标, -1 表示不在任何微区内
+    ("type", "i1"),         # 设备类型, SENSOR_TYPES 下标
+    ("status", "i1"),       # 状态, STATUS_NAMES 下标
+    ("timestamp", "<f8"),   # 最近上报时间, 未上报为 NaN
+    ("lat", "<f8"),
+    ("lon", "<f8"),
+] + [(name, "<f4") for name in METRIC_NAMES])
+
+
+def _categories(zone_labels: Optional[Sequence[str]]) -> Dict[str, tuple]:
+    """转为 DataFrame 时作为类别列的字段及其取值表, 微区未给出标签时保留整数下标"""
+    categories = {"type": SENSOR_TYPES, "status": STATUS_NAMES}
+    if zone_labels is not None:
+        categories["zone"] = tuple(zone_labels)
+    return categories
+
+
+def encode(labels, names: Sequence[str]) -> np.ndarray:
+    """将标签批量编码为取值表下标(int8), 不在表中的标签为 -1"""
+    return pd.Categorical(np.asarray(labels, dtype=object), categories=list(names)).codes.astype(np.int8)
+
+
+def empty_records(n: int) -> np.ndarray:
+    """n 条空记录: 不属于任何微区、状态为离线、读数与时间为 NaN"""
+    records = np.zeros(n, dtype=SENSOR_RECORD_DTYPE)
+    records["zone"] = -1
+    records["type"] = -1
+    records["status"] = STATUS_NAMES.index(STATUS_OFFLINE)
+    records["timestamp"] = np.nan
+    for name in METRIC_NAMES:
+        records[name] = np.nan
+    return records
+
+
+def set_metrics(records: np.ndarray, values: np.ndarray, overwrite_missing: bool = True):
+    """按列写入读数矩阵 (n, n_metrics), 列顺序与 METRIC_NAMES 一致
+
+    overwrite_missing 为 False 时矩阵中的 NaN 不覆盖记录中已有的值。
+    """
+    for column, name in enumerate(METRIC_NAMES):
+        if overwrite_missing:
+            records[name] = values[:, column]
+        else:
+            records[name] = np.where(np.isnan(values[:, column]), records[name], values[:, column])
+
+
+def metric_matrix(records: np.ndarray) -> np.ndarray:
+    """记录中的读数整理为 (n, n_metrics) 矩阵"""
+    return np.column_stack([records[name] for name in METRIC_NAMES]).astype(float)
+
+
+def records_to_frame(records: np.ndarray, zone_labels: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """结构化记录转为 DataFrame
+
+    数值列直接引用记录数组的字段(不复制); 微区/类型/状态转为 pandas 类别列,
+    微区未给出标签时保留整数下标。
+    """
+    categories = _categories(zone_labels)
+    columns = {}
+    for name in SENSOR_RECORD_DTYPE.names:
+        if name in categories:
+            columns[name] = pd.Categorical.from_codes(records[name], categories=list(categories[name]))
+        else:
+            columns[name] = records[name]
+    return pd.DataFrame(columns, copy=False)
+
+
+def frame_to_records(frame: pd.DataFrame, zone_labels: Optional[Sequence[str]] = None) -> np.ndarray:
+    """DataFrame 转为结构化记录, 缺少的列取空记录的默认值
+
+    类别列按取值表重新编码(只处理取值表本身), 文本列(如状态名称)同样按取值表编码。
+    """
+    records = empty_records(len(frame))
+    categories = _categories(zone_labels)
+    for name in SENSOR_RECORD_DTYPE.names:
+        if name not in frame:
+            continue
+        column = frame[name]
+        if name in categories and isinstance(column.dtype, pd.CategoricalDtype):
+            # 只对类别取值表重新编码, 再按原编码查表, 不逐行处理
+            mapping = np.append(encode(column.cat.categories, categories[name]), np.int8(-1))
+            records[name] = mapping[column.cat.codes.to_numpy()]
+        elif name in categories:
+            records[name] = encode(column, categories[name])
+        else:
+            records[name] = column.to_numpy(dtype=SENSOR_RECORD_DTYPE[name])
+    return records
+
+
+# 空记录各字段的默认值(Python 标量)
+_DEFAULT_RECORD = empty_records(1)[0].item()
+
+
+class SensorReading:
+    """单条传感器读数, 字段与 SENSOR_RECORD_DTYPE 一一对应
+
+    使用 __slots__ 不创建实例字典; 批量数据应直接使用结构化数组,
+    本类只用于逐条处理或对外接口。
+    """
+
+    __slots__ = SENSOR_RECORD_DTYPE.names
+
+    def __init__(self, **fields):
+        for name, default in zip(self.__slots__, _DEFAULT_RECORD):
+            setattr(self, name, fields.pop(name, default))
+        if fields:
+            raise TypeError(f"未知字段: {', '.join(fields)}")
+
+    @classmethod
+    def from_record(cls, record) -> "SensorReading":
+        return cls(**dict(zip(SENSOR_RECORD_DTYPE.names, record.item())))
+
+    def to_record(self) -> np.void:
+        return np.array(tuple(getattr(self, name) for name in self.__slots__), dtype=SENSOR_RECORD_DTYPE)[()]
+
+    @property
+    def status_name(self) -> str:
+        return STATUS_NAMES[self.status]
+
+    @property
+    def type_name(self) -> Optional[str]:
+        return SENSOR_TYPES[self.type] if self.type >= 0 else None
+
+    def values(self) -> Dict[str, float]:
+        """已上报的指标读数"""
+        return {name: getattr(self, name) for name in METRIC_NAMES if not np.isnan(getattr(self, name))}
+
+    def __repr__(self):
+        return (f"SensorReading(sensor={self.sensor}, zone={self.zone}, type={self.type_name}, "
+                f"status={self.status_name}, values={self.values()})")
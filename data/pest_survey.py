@@ -0,0 +1,52 @@
+# 航拍影像的病虫害普查: 逐块切片、在线程池中整批分类、按微区汇总
+import threading
+import time
+import numpy as np
+from typing import Dict, Optional
+
+from algorithms.pest_classifier import (
+    PEST_CLASSES, PestAccumulator, SoftmaxClassifier, classify_patches, patch_features, synthesize_patches
+)
+from data.raster_store import CANOPY_REFLECTANCE, SOIL_REFLECTANCE, TiledRaster, get_thread_pool
+from utils.constants import PEST_CONFIG, RASTER_CONFIG
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_pest_model() -> SoftmaxClassifier:
+    """获取进程内共享的病虫害分类器, 首次调用时以合成图块训练"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            patches, labels = synthesize_patches(PEST_CONFIG["training_patches"], SOIL_REFLECTANCE,
+                                                 CANOPY_REFLECTANCE, seed=PEST_CONFIG["seed"])
+            features = patch_features(patches)
+            _model = SoftmaxClassifier(features.shape[1], len(PEST_CLASSES)).fit(features, labels)
+        return _model
+
+
+def survey_pests(raster: TiledRaster, labels: Optional[TiledRaster], n_zones: int,
+                 model: Optional[SoftmaxClassifier] = None) -> Dict:
+    """逐块识别航拍影像中的病虫害并按微区汇总
+
+    每个瓦片切分出的全部图块作为一批(512 像元瓦片、16 像元图块时为 1024 块)一次完成
+    特征提取与分类, 各瓦片在线程池中并行处理后合并。返回 PestAccumulator.result() 的
+    各项统计以及 n_patches(识别的图块数)与 seconds(耗时)。
+    """
+    model = model or get_pest_model()
+    scale = RASTER_CONFIG["reflectance_scale"]
+    started = time.perf_counter()
+
+    def classify(tile):
+        stack = np.stack([raster.read_tile(band, *tile) for band in raster.bands]).astype(np.float32) / scale
+        zones = labels.read_tile("zone", *tile) if labels is not None else None
+        return classify_patches(model, stack, zones, n_zones)
+
+    total = PestAccumulator(n_zones, len(PEST_CLASSES))
+    for partial in get_thread_pool().map(classify, raster.tiles()):
+        total.merge(partial)
+    result = total.result()
+    result["n_patches"] = int(result["classes"].sum())
+    result["seconds"] = time.perf_counter() - started
+    return result
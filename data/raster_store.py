@@ -0,0 +1,530 @@
+# 无人机多光谱影像的分块存储(内存映射)与逐块植被指数计算
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from algorithms.change_detection import ChangeSummary, tile_changes
+from algorithms.pest_classifier import PEST_CLASSES, apply_symptoms
+from algorithms.spatial_index import project
+from algorithms.zonal_stats import DEFAULT_PERCENTILES, ZonalAccumulator, rasterize_boxes
+from utils.constants import CHANGE_CONFIG, PEST_CONFIG, RASTER_CONFIG
+
+# 归一化差值植被指数 (a - b) / (a + b) 所用的波段
+INDICES = {
+    "ndvi": ("nir", "red"),
+    "gndvi": ("nir", "green"),
+    "ndre": ("nir", "red_edge"),
+}
+INDEX_NAMES = {"ndvi": "NDVI", "gndvi": "GNDVI", "ndre": "NDRE"}
+
+META_FILE = "raster.json"
+# 航拍信息(拍摄时间)与植被指数各瓦片统计量的文件名
+FLIGHT_FILE = "flight.json"
+TILE_STATS_FILE = "tile_stats.npz"
+
+# 模拟航拍中裸土与植被冠层的反射率, 波段顺序与 RASTER_CONFIG["bands"] 一致
+SOIL_REFLECTANCE = np.array([0.08, 0.11, 0.15, 0.20, 0.26])
+CANOPY_REFLECTANCE = np.array([0.03, 0.08, 0.04, 0.28, 0.52])
+
+_pool = None
+_pool_lock = threading.Lock()
+_flight_lock = threading.Lock()
+_output_locks: Dict[str, threading.Lock] = {}
+_output_locks_lock = threading.Lock()
+
+
+def _output_lock(directory: str) -> threading.Lock:
+    """结果目录的构建锁, 不同结果之间互不阻塞"""
+    with _output_locks_lock:
+        return _output_locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+
+def tile_digest(tile: np.ndarray) -> int:
+    """瓦片内容的 64 位校验和(blake2b)"""
+    return int.from_bytes(hashlib.blake2b(np.ascontiguousarray(tile), digest_size=8).digest(), "little")
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """获取进程内共享的逐块计算线程池(NumPy 运算与内存映射缺页期间释放 GIL)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=RASTER_CONFIG["workers"] or os.cpu_count() or 1)
+            atexit.register(_pool.shutdown, wait=False)
+        return _pool
+
+
+class TiledRaster:
+    """分块存放的多波段栅格, 每个波段一个内存映射文件
+
+    波段文件按瓦片顺序排列为 (tiles_y, tiles_x, tile, tile), 每个瓦片在文件中连续,
+    逐块读取只触及该瓦片所在的页, 整幅影像不会读入内存。边缘瓦片超出影像的部分
+    保留为 0(新建时文件按稀疏方式分配)。bounds 为 (南, 西, 北, 东), 第 0 行在北侧。
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.height, self.width = meta["shape"]
+        self.tile_size = meta["tile_size"]
+        self.bands = tuple(meta["bands"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.bounds = tuple(meta["bounds"])
+        self.pixel_size = meta["pixel_size"]
+        self.tiles_shape = (-(-self.height // self.tile_size), -(-self.width // self.tile_size))
+        self._maps: Dict[Tuple[str, str], np.memmap] = {}
+        self._checksums: Dict[str, np.ndarray] = {}
+        self._dirty_checksums = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, directory: str, height: int, width: int, bands: Sequence[str],
+               bounds: Tuple[float, float, float, float], pixel_size: float,
+               dtype="<u2", tile_size: Optional[int] = None) -> "TiledRaster":
+        """新建栅格: 按完整大小分配各波段文件, 最后写入元数据"""
+        tile_size = tile_size or RASTER_CONFIG["tile_size"]
+        tiles = -(-height // tile_size) * -(-width // tile_size)
+        os.makedirs(directory, exist_ok=True)
+        for band in bands:
+            with open(os.path.join(directory, f"{band}.bin"), "wb") as f:
+                f.truncate(tiles * tile_size * tile_size * np.dtype(dtype).itemsize)
+        meta = {"shape": [height, width], "tile_size": tile_size, "bands": list(bands),
+                "dtype": np.dtype(dtype).str, "bounds": list(bounds), "pixel_size": pixel_size}
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return cls(directory)
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, META_FILE))
+
+    def band(self, name: str, mode: str = "r") -> np.memmap:
+        """波段的内存映射, 形状 (tiles_y, tiles_x, tile, tile)"""
+        key = (name, mode)
+        with self._lock:
+            if key not in self._maps:
+                if name not in self.bands:
+                    raise KeyError(f"未知波段: {name}")
+                self._maps[key] = np.memmap(os.path.join(self.directory, f"{name}.bin"), dtype=self.dtype,
+                                            mode=mode, shape=self.tiles_shape + (self.tile_size,) * 2)
+            return self._maps[key]
+
+    def tiles(self) -> Iterator[Tuple[int, int]]:
+        for ty in range(self.tiles_shape[0]):
+            for tx in range(self.tiles_shape[1]):
+                yield ty, tx
+
+    def tile_extent(self, ty: int, tx: int) -> Tuple[int, int]:
+        """瓦片在影像内的有效行数与列数"""
+        return (min(self.tile_size, self.height - ty * self.tile_size),
+                min(self.tile_size, self.width - tx * self.tile_size))
+
+    def tile_coordinates(self, ty: int, tx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """瓦片内各像元中心相对影像西北角的 (向南, 向东) 距离(米), 形状 (tile,) 各一"""
+        offsets = (np.arange(self.tile_size) + 0.5) * self.pixel_size
+        return (ty * self.tile_size * self.pixel_size + offsets,
+                tx * self.tile_size * self.pixel_size + offsets)
+
+    def tile_centers(self, ty: int, tx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """瓦片内有效像元中心的纬度(由北向南)与经度"""
+        south, west, north, east = self.bounds
+        rows, cols = self.tile_extent(ty, tx)
+        row = ty * self.tile_size + np.arange(rows) + 0.5
+        col = tx * self.tile_size + np.arange(cols) + 0.5
+        return north - row * (north - south) / self.height, west + col * (east - west) / self.width
+
+    def read_tile(self, band: str, ty: int, tx: int, crop: bool = True) -> np.ndarray:
+        """读取一个瓦片(返回内存映射视图), crop 为 False 时包含边缘填充部分"""
+        tile = self.band(band)[ty, tx]
+        if crop:
+            rows, cols = self.tile_extent(ty, tx)
+            tile = tile[:rows, :cols]
+        return tile
+
+    def write_tile(self, band: str, ty: int, tx: int, data: np.ndarray):
+        """写入一个瓦片, data 可以是有效部分或含填充的完整瓦片; 已有校验和时同步更新"""
+        data = np.asarray(data)
+        target = self.band(band, mode="r+")
+        target[ty, tx, :data.shape[0], :data.shape[1]] = data
+        checksums = self._stored_checksums(band)
+        if checksums is not None:
+            checksums[ty, tx] = tile_digest(target[ty, tx])
+            with self._lock:
+                self._dirty_checksums.add(band)
+
+    def _stored_checksums(self, band: str) -> Optional[np.ndarray]:
+        """已计算(内存中或 <band>.sum 文件中)的瓦片校验和, 尚未计算时为 None"""
+        with self._lock:
+            if band not in self._checksums:
+                path = os.path.join(self.directory, f"{band}.sum")
+                if not os.path.exists(path):
+                    return None
+                self._checksums[band] = np.fromfile(path, dtype="<u8").reshape(self.tiles_shape)
+            return self._checksums[band]
+
+    def checksums(self, band: str) -> np.ndarray:
+        """各瓦片内容的校验和 (tiles_y, tiles_x)
+
+        首次调用时逐块计算并保存为 <band>.sum, 之后写入瓦片时只更新对应的一项;
+        复制影像目录时校验和随之复制, 比较两次航拍只需重算被改写的瓦片。
+        """
+        checksums = self._stored_checksums(band)
+        if checksums is None:
+            data = self.band(band)
+            digests = get_thread_pool().map(lambda tile: tile_digest(data[tile]), self.tiles())
+            checksums = np.fromiter(digests, dtype=np.uint64, count=int(np.prod(self.tiles_shape)))
+            with self._lock:
+                checksums = self._checksums.setdefault(band, checksums.reshape(self.tiles_shape))
+                self._dirty_checksums.add(band)
+            self.flush()
+        return checksums
+
+    def read_window(self, band: str, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """读取影像窗口 [row0, row1) × [col0, col1), 只访问与窗口相交的瓦片"""
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(row1, self.height), min(col1, self.width)
+        t = self.tile_size
+        window = np.empty((max(row1 - row0, 0), max(col1 - col0, 0)), dtype=self.dtype)
+        data = self.band(band)
+        for ty in range(row0 // t, -(-row1 // t)):
+            r0, r1 = max(row0, ty * t), min(row1, (ty + 1) * t)
+            for tx in range(col0 // t, -(-col1 // t)):
+                c0, c1 = max(col0, tx * t), min(col1, (tx + 1) * t)
+                window[r0 - row0:r1 - row0, c0 - col0:c1 - col0] = \
+                    data[ty, tx, r0 - ty * t:r1 - ty * t, c0 - tx * t:c1 - tx * t]
+        return window
+
+    def flush(self):
+        with self._lock:
+            for (_, mode), data in self._maps.items():
+                if mode != "r":
+                    data.flush()
+            for band in self._dirty_checksums:
+                self._checksums[band].astype("<u8").tofile(os.path.join(self.directory, f"{band}.sum"))
+            self._dirty_checksums.clear()
+
+    def same_grid(self, other: "TiledRaster") -> bool:
+        """两幅栅格的尺寸、分块与范围是否一致(可逐块比较)"""
+        return ((self.height, self.width, self.tile_size, self.bounds)
+                == (other.height, other.width, other.tile_size, other.bounds))
+
+    @property
+    def nbytes(self) -> int:
+        """各波段文件的总大小(字节)"""
+        return len(self.bands) * int(np.prod(self.tiles_shape)) * self.tile_size ** 2 * self.dtype.itemsize
+
+
+def normalized_difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(a - b) / (a + b), 两波段均无数据(和为 0)时为 NaN"""
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    total = a + b
+    return np.divide(a - b, total, out=np.full(total.shape, np.nan, dtype=np.float32), where=total > 0)
+
+
+def compute_index(raster: TiledRaster, index: str = "ndvi", previous: Optional[TiledRaster] = None,
+                  bins: Optional[int] = None) -> Dict:
+    """流式逐块计算植被指数, 各瓦片在线程池中并行处理
+
+    每个任务只读取两个波段的一个瓦片, 结果写入影像目录下 <index> 子目录的 float32
+    分块栅格, 各瓦片的直方图与数值和一并保存; 内存占用与瓦片大小和线程数成正比,
+    与影像大小无关。结果已存在时直接读取。
+
+    给出 previous(同一地块上一次航拍, 同样分块且已计算过该指数)时增量计算: 复制上一次
+    的结果, 只重算两个波段校验和发生变化的瓦片。返回 raster(结果栅格)、changed(本次
+    重算的瓦片, 完整计算时为 None)、histogram/edges、mean 与 valid(有效像元数)。
+    """
+    if index not in INDICES:
+        raise ValueError(f"未知植被指数: {index}")
+    bins = bins or RASTER_CONFIG["histogram_bins"]
+    edges = np.linspace(-1, 1, bins + 1)
+    a_band, b_band = INDICES[index]
+    output = os.path.join(raster.directory, index)
+    stats_path = os.path.join(output, TILE_STATS_FILE)
+    changed = []
+
+    # 同一结果可能由多个缓存键(如植被指数与变化检测)同时请求, 按输出目录串行构建
+    with _output_lock(output):
+        if not os.path.exists(stats_path):
+            # 先写入临时目录, 完成后改名, 中断时不会留下不完整的结果
+            staging = output + ".tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            base = None if previous is None else os.path.join(previous.directory, index)
+            base_stats = None if base is None else os.path.join(base, TILE_STATS_FILE)
+            if (base is not None and raster.same_grid(previous) and os.path.exists(base_stats)
+                    and np.load(base_stats)["histogram"].shape[-1] == bins):
+                shutil.copytree(base, staging)
+                result = TiledRaster(staging)
+                stale = ((raster.checksums(a_band) != previous.checksums(a_band))
+                         | (raster.checksums(b_band) != previous.checksums(b_band)))
+                changed = [tuple(int(v) for v in tile) for tile in np.argwhere(stale)]
+            else:
+                result = TiledRaster.create(staging, raster.height, raster.width, (index,), raster.bounds,
+                                            raster.pixel_size, dtype="<f4", tile_size=raster.tile_size)
+                changed = None
+            stats = (dict(np.load(os.path.join(staging, TILE_STATS_FILE))) if changed is not None else
+                     {"histogram": np.zeros(raster.tiles_shape + (bins,), dtype=np.int64),
+                      "total": np.zeros(raster.tiles_shape)})
+
+            def process(tile):
+                ty, tx = tile
+                value = normalized_difference(raster.read_tile(a_band, ty, tx, crop=False),
+                                              raster.read_tile(b_band, ty, tx, crop=False))
+                rows, cols = raster.tile_extent(ty, tx)
+                value[rows:] = np.nan
+                value[:, cols:] = np.nan
+                result.write_tile(index, ty, tx, value)
+                valid = value[~np.isnan(value)]
+                return tile, np.histogram(valid, edges)[0], float(valid.sum(dtype=np.float64))
+
+            for tile, tile_histogram, tile_total in get_thread_pool().map(
+                    process, raster.tiles() if changed is None else changed):
+                stats["histogram"][tile] = tile_histogram
+                stats["total"][tile] = tile_total
+            result.flush()
+            np.savez(os.path.join(staging, TILE_STATS_FILE), **stats)
+            del result
+            shutil.rmtree(output, ignore_errors=True)
+            os.replace(staging, output)
+
+    stats = np.load(stats_path)
+    histogram = stats["histogram"].sum(axis=(0, 1))
+    valid = int(histogram.sum())
+    return {
+        "raster": TiledRaster(output),
+        "changed": changed,
+        "histogram": histogram,
+        "edges": edges,
+        "mean": float(stats["total"].sum()) / valid if valid else float("nan"),
+        "valid": valid
+    }
+
+
+def simulate_flight(directory: str, bounds: Tuple[float, float, float, float], seed: int = 0,
+                    pixel_size: Optional[float] = None, tile_size: Optional[int] = None,
+                    captured_at: Optional[float] = None) -> TiledRaster:
+    """生成覆盖 bounds=(南, 西, 北, 东) 的模拟多光谱航拍影像, 逐块生成并写入
+
+    植被覆盖度由若干随机高斯斑块与缓变起伏叠加而成, 各波段反射率按覆盖度在裸土与
+    冠层光谱间线性混合, 在若干病虫害发生点周围叠加症状后加噪声。
+    """
+    pixel_size = pixel_size or RASTER_CONFIG["pixel_size"]
+    scale = RASTER_CONFIG["reflectance_scale"]
+    bands = RASTER_CONFIG["bands"]
+    south, west, north, east = bounds
+    width_m, height_m = np.abs(project([north], [east], (south, west))[0])
+    # 先写入临时目录, 全部瓦片生成后再改名, 中断时不会留下不完整的影像
+    staging = directory + ".tmp"
+    raster = TiledRaster.create(staging, max(int(height_m / pixel_size), 1), max(int(width_m / pixel_size), 1),
+                                bands, bounds, pixel_size, dtype="<u2", tile_size=tile_size)
+
+    rng = np.random.default_rng(seed)
+    n_patches = 6
+    centers = rng.uniform(0, 1, (n_patches, 2)) * [height_m, width_m]
+    radii = rng.uniform(0.1, 0.3, n_patches) * min(height_m, width_m)
+    weights = rng.uniform(0.3, 0.7, n_patches)
+    wave = rng.uniform(20, 60, 2)
+    n_hotspots = PEST_CONFIG["hotspots"]
+    hotspots = rng.uniform(0, 1, (n_hotspots, 2)) * [height_m, width_m]
+    hotspot_radii = rng.uniform(0.03, 0.08, n_hotspots) * min(height_m, width_m)
+    hotspot_pests = rng.integers(1, len(PEST_CLASSES), n_hotspots)
+
+    def generate(tile):
+        ty, tx = tile
+        rows, cols = raster.tile_extent(ty, tx)
+        down, across = raster.tile_coordinates(ty, tx)
+        down, across = down[:rows, None], across[None, :cols]
+        cover = 0.25 + 0.1 * np.sin(down / wave[0]) * np.cos(across / wave[1])
+        for (cy, cx), radius, weight in zip(centers, radii, weights):
+            cover = cover + weight * np.exp(-((down - cy) ** 2 + (across - cx) ** 2) / (2 * radius ** 2))
+        cover = np.clip(cover, 0, 1)
+        # 每个像元取严重度最大的发生点, 症状只作用于冠层部分
+        severity = np.zeros((rows, cols))
+        pest = np.zeros((rows, cols), dtype=np.int64)
+        for (cy, cx), radius, label in zip(hotspots, hotspot_radii, hotspot_pests):
+            weight = np.exp(-((down - cy) ** 2 + (across - cx) ** 2) / (2 * radius ** 2))
+            pest = np.where(weight > severity, label, pest)
+            severity = np.maximum(severity, weight)
+        tile_rng = np.random.default_rng([seed, ty, tx])
+        reflectance = SOIL_REFLECTANCE[:, None, None] + cover[None] * (CANOPY_REFLECTANCE - SOIL_REFLECTANCE)[:, None, None]
+        reflectance = apply_symptoms(reflectance, pest, severity * cover, tile_rng)
+        for i, band in enumerate(bands):
+            noisy = reflectance[i] * (1 + tile_rng.normal(0, 0.04, reflectance[i].shape))
+            raster.write_tile(band, ty, tx, np.clip(noisy * scale, 1, 65535).astype(np.uint16))
+
+    list(get_thread_pool().map(generate, raster.tiles()))
+    raster.flush()
+    _write_flight_info(staging, time.time() if captured_at is None else captured_at)
+    del raster
+    os.replace(staging, directory)
+    return TiledRaster(directory)
+
+
+def _write_flight_info(directory: str, captured_at: float):
+    with open(os.path.join(directory, FLIGHT_FILE), "w", encoding="utf-8") as f:
+        json.dump({"captured_at": captured_at}, f)
+
+
+def flight_time(raster: TiledRaster) -> float:
+    """航拍影像的拍摄时间(Unix 时间戳)"""
+    with open(os.path.join(raster.directory, FLIGHT_FILE), encoding="utf-8") as f:
+        return json.load(f)["captured_at"]
+
+
+def list_flights(name: str) -> List[TiledRaster]:
+    """RASTER_CONFIG["root"]/<name>/flights 下的全部航拍影像, 按拍摄先后排列"""
+    directory = os.path.join(RASTER_CONFIG["root"], name, "flights")
+    if not os.path.isdir(directory):
+        return []
+    return [TiledRaster(os.path.join(directory, entry)) for entry in sorted(os.listdir(directory))
+            if entry.isdigit() and TiledRaster.exists(os.path.join(directory, entry))]
+
+
+def load_flights(name: str, bounds: Tuple[float, float, float, float], seed: int = 0) -> List[TiledRaster]:
+    """地块的全部航拍影像, 尚无影像时生成首次模拟航拍(拍摄时间为 first_flight_age 秒前)"""
+    with _flight_lock:
+        flights = list_flights(name)
+        if not flights:
+            directory = os.path.join(RASTER_CONFIG["root"], name, "flights", "000")
+            flights = [simulate_flight(directory, bounds, seed,
+                                       captured_at=time.time() - CHANGE_CONFIG["first_flight_age"])]
+    return flights
+
+
+def simulate_next_flight(name: str, seed: int = 0, patches: int = 3) -> TiledRaster:
+    """在最近一次航拍的基础上生成下一次模拟航拍
+
+    复制上一次影像的全部波段(连同瓦片校验和与微区标签栅格), 只改写若干随机斑块
+    (长势增强或受损)覆盖的瓦片, 其余瓦片与上一次逐字节相同。
+    """
+    with _flight_lock:
+        previous = list_flights(name)[-1]
+        for band in previous.bands:
+            previous.checksums(band)
+        directory = os.path.join(os.path.dirname(previous.directory),
+                                 f"{int(os.path.basename(previous.directory)) + 1:03d}")
+        staging = directory + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(previous.directory, staging, ignore=shutil.ignore_patterns(*INDICES, "*.tmp"))
+        raster = TiledRaster(staging)
+
+        rng = np.random.default_rng(seed)
+        height_m, width_m = raster.height * raster.pixel_size, raster.width * raster.pixel_size
+        centers = rng.uniform(0, 1, (patches, 2)) * [height_m, width_m]
+        radii = rng.uniform(0.02, 0.06, patches) * min(height_m, width_m)
+        strengths = rng.uniform(0.3, 0.8, patches) * rng.choice([-1, 1], patches)
+        # 只有与斑块(3 倍半径内)相交的瓦片需要改写
+        span = raster.tile_size * raster.pixel_size
+        touched = set()
+        for (cy, cx), radius in zip(centers, radii):
+            for ty in range(max(int((cy - 3 * radius) // span), 0), min(int((cy + 3 * radius) // span) + 1,
+                                                                          raster.tiles_shape[0])):
+                for tx in range(max(int((cx - 3 * radius) // span), 0), min(int((cx + 3 * radius) // span) + 1,
+                                                                              raster.tiles_shape[1])):
+                    touched.add((ty, tx))
+
+        def modify(tile):
+            rows, cols = raster.tile_extent(*tile)
+            down, across = raster.tile_coordinates(*tile)
+            down, across = down[:rows, None], across[None, :cols]
+            gain = np.zeros((rows, cols))
+            loss = np.zeros((rows, cols))
+            for (cy, cx), radius, strength in zip(centers, radii, strengths):
+                distance = (down - cy) ** 2 + (across - cx) ** 2
+                weight = np.where(distance < (3 * radius) ** 2, abs(strength) * np.exp(-distance / (2 * radius ** 2)), 0)
+                if strength > 0:
+                    gain = np.maximum(gain, weight)
+                else:
+                    loss = np.maximum(loss, weight)
+            scale = RASTER_CONFIG["reflectance_scale"]
+            for i, band in enumerate(raster.bands):
+                reflectance = raster.read_tile(band, *tile).astype(float) / scale
+                reflectance += gain * (CANOPY_REFLECTANCE[i] - reflectance)
+                reflectance += loss * (SOIL_REFLECTANCE[i] - reflectance)
+                raster.write_tile(band, *tile, np.clip(reflectance * scale, 1, 65535).astype(np.uint16))
+
+        list(get_thread_pool().map(modify, sorted(touched)))
+        raster.flush()
+        _write_flight_info(staging, time.time())
+        del raster
+        os.replace(staging, directory)
+    return TiledRaster(directory)
+
+
+def rasterize_zones(raster: TiledRaster, south, west, north, east) -> TiledRaster:
+    """将矩形微区逐块栅格化为与影像同分块的标签栅格(int32, -1 表示不在任何微区内)
+
+    标签栅格存放在影像目录下的 zones_<微区数> 子目录, 已存在时直接打开, 同一影像
+    只栅格化一次。
+    """
+    directory = os.path.join(raster.directory, f"zones_{len(np.atleast_1d(south))}")
+    with _flight_lock:
+        if TiledRaster.exists(directory):
+            return TiledRaster(directory)
+        staging = directory + ".tmp"
+        labels = TiledRaster.create(staging, raster.height, raster.width, ("zone",), raster.bounds,
+                                    raster.pixel_size, dtype="<i4", tile_size=raster.tile_size)
+
+        def rasterize(tile):
+            lat, lon = raster.tile_centers(*tile)
+            labels.write_tile("zone", *tile, rasterize_boxes(south, west, north, east, lat, lon))
+
+        list(get_thread_pool().map(rasterize, labels.tiles()))
+        labels.flush()
+        del labels
+        os.replace(staging, directory)
+    return TiledRaster(directory)
+
+
+def tiled_zonal_stats(labels: TiledRaster, layer: TiledRaster, band: str, n_zones: int,
+                      value_range: Tuple[float, float], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+    """分块图层的分区统计: 各瓦片在线程池中分别累加, 再合并为各微区的统计量"""
+    if (labels.height, labels.width, labels.tile_size) != (layer.height, layer.width, layer.tile_size):
+        raise ValueError("标签栅格与图层的尺寸或分块不一致")
+
+    def accumulate(tile):
+        return ZonalAccumulator(n_zones, value_range).add(labels.read_tile("zone", *tile),
+                                                          layer.read_tile(band, *tile))
+
+    total = ZonalAccumulator(n_zones, value_range)
+    for partial in get_thread_pool().map(accumulate, layer.tiles()):
+        total.merge(partial)
+    return total.result(percentiles)
+
+
+def detect_changes(previous: TiledRaster, current: TiledRaster, band: str, labels: TiledRaster, n_zones: int,
+                   threshold: float = CHANGE_CONFIG["threshold"]) -> Dict:
+    """逐块比较两次航拍的同一指数栅格, 校验和相同的瓦片直接跳过
+
+    只读取内容变化的瓦片并在线程池中计算差值, 耗时与变化的瓦片数成正比。返回 zones
+    (各微区显著增长/退化的像元数 gain/loss 与指数差之和 delta_sum)、mask(显著变化
+    像元的稀疏掩膜 rows/cols/delta)、compared/skipped(比较与跳过的瓦片数)与 threshold。
+    """
+    if not (previous.same_grid(current) and labels.same_grid(current)):
+        raise ValueError("两次航拍或标签栅格的尺寸、分块不一致")
+    stale = previous.checksums(band) != current.checksums(band)
+    tiles = [tuple(int(v) for v in tile) for tile in np.argwhere(stale)]
+
+    def compare(tile):
+        delta, changed = tile_changes(previous.read_tile(band, *tile), current.read_tile(band, *tile), threshold)
+        return ChangeSummary(n_zones).add(labels.read_tile("zone", *tile), delta, changed,
+                                          tile[0] * current.tile_size, tile[1] * current.tile_size)
+
+    summary = ChangeSummary(n_zones)
+    for partial in get_thread_pool().map(compare, tiles):
+        summary.merge(partial)
+    return {
+        "zones": {"gain": summary.gain, "loss": summary.loss, "delta_sum": summary.delta_sum},
+        "mask": summary.mask(),
+        "compared": len(tiles),
+        "skipped": int(stale.size - len(tiles)),
+        "threshold": threshold
+    }
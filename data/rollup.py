@@ -0,0 +1,133 @@
+# 传感器历史数据的多分辨率预聚合(1分钟 / 1小时 / 1天)
+import os
+import numpy as np
+from typing import Optional, Tuple
+
+from utils.constants import HISTORY_CONFIG
+
+# 预聚合层级(秒), 由细到粗
+ROLLUP_LEVELS = (60, 3600, 86400)
+LEVEL_SUFFIX = {60: "1m", 3600: "1h", 86400: "1d"}
+
+# 每个聚合桶的统计量; 桶起点单独存放以便二分查找
+AGG_DTYPE = np.dtype([("sum", "<f8"), ("min", "<f4"), ("max", "<f4"), ("count", "<u4")])
+START_DTYPE = np.dtype("<i8")
+
+
+def plan_resolution(start: float, end: float, points: int = HISTORY_CONFIG["chart_points"]) -> int:
+    """查询规划: 选取仍能给出至少 points 个点的最粗分辨率(秒)
+
+    跨度不足 points 分钟时返回按跨度均分的秒数, 此时由原始数据分箱。
+    """
+    span = max(end - start, 1)
+    for level in reversed(ROLLUP_LEVELS):
+        if span // level >= points:
+            return level
+    return max(int(span // points), 1)
+
+
+def source_level(step: int) -> Optional[int]:
+    """分箱步长可直接由哪一级聚合合并得到(取能整除步长的最粗层级), None 表示需读原始数据"""
+    for level in reversed(ROLLUP_LEVELS):
+        if step >= level and step % level == 0:
+            return level
+    return None
+
+
+class RollupColumn:
+    """单个序列在某一分辨率上的聚合桶
+
+    与原始数据一样以只追加文件存储: <指标>.<层级>.i64 为桶起点,
+    <指标>.<层级>.agg 为 (sum, min, max, count)。新数据时间戳非递减, 只有最后
+    一个桶仍在累积: 该桶保存在内存中, 桶关闭(出现更晚的桶)时才写入文件,
+    实时上报时每批读数只做内存合并。未落盘的桶可由原始数据恢复(见 recover)。
+    """
+
+    def __init__(self, directory: str, metric: str, level: int):
+        self.level = level
+        self.starts_path = os.path.join(directory, f"{metric}.{LEVEL_SUFFIX[level]}.i64")
+        self.agg_path = os.path.join(directory, f"{metric}.{LEVEL_SUFFIX[level]}.agg")
+        self._length = -1
+        self._starts = np.empty(0, dtype=START_DTYPE)
+        self._agg = np.empty(0, dtype=AGG_DTYPE)
+        # 仍在累积的最后一个桶: (桶起点, (sum, min, max, count))
+        self._open: Optional[Tuple[int, Tuple]] = None
+
+    def _stored_length(self) -> int:
+        if not os.path.exists(self.starts_path):
+            return 0
+        return min(os.path.getsize(self.starts_path) // START_DTYPE.itemsize,
+                   os.path.getsize(self.agg_path) // AGG_DTYPE.itemsize)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """返回已落盘桶的 (桶起点, 聚合值) 只读内存映射"""
+        length = self._stored_length()
+        if length != self._length:
+            if length == 0:
+                self._starts = np.empty(0, dtype=START_DTYPE)
+                self._agg = np.empty(0, dtype=AGG_DTYPE)
+            else:
+                self._starts = np.memmap(self.starts_path, dtype=START_DTYPE, mode="r", shape=(length,))
+                self._agg = np.memmap(self.agg_path, dtype=AGG_DTYPE, mode="r", shape=(length,))
+            self._length = length
+        return self._starts, self._agg
+
+    def recover_from(self) -> Optional[int]:
+        """需要由原始数据重新聚合的起始时间戳(最后一个落盘桶之后), None 表示从头开始"""
+        starts, _ = self.arrays()
+        return int(starts[-1]) + self.level if len(starts) else None
+
+    @staticmethod
+    def _merge(a: Tuple, b: Tuple) -> Tuple:
+        return a[0] + b[0], min(a[1], b[1]), max(a[2], b[2]), a[3] + b[3]
+
+    def update(self, timestamps: np.ndarray, values: np.ndarray):
+        """并入一批已排序且不早于现有数据的读数(调用方持有序列锁)"""
+        if len(timestamps) == 0:
+            return
+        first = int(timestamps[0]) // self.level * self.level
+        if int(timestamps[-1]) // self.level * self.level == first:
+            # 常见情形: 实时上报的一批读数落在同一个桶内, 只做标量合并
+            stats = (float(values.sum(dtype=np.float64)), float(values.min()), float(values.max()), len(values))
+            if self._open is None or self._open[0] == first:
+                self._open = (first, stats if self._open is None else self._merge(self._open[1], stats))
+                return
+            starts = np.array([first], dtype=START_DTYPE)
+            records = np.array([stats], dtype=AGG_DTYPE)
+        else:
+            buckets = timestamps // self.level * self.level
+            bounds = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+            starts = buckets[bounds].astype(START_DTYPE)
+            records = np.empty(len(bounds), dtype=AGG_DTYPE)
+            records["sum"] = np.add.reduceat(values, bounds, dtype=np.float64)
+            records["min"] = np.minimum.reduceat(values, bounds)
+            records["max"] = np.maximum.reduceat(values, bounds)
+            records["count"] = np.diff(bounds, append=len(timestamps))
+
+        if self._open is not None:
+            if self._open[0] == starts[0]:
+                records[0] = self._merge(self._open[1], records[0].item())
+            else:
+                starts = np.concatenate(([self._open[0]], starts))
+                records = np.concatenate((np.array([self._open[1]], dtype=AGG_DTYPE), records))
+        if len(starts) > 1:
+            # 除最后一个桶外均已关闭, 追加落盘(先写聚合值, 读取方以桶起点文件长度为准)
+            with open(self.agg_path, "ab") as f:
+                records[:-1].tofile(f)
+            with open(self.starts_path, "ab") as f:
+                starts[:-1].tofile(f)
+        self._open = (int(starts[-1]), records[-1].item())
+
+    def range(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """返回桶起点落在 [start, end) 内的 (桶起点, 聚合值), 含内存中未关闭的桶"""
+        starts, agg = self.arrays()
+        lo = int(np.searchsorted(starts, start, side="left"))
+        hi = int(np.searchsorted(starts, end, side="left"))
+        current = self._open
+        if current is None or not start <= current[0] < end or (hi and starts[hi - 1] >= current[0]):
+            return starts[lo:hi], agg[lo:hi]
+        return (np.append(starts[lo:hi], current[0]),
+                np.concatenate((agg[lo:hi], np.array([current[1]], dtype=AGG_DTYPE))))
+
+    def __len__(self):
+        return self._stored_length() + (self._open is not None)
@@ -0,0 +1,341 @@
+# 传感器数据接入服务(asyncio)与本地网关模拟器
+import asyncio
+import contextlib
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+from algorithms.anomaly import StreamingAnomalyDetector
+from data.live_values import LastValueTable
+from data.timeseries_store import TimeSeriesStore, get_timeseries_store
+from utils.constants import HISTORY_CONFIG, INGEST_CONFIG, SENSOR_CONFIG
+
+# 指标顺序, 与 SENSOR_CONFIG["data_ranges"] 保持一致; 帧内以下标表示指标
+METRIC_NAMES = tuple(SENSOR_CONFIG["data_ranges"].keys())
+METRIC_MIN = np.array([SENSOR_CONFIG["data_ranges"][m]["min"] for m in METRIC_NAMES], dtype=np.float32)
+METRIC_MAX = np.array([SENSOR_CONFIG["data_ranges"][m]["max"] for m in METRIC_NAMES], dtype=np.float32)
+
+# 读数记录的二进制布局(小端, 无填充), 帧体可直接 np.frombuffer 解析
+READING_DTYPE = np.dtype([
+    ("sensor", "<u4"),      # 传感器编码, 见 sensor_code()
+    ("metric", "u1"),       # 指标下标
+    ("timestamp", "<f8"),   # Unix 时间戳(秒)
+    ("value", "<f4"),       # 读数
+])
+
+# 帧头: 魔数 + 帧类型 + 读数条数, 之后紧跟 count 条 READING_DTYPE 记录
+FRAME_MAGIC = b"SNSR"
+FRAME_READINGS = 1
+FRAME_HEADER = struct.Struct("<4sBI")
+
+
+def sensor_code(sensor_id: str) -> int:
+    """传感器编号(如 "S001-A1")映射为帧内使用的 32 位编码"""
+    return zlib.crc32(sensor_id.encode("utf-8"))
+
+
+def encode_frame(readings: np.ndarray) -> bytes:
+    """将 READING_DTYPE 数组编码为一个数据帧"""
+    readings = np.ascontiguousarray(readings, dtype=READING_DTYPE)
+    return FRAME_HEADER.pack(FRAME_MAGIC, FRAME_READINGS, len(readings)) + readings.tobytes()
+
+
+def validate_readings(readings: np.ndarray) -> np.ndarray:
+    """按 SENSOR_CONFIG["data_ranges"] 批量校验读数, 返回有效读数的布尔掩码"""
+    metric = readings["metric"]
+    value = readings["value"]
+    known = metric < len(METRIC_NAMES)
+    index = np.where(known, metric, 0)
+    return known & np.isfinite(value) & (value >= METRIC_MIN[index]) & (value <= METRIC_MAX[index])
+
+
+class SensorStore:
+    """进程内共享的传感器最新读数表
+
+    最新读数与时间戳存放在 LastValueTable 中, 接入服务按批原地写入,
+    页面按传感器编号无锁读取; 接入计数由单独的锁保护。
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self.live = LastValueTable(capacity)
+        self.accepted = 0
+        self.rejected = 0
+        self.frames = 0
+
+    def publish(self, readings: np.ndarray, rejected: int = 0):
+        """写入一批已校验的读数, 同一传感器同一指标只保留时间戳最新的一条"""
+        self.live.update(readings)
+        with self._lock:
+            self.frames += 1
+            self.rejected += rejected
+            self.accepted += len(readings)
+
+    def latest(self, code: int) -> Dict:
+        """读取传感器各指标的最新值, 返回 {"values": {指标: 读数}, "timestamp": 最近上报时间, "stale": 是否过期}"""
+        live = self.live.read([code])
+        values = live["values"][0]
+        present = np.isfinite(values)
+        timestamp = live["last_seen"][0]
+        return {
+            "values": {name: float(v) for name, v, ok in zip(METRIC_NAMES, values, present) if ok},
+            "timestamp": None if np.isnan(timestamp) else float(timestamp),
+            "stale": bool(live["stale"][0].all())
+        }
+
+    def snapshot(self, codes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """批量读取多个传感器的最新读数
+
+        返回 (values, timestamps): values 形状为 (n, n_metrics), 列顺序与 METRIC_NAMES 一致;
+        timestamps 为各传感器最近上报时间。未上报过的传感器与指标为 NaN。
+        """
+        live = self.live.read(codes)
+        return live["values"], live["last_seen"]
+
+    def stats(self) -> Dict:
+        """接入统计"""
+        with self._lock:
+            return {"sensors": len(self.live), "frames": self.frames,
+                    "accepted": self.accepted, "rejected": self.rejected}
+
+
+class SensorIngestServer:
+    """传感器数据接入服务
+
+    在本地套接字上接收网关发送的二进制数据帧, 每帧整体 np.frombuffer 解析、
+    批量校验后写入 SensorStore(提供 detector 时同步更新异常检测状态),
+    单核即可处理每秒数万条读数。提供 history 时读数只在内存中暂存, 由后台任务
+    每 flush_interval 秒(或暂存超过 flush_readings 条时)在线程池中按序列成批写入,
+    每个序列每 history_interval 秒只落盘一条, 磁盘写入不占用事件循环。
+    """
+
+    def __init__(self, store: Optional[SensorStore] = None, host: str = INGEST_CONFIG["host"],
+                 port: int = INGEST_CONFIG["port"], max_frame_readings: int = INGEST_CONFIG["max_frame_readings"],
+                 history: Optional[TimeSeriesStore] = None,
+                 detector: Optional[StreamingAnomalyDetector] = None,
+                 history_interval: int = HISTORY_CONFIG["persist_interval"]):
+        self.store = SensorStore() if store is None else store
+        self.history = history
+        self.detector = detector
+        self.history_interval = history_interval
+        self.host = host
+        self.port = port
+        self.max_frame_readings = max_frame_readings
+        self.protocol_errors = 0
+        self.history_errors = 0
+        self._server = None
+        self._flusher = None
+        self._flush_now = None
+
+    async def start(self):
+        """启动监听(及历史数据落盘任务), 端口为0时回填系统分配的端口"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.history is not None:
+            self._flush_now = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_history())
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher
+            # 写入停止前暂存的读数
+            await asyncio.get_running_loop().run_in_executor(None, self.history.flush, self.history_interval)
+
+    async def _flush_history(self):
+        """定期在线程池中将暂存的读数写入历史存储, 单次写入失败只计数, 不终止任务"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._flush_now.wait(), HISTORY_CONFIG["flush_interval"])
+            self._flush_now.clear()
+            try:
+                await loop.run_in_executor(None, self.history.flush, self.history_interval)
+            except Exception:
+                self.history_errors += 1
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """逐帧读取一个网关连接的数据, 协议错误时断开该连接"""
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                magic, frame_type, count = FRAME_HEADER.unpack(header)
+                if magic != FRAME_MAGIC or frame_type != FRAME_READINGS or count > self.max_frame_readings:
+                    self.protocol_errors += 1
+                    break
+                body = await reader.readexactly(count * READING_DTYPE.itemsize)
+                readings = np.frombuffer(body, dtype=READING_DTYPE)
+                valid = validate_readings(readings)
+                accepted = readings[valid]
+                self.store.publish(accepted, rejected=int(len(readings) - len(accepted)))
+                if self.detector is not None:
+                    self.detector.update(accepted)
+                if self.history is not None and self.history.buffer(accepted) >= HISTORY_CONFIG["flush_readings"]:
+                    self._flush_now.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class GatewaySimulator:
+    """本地网关模拟器: 按固定间隔为一组传感器生成全部指标的读数并成帧发送"""
+
+    # 模拟读数的基准值与波动幅度
+    BASELINE = {"temperature": 18.5, "humidity": 65.2, "ph_value": 6.8, "salinity": 0.35,
+                "nitrogen": 45.2, "phosphorus": 28.1, "potassium": 156.8}
+    NOISE = {"temperature": 0.5, "humidity": 2.0, "ph_value": 0.05, "salinity": 0.02,
+             "nitrogen": 1.5, "phosphorus": 1.0, "potassium": 3.0}
+
+    def __init__(self, sensor_ids: Sequence[str], host: str, port: int,
+                 interval: float = INGEST_CONFIG["simulate_interval"], invalid_rate: float = 0.0,
+                 spike_rate: float = INGEST_CONFIG["simulated_spike_rate"], seed: Optional[int] = None):
+        self.sensor_ids = list(sensor_ids)
+        self.codes = np.array([sensor_code(s) for s in self.sensor_ids], dtype=np.uint32)
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.invalid_rate = invalid_rate
+        self.spike_rate = spike_rate
+        self.rng = np.random.default_rng(seed)
+        self.sent = 0
+        # 每个传感器的基准偏移, 模拟地块内的空间差异
+        baseline = np.array([self.BASELINE[m] for m in METRIC_NAMES])
+        noise = np.array([self.NOISE[m] for m in METRIC_NAMES])
+        self._noise = noise
+        self._baseline = baseline + self.rng.normal(0, 2 * noise, (len(self.sensor_ids), len(METRIC_NAMES)))
+
+    def make_readings(self, timestamp: Optional[float] = None) -> np.ndarray:
+        """生成一轮(全部传感器 × 全部指标)读数"""
+        timestamp = time.time() if timestamp is None else timestamp
+        n_sensors, n_metrics = self._baseline.shape
+        readings = np.empty(n_sensors * n_metrics, dtype=READING_DTYPE)
+        readings["sensor"] = np.repeat(self.codes, n_metrics)
+        readings["metric"] = np.tile(np.arange(n_metrics, dtype=np.uint8), n_sensors)
+        readings["timestamp"] = timestamp
+        values = self._baseline + self.rng.normal(0, self._noise, self._baseline.shape)
+        if self.spike_rate > 0:
+            # 偶发尖峰读数(量程内), 供异常检测演示
+            spikes = self.rng.random(values.shape) < self.spike_rate
+            jump = self.rng.choice([-12.0, 12.0], values.shape) * self._noise
+            values = np.clip(np.where(spikes, values + jump, values), METRIC_MIN, METRIC_MAX)
+        readings["value"] = values.ravel()
+        if self.invalid_rate > 0:
+            # 按比例注入越界读数, 用于验证接入端的校验
+            bad = self.rng.random(len(readings)) < self.invalid_rate
+            readings["value"][bad] = -999.0
+        return readings
+
+    def make_history(self, timestamps: np.ndarray) -> np.ndarray:
+        """生成历史读数, 形状为 (n_sensors, n_metrics, n_times), 温湿度带日变化"""
+        timestamps = np.asarray(timestamps, dtype=float)
+        # 以当地 14 时为温度峰值的日变化, 湿度与温度反相
+        phase = np.sin(2 * np.pi * ((timestamps / 3600 + 8) % 24 - 8) / 24)
+        diurnal = np.zeros((len(METRIC_NAMES), len(timestamps)))
+        diurnal[METRIC_NAMES.index("temperature")] = 4.0 * phase
+        diurnal[METRIC_NAMES.index("humidity")] = -8.0 * phase
+        noise = self.rng.normal(0, 1, (len(self.sensor_ids), len(METRIC_NAMES), len(timestamps)))
+        values = self._baseline[:, :, None] + diurnal[None] + noise * self._noise[None, :, None]
+        return np.clip(values, METRIC_MIN[:, None], METRIC_MAX[:, None]).astype(np.float32)
+
+    def backfill(self, history: TimeSeriesStore, days: float = HISTORY_CONFIG["backfill_days"],
+                 step: int = HISTORY_CONFIG["backfill_step"]) -> int:
+        """为尚无历史数据的传感器回填最近若干天的读数, 返回写入条数"""
+        end = int(time.time()) // step * step
+        timestamps = np.arange(end - int(days * 86400), end, step, dtype=np.int64)
+        pending = [i for i, code in enumerate(self.codes) if history.is_empty(int(code), METRIC_NAMES[0])]
+        if not pending:
+            return 0
+        values = self.make_history(timestamps)
+        written = 0
+        for i in pending:
+            for m in range(len(METRIC_NAMES)):
+                written += history.append(int(self.codes[i]), m, timestamps, values[i, m])
+        return written
+
+    async def run(self, rounds: Optional[int] = None):
+        """连接接入服务并持续上报; rounds 为 None 时一直运行"""
+        _, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            sent_rounds = 0
+            while rounds is None or sent_rounds < rounds:
+                readings = self.make_readings()
+                writer.write(encode_frame(readings))
+                await writer.drain()
+                self.sent += len(readings)
+                sent_rounds += 1
+                if self.interval > 0:
+                    await asyncio.sleep(self.interval)
+        finally:
+            writer.close()
+
+
+class IngestService:
+    """在后台线程的事件循环中运行接入服务(及可选的网关模拟器), 供 Streamlit 页面共享
+
+    接入的读数同时写入最新值表、异常检测器与历史存储(按 persist_interval 抽稀后落盘);
+    启用模拟器时先为空的传感器回填历史, 模拟器异常退出时的异常记录在 simulator_error。
+    """
+
+    def __init__(self, simulate: bool = True):
+        self.loop = asyncio.new_event_loop()
+        self.history = get_timeseries_store()
+        self.detector = StreamingAnomalyDetector()
+        self.server = SensorIngestServer(history=self.history, detector=self.detector)
+        self.store = self.server.store
+        self.simulator = None
+        self.simulator_future = None
+        self.simulator_error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="sensor-ingest", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        if simulate:
+            self.simulator = GatewaySimulator(simulated_sensor_ids(), self.server.host, self.server.port)
+            self.simulator.backfill(self.history)
+            self.simulator_future = asyncio.run_coroutine_threadsafe(self.simulator.run(), self.loop)
+            self.simulator_future.add_done_callback(self._simulator_done)
+
+    def _simulator_done(self, future):
+        """模拟器任务结束时记录其异常(连接失败、编码错误等), 停止服务时的取消不算异常"""
+        if not future.cancelled():
+            self.simulator_error = future.exception()
+
+    def stop(self):
+        if self.simulator_future is not None:
+            self.simulator_future.cancel()
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.history.close()
+
+
+def plot_sensor_ids(plot_id: str, zones: int) -> list:
+    """地块内传感器编号: 每个微区 len(zone_sensor_types) 个, 按网关规则编号如 S001-A1"""
+    count = zones * len(INGEST_CONFIG["zone_sensor_types"])
+    return [f"S{int(plot_id[1:]):03d}-A{k}" for k in range(1, count + 1)]
+
+
+def simulated_sensor_ids(plots: Optional[Dict[str, int]] = None) -> list:
+    """模拟器使用的传感器编号: simulated_plots 中各地块全部微区的传感器"""
+    plots = INGEST_CONFIG["simulated_plots"] if plots is None else plots
+    return [sensor_id for plot_id, zones in plots.items() for sensor_id in plot_sensor_ids(plot_id, zones)]
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ingest_service() -> IngestService:
+    """获取进程内共享的接入服务, 首次调用时启动"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = IngestService()
+        return _service
@@ -0,0 +1,190 @@
+# 栅格热力图的多级瓦片金字塔: uint8 量化、按视口选取层级与范围
+import json
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from data.raster_store import TiledRaster, get_thread_pool
+from utils.constants import PYRAMID_CONFIG
+
+# 量化编码: 0 表示无数据, 1-255 对应值域内等分的 255 个等级
+NODATA_CODE = 0
+LEVELS = 255
+
+# 色带锚点(由低到高), 查找表在锚点间线性插值
+COLORMAPS = {
+    "RdYlGn": ("#a50026", "#d73027", "#f46d43", "#fdae61", "#fee08b", "#ffffbf",
+               "#d9ef8b", "#a6d96a", "#66bd63", "#1a9850", "#006837"),
+    "Viridis": ("#440154", "#482878", "#3e4989", "#31688e", "#26828e", "#1f9e89",
+                "#35b779", "#6ece58", "#b5de2b", "#fde725"),
+}
+
+META_FILE = "pyramid.json"
+
+
+def quantize(values: np.ndarray, value_range: Tuple[float, float]) -> np.ndarray:
+    """将数值量化为 uint8 编码, NaN 为 NODATA_CODE, 超出值域的截断到两端"""
+    low, high = value_range
+    scaled = np.clip((np.asarray(values, dtype=np.float32) - low) / (high - low), 0, 1)
+    codes = np.rint(scaled * (LEVELS - 1)).astype(np.uint8) + 1
+    codes[np.isnan(values)] = NODATA_CODE
+    return codes
+
+
+def dequantize(codes: np.ndarray, value_range: Tuple[float, float]) -> np.ndarray:
+    """uint8 编码还原为数值(各等级的代表值), 无数据为 NaN"""
+    low, high = value_range
+    values = low + (codes.astype(np.float32) - 1) * np.float32((high - low) / (LEVELS - 1))
+    values[codes == NODATA_CODE] = np.nan
+    return values
+
+
+def downsample(values: np.ndarray) -> np.ndarray:
+    """2 × 2 块均值降采样(忽略 NaN), 奇数边长时末行/列单独成块"""
+    rows, cols = values.shape
+    padded = np.full((rows + rows % 2, cols + cols % 2), np.nan, dtype=np.float32)
+    padded[:rows, :cols] = values
+    blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+    valid = ~np.isnan(blocks)
+    count = valid.sum(axis=(1, 3))
+    total = np.where(valid, blocks, 0).sum(axis=(1, 3))
+    return np.divide(total, count, out=np.full(count.shape, np.nan, dtype=np.float32), where=count > 0)
+
+
+def colormap_lut(name: str = PYRAMID_CONFIG["colormap"]) -> np.ndarray:
+    """色带查找表 (256, 4) RGBA uint8, 下标为量化编码, NODATA_CODE 为全透明"""
+    anchors = np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in COLORMAPS[name]], dtype=float)
+    position = np.linspace(0, 1, LEVELS)
+    stops = np.linspace(0, 1, len(anchors))
+    lut = np.zeros((LEVELS + 1, 4), dtype=np.uint8)
+    lut[1:, :3] = np.rint(np.column_stack([np.interp(position, stops, anchors[:, c]) for c in range(3)]))
+    lut[1:, 3] = 255
+    return lut
+
+
+def plotly_colorscale(lut: np.ndarray) -> List[list]:
+    """查找表转为 plotly 色阶(配合 zmin=0, zmax=255 使每个编码精确对应一种颜色)"""
+    return [[code / LEVELS, f"rgba({r},{g},{b},{a / 255:g})"] for code, (r, g, b, a) in enumerate(lut)]
+
+
+class TilePyramid:
+    """单波段分块栅格的多级金字塔
+
+    第 0 级为源栅格本身(浮点), 第 k 级为 2^k 倍降采样的 uint8 量化编码, 与源栅格同样
+    分块存储于源栅格目录的 pyramid 子目录, 逐级减半直到最大边长不超过 top_size。
+    读取时按视口范围与图表尺寸选取最粗而不失细节的层级, 只访问与视口相交的瓦片,
+    返回的编码数组不超过字节预算。
+    """
+
+    def __init__(self, source: TiledRaster, band: str):
+        with open(os.path.join(source.directory, "pyramid", META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.source = source
+        self.band = band
+        self.value_range = tuple(meta["value_range"])
+        self.levels = [source] + [TiledRaster(os.path.join(source.directory, "pyramid", f"L{k}"))
+                                  for k in range(1, meta["levels"])]
+
+    @classmethod
+    def build(cls, source: TiledRaster, band: str, value_range: Tuple[float, float],
+              top_size: int = PYRAMID_CONFIG["top_size"],
+              changed: Optional[Sequence[Tuple[int, int]]] = None) -> "TilePyramid":
+        """由源栅格逐级构建金字塔, 每级的各瓦片在线程池中并行生成
+
+        第 1 级由源栅格的浮点值降采样, 更高层级由上一级的编码还原后降采样(每级的
+        舍入误差不超过半个量化等级)。给出 changed(源栅格中内容变化的瓦片)且金字塔
+        已存在(如随源栅格一起从上一次结果复制而来)时只重建覆盖这些瓦片的上级瓦片,
+        否则完整重建。
+        """
+        directory = os.path.join(source.directory, "pyramid")
+        meta_path = os.path.join(directory, META_FILE)
+        if changed is not None and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if tuple(meta["value_range"]) != tuple(value_range):
+                changed = None
+        else:
+            changed = None
+        os.makedirs(directory, exist_ok=True)
+        # 构建期间移除元数据, 中断后下次构建会完整重建
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        pending: Optional[Set[Tuple[int, int]]] = None if changed is None else set(changed)
+        previous, level = source, 1
+        while max(previous.height, previous.width) > top_size:
+            path = os.path.join(directory, f"L{level}")
+            if pending is None or not TiledRaster.exists(path):
+                pending = None
+                current = TiledRaster.create(path, -(-previous.height // 2), -(-previous.width // 2), ("code",),
+                                             source.bounds, previous.pixel_size * 2, dtype="u1",
+                                             tile_size=source.tile_size)
+            else:
+                # 第 k 级瓦片 (ty, tx) 由第 k-1 级的 (2ty..2ty+1, 2tx..2tx+1) 四个瓦片降采样而来
+                current = TiledRaster(path)
+                pending = {(ty // 2, tx // 2) for ty, tx in pending}
+
+            def reduce(tile, previous=previous, current=current, level=level):
+                ty, tx = tile
+                t = current.tile_size
+                window = previous.read_window(band if level == 1 else "code",
+                                              2 * ty * t, 2 * (ty + 1) * t, 2 * tx * t, 2 * (tx + 1) * t)
+                if level > 1:
+                    window = dequantize(window, value_range)
+                current.write_tile("code", ty, tx, quantize(downsample(window), value_range))
+
+            list(get_thread_pool().map(reduce, current.tiles() if pending is None else sorted(pending)))
+            current.flush()
+            previous, level = current, level + 1
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"levels": level, "value_range": list(value_range)}, f)
+        return cls(source, band)
+
+    def choose_level(self, rows: int, cols: int, width: int, height: int, byte_budget: int) -> int:
+        """第 0 级像元范围 rows × cols 在 width × height 像素的图表中显示时使用的层级"""
+        for level in range(len(self.levels)):
+            r, c = -(-rows // 2 ** level), -(-cols // 2 ** level)
+            if r <= height and c <= width and r * c <= byte_budget:
+                return level
+        return len(self.levels) - 1
+
+    def read(self, extent: Optional[Sequence[float]] = None, width: int = PYRAMID_CONFIG["chart_width"],
+             height: int = PYRAMID_CONFIG["chart_height"], byte_budget: int = PYRAMID_CONFIG["byte_budget"]) -> Dict:
+        """读取视口内的量化编码
+
+        extent 为 (西, 东, 南, 北) 方向相对源栅格西南角的距离(米), 默认为全幅。返回
+        codes(uint8, 行由南向北)、x/y(单元中心相对西南角的东向/北向距离, 米, 边缘不完整的
+        单元截断到影像边界)、level、
+        stride(顶层仍超出预算时的抽样步长)与 value_range。
+        """
+        base = self.source
+        extent_m = (0, base.width * base.pixel_size, 0, base.height * base.pixel_size)
+        x0, x1, y0, y1 = extent_m if extent is None else extent
+        col0, col1 = int(np.floor(x0 / base.pixel_size)), int(np.ceil(x1 / base.pixel_size))
+        row0 = int(np.floor((base.height * base.pixel_size - y1) / base.pixel_size))
+        row1 = int(np.ceil((base.height * base.pixel_size - y0) / base.pixel_size))
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(max(row1, row0 + 1), base.height), min(max(col1, col0 + 1), base.width)
+
+        level = self.choose_level(row1 - row0, col1 - col0, width, height, byte_budget)
+        raster, scale = self.levels[level], 2 ** level
+        r0, r1 = row0 // scale, -(-row1 // scale)
+        c0, c1 = col0 // scale, -(-col1 // scale)
+        if level == 0:
+            codes = quantize(raster.read_window(self.band, r0, r1, c0, c1), self.value_range)
+        else:
+            codes = raster.read_window("code", r0, r1, c0, c1)
+        # 顶层仍超出字节预算(视口极大而预算极小)时等步长抽样
+        stride = 1
+        while -(-codes.shape[0] // stride) * -(-codes.shape[1] // stride) > byte_budget:
+            stride += 1
+        codes = codes[::stride, ::stride]
+        rows = r0 + np.arange(codes.shape[0]) * stride
+        cols = c0 + np.arange(codes.shape[1]) * stride
+        return {
+            "codes": codes[::-1],
+            "x": np.minimum((cols + 0.5) * raster.pixel_size, extent_m[1]),
+            "y": np.maximum(extent_m[3] - (rows + 0.5) * raster.pixel_size, 0)[::-1],
+            "level": level,
+            "stride": stride,
+            "value_range": self.value_range
+        }
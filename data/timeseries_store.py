@@ -0,0 +1,334 @@
+# 传感器历史数据列式存储(内存映射)
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from data.rollup import ROLLUP_LEVELS, RollupColumn, plan_resolution, source_level
+from utils.constants import HISTORY_CONFIG, SENSOR_CONFIG
+
+# 指标顺序, 与 SENSOR_CONFIG["data_ranges"] 保持一致
+METRIC_NAMES = tuple(SENSOR_CONFIG["data_ranges"].keys())
+
+VALUE_DTYPE = np.dtype("<f4")
+TIME_DTYPE = np.dtype("<i8")
+
+
+class SeriesColumn:
+    """单个 (传感器, 指标) 序列: 一个 float32 数值文件加一个 int64 时间戳文件
+
+    两个文件都只追加写入, 读取时按当前长度内存映射, 时间范围查询通过
+    二分查找定位后直接切片, 返回的是映射数组的视图, 不复制也不整体读入内存。
+    时间戳要求非递减, 早于已存最新时间戳的迟到数据会被丢弃; 最新时间戳保存在内存中,
+    追加句柄在首次写入时打开并保持到 release()。
+    每次追加同时增量更新 1分钟/1小时/1天 三级预聚合(见 data.rollup)。
+    """
+
+    # 由原始数据重建预聚合时每块读取的条数
+    REBUILD_CHUNK = 1 << 20
+
+    def __init__(self, directory: str, metric: str):
+        self.values_path = os.path.join(directory, f"{metric}.f32")
+        self.times_path = os.path.join(directory, f"{metric}.i64")
+        self._lock = threading.Lock()
+        self._length = -1
+        self._times = np.empty(0, dtype=TIME_DTYPE)
+        self._values = np.empty(0, dtype=VALUE_DTYPE)
+        # (数值文件, 时间戳文件) 的追加句柄
+        self._files = None
+        self._last = self._tail_timestamp()
+        self.late_points = 0
+        self.rollups = {level: RollupColumn(directory, metric, level) for level in ROLLUP_LEVELS}
+        self._recover_rollups()
+
+    def _recover_rollups(self):
+        """由原始数据补齐预聚合: 进程退出时未落盘的桶, 以及早于预聚合功能写入的数据"""
+        times, values = self.arrays()
+        with self._lock:
+            for rollup in self.rollups.values():
+                begin = rollup.recover_from()
+                lo = 0 if begin is None else int(np.searchsorted(times, begin, side="left"))
+                for chunk in range(lo, len(times), self.REBUILD_CHUNK):
+                    rollup.update(np.asarray(times[chunk:chunk + self.REBUILD_CHUNK]),
+                                  np.asarray(values[chunk:chunk + self.REBUILD_CHUNK]))
+
+    def _stored_length(self) -> int:
+        """文件中完整记录的条数(两个文件取较短者, 容忍写入中断留下的残缺尾部)"""
+        if not os.path.exists(self.times_path):
+            return 0
+        return min(os.path.getsize(self.times_path) // TIME_DTYPE.itemsize,
+                   os.path.getsize(self.values_path) // VALUE_DTYPE.itemsize)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (时间戳, 数值) 的只读内存映射, 文件增长后重新映射"""
+        length = self._stored_length()
+        if length != self._length:
+            with self._lock:
+                if length == 0:
+                    self._times = np.empty(0, dtype=TIME_DTYPE)
+                    self._values = np.empty(0, dtype=VALUE_DTYPE)
+                else:
+                    self._times = np.memmap(self.times_path, dtype=TIME_DTYPE, mode="r", shape=(length,))
+                    self._values = np.memmap(self.values_path, dtype=VALUE_DTYPE, mode="r", shape=(length,))
+                self._length = length
+        return self._times, self._values
+
+    def last_timestamp(self) -> Optional[int]:
+        times, _ = self.arrays()
+        return int(times[-1]) if len(times) else None
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray, min_interval: int = 0) -> int:
+        """按时间顺序追加一批数据, 返回实际写入的条数
+
+        min_interval 大于 0 时每 min_interval 秒的间隔内只保留第一条(已存最新读数所在的
+        间隔不再写入), 用于高频实时上报的抽稀落盘。
+        """
+        timestamps = np.asarray(timestamps, dtype=TIME_DTYPE)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+        with self._lock:
+            last = self._last
+            if last is not None:
+                keep = timestamps >= last
+                self.late_points += int(len(keep) - keep.sum())
+                timestamps, values = timestamps[keep], values[keep]
+            if min_interval > 0 and len(timestamps):
+                buckets = timestamps // min_interval
+                keep = np.r_[True, buckets[1:] != buckets[:-1]]
+                if last is not None:
+                    keep &= buckets > last // min_interval
+                timestamps, values = timestamps[keep], values[keep]
+            if len(timestamps) == 0:
+                return 0
+            if self._files is None:
+                self._files = (open(self.values_path, "ab"), open(self.times_path, "ab"))
+            values_file, times_file = self._files
+            # 先写数值再写时间戳: 读取方以时间戳文件长度为准, 不会读到未写完的记录
+            values_file.write(values.tobytes())
+            values_file.flush()
+            times_file.write(timestamps.tobytes())
+            times_file.flush()
+            self._last = int(timestamps[-1])
+            for rollup in self.rollups.values():
+                rollup.update(timestamps, values)
+        return len(timestamps)
+
+    def release(self):
+        """关闭追加句柄, 下次写入时重新打开"""
+        with self._lock:
+            if self._files is not None:
+                for f in self._files:
+                    f.close()
+                self._files = None
+
+    def _tail_timestamp(self) -> Optional[int]:
+        """读取文件末尾的时间戳(仅在打开序列时调用一次)"""
+        length = self._stored_length()
+        if length == 0:
+            return None
+        with open(self.times_path, "rb") as f:
+            f.seek((length - 1) * TIME_DTYPE.itemsize)
+            return int(np.frombuffer(f.read(TIME_DTYPE.itemsize), dtype=TIME_DTYPE)[0])
+
+    def range(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 start <= 时间戳 < end 的 (时间戳, 数值) 视图, 二分查找 O(log n)"""
+        times, values = self.arrays()
+        lo = int(np.searchsorted(times, start, side="left"))
+        hi = int(np.searchsorted(times, end, side="left"))
+        return times[lo:hi], values[lo:hi]
+
+    def __len__(self):
+        return self._stored_length()
+
+
+class TimeSeriesStore:
+    """传感器历史数据的列式存储
+
+    目录结构为 root/<传感器编码(8位十六进制)>/<指标>.f32|.i64, 每个
+    (传感器, 指标) 一对只追加文件, 多年5分钟粒度的数据也只按需分页读入。
+    传感器以 32 位编码标识(见 data.sensor_ingest.sensor_code)。
+    实时接入的读数先由 buffer() 暂存在内存中(最多 max_pending 条, 超出时丢弃最早的读数),
+    再由 flush() 按序列成批写入;
+    保持追加句柄打开的序列数不超过 max_open_series(最久未写入的先关闭)。
+    """
+
+    def __init__(self, root: str = HISTORY_CONFIG["root"],
+                 max_open_series: int = HISTORY_CONFIG["max_open_series"],
+                 max_pending: int = HISTORY_CONFIG["max_pending"]):
+        self.root = root
+        self.max_open_series = max_open_series
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._series: Dict[Tuple[int, str], SeriesColumn] = {}
+        self._open: "OrderedDict[Tuple[int, str], SeriesColumn]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: List[np.ndarray] = []
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _metric_name(metric: Union[int, str]) -> str:
+        return METRIC_NAMES[metric] if isinstance(metric, (int, np.integer)) else metric
+
+    def series(self, sensor: int, metric: Union[int, str]) -> SeriesColumn:
+        """获取 (传感器, 指标) 序列, 不存在时创建目录"""
+        key = (int(sensor), self._metric_name(metric))
+        column = self._series.get(key)
+        if column is None:
+            with self._lock:
+                column = self._series.get(key)
+                if column is None:
+                    directory = os.path.join(self.root, f"{key[0]:08x}")
+                    os.makedirs(directory, exist_ok=True)
+                    column = self._series[key] = SeriesColumn(directory, key[1])
+        return column
+
+    def append(self, sensor: int, metric: Union[int, str], timestamps, values, min_interval: int = 0) -> int:
+        """向单个序列追加数据"""
+        key = (int(sensor), self._metric_name(metric))
+        column = self.series(*key)
+        written = column.append(timestamps, values, min_interval)
+        if written:
+            self._touch(key, column)
+        return written
+
+    def _touch(self, key: Tuple[int, str], column: SeriesColumn):
+        """记录最近写入的序列, 超出 max_open_series 时关闭最久未写入序列的句柄"""
+        with self._lock:
+            self._open[key] = column
+            self._open.move_to_end(key)
+            victims = [self._open.popitem(last=False)[1] for _ in range(len(self._open) - self.max_open_series)]
+        # 在存储锁之外关闭, 避免与持有序列锁的写入方互相等待
+        for victim in victims:
+            victim.release()
+
+    def append_readings(self, readings: np.ndarray, min_interval: int = 0) -> int:
+        """按 (传感器, 指标) 分组追加一批接入读数(READING_DTYPE 结构化数组)"""
+        if len(readings) == 0:
+            return 0
+        order = np.lexsort((readings["timestamp"], readings["metric"], readings["sensor"]))
+        grouped = readings[order]
+        keys = grouped["sensor"].astype(np.int64) * len(METRIC_NAMES) + grouped["metric"]
+        bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+        written = 0
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            group = grouped[lo:hi]
+            written += self.append(int(group["sensor"][0]), int(group["metric"][0]),
+                                   np.floor(group["timestamp"]), group["value"], min_interval)
+        return written
+
+    def buffer(self, readings: np.ndarray) -> int:
+        """暂存一批接入读数(只做内存追加, 可在事件循环中调用), 返回当前暂存的总条数
+
+        暂存总数超过 max_pending 时(落盘停滞或持续失败)丢弃最早的读数, 计入 dropped。
+        """
+        with self._pending_lock:
+            self._pending.append(readings)
+            self._pending_count += len(readings)
+            excess = self._pending_count - self.max_pending
+            while excess > 0:
+                oldest = self._pending[0]
+                if len(oldest) <= excess:
+                    self._pending.pop(0)
+                    dropped = len(oldest)
+                else:
+                    self._pending[0] = oldest[excess:]
+                    dropped = excess
+                self._pending_count -= dropped
+                self.dropped += dropped
+                excess -= dropped
+            return self._pending_count
+
+    def flush(self, min_interval: int = 0) -> int:
+        """将暂存的读数按 (传感器, 指标) 分组写入, 返回写入条数; 供工作线程调用, 多次调用按序执行"""
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending, self._pending_count = self._pending, [], 0
+            if not pending:
+                return 0
+            return self.append_readings(np.concatenate(pending), min_interval)
+
+    def close(self, min_interval: int = 0):
+        """写入暂存的读数并关闭全部追加句柄"""
+        self.flush(min_interval)
+        with self._lock:
+            columns = list(self._open.values())
+            self._open.clear()
+        for column in columns:
+            column.release()
+
+    def range(self, sensor: int, metric: Union[int, str], start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """时间范围查询, 返回零拷贝视图"""
+        return self.series(sensor, metric).range(start, end)
+
+    def is_empty(self, sensor: int, metric: Union[int, str]) -> bool:
+        return len(self.series(sensor, metric)) == 0
+
+    def aggregate(self, sensors, metric: Union[int, str], start: float, end: float, step: int) -> Dict:
+        """多个传感器在 [start, end) 内按 step 秒分箱的 min/max/mean/count
+
+        step 为某级预聚合的整数倍时直接合并该级聚合桶(取最粗的一级),
+        读取量只与箱数有关、与原始数据密度无关; 否则回退到原始数据分箱。
+        """
+        step = int(step)
+        start = start // step * step
+        n_bins = max(int(np.ceil((end - start) / step)), 1)
+        sums = np.zeros(n_bins)
+        counts = np.zeros(n_bins)
+        mins = np.full(n_bins, np.inf)
+        maxs = np.full(n_bins, -np.inf)
+        level = source_level(step)
+        for sensor in sensors:
+            column = self.series(sensor, metric)
+            if level is None:
+                times, values = column.range(start, end)
+                bins = ((times - start) // step).astype(np.intp)
+                counts += np.bincount(bins, minlength=n_bins)[:n_bins]
+                sums += np.bincount(bins, weights=values.astype(float), minlength=n_bins)[:n_bins]
+                np.minimum.at(mins, bins, values)
+                np.maximum.at(maxs, bins, values)
+            else:
+                starts, agg = column.rollups[level].range(start, end)
+                bins = ((starts - start) // step).astype(np.intp)
+                counts += np.bincount(bins, weights=agg["count"], minlength=n_bins)[:n_bins]
+                sums += np.bincount(bins, weights=agg["sum"], minlength=n_bins)[:n_bins]
+                np.minimum.at(mins, bins, agg["min"])
+                np.maximum.at(maxs, bins, agg["max"])
+        empty = counts == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(empty, np.nan, sums / counts)
+        mins[empty] = np.nan
+        maxs[empty] = np.nan
+        return {"time": start + step * np.arange(n_bins), "mean": mean, "min": mins, "max": maxs,
+                "count": counts.astype(np.int64), "step": step}
+
+    def query(self, sensors, metric: Union[int, str], start: float, end: float,
+              points: int = HISTORY_CONFIG["chart_points"]) -> Dict:
+        """趋势图查询: 由查询规划选取满足 points 个点的最粗分辨率后聚合
+
+        points 通常按图表宽度给出; 一年跨度按天、一天跨度按小时读取,
+        两者读取的聚合桶数量相当, 绘图耗时基本一致。
+        """
+        return self.aggregate(sensors, metric, start, end, plan_resolution(start, end, points))
+
+    def trend(self, sensors, metric: Union[int, str], start: float, end: float, step: float):
+        """多个传感器在 [start, end) 内按 step 秒分箱的平均趋势, 返回 (箱起点时间戳, 均值)"""
+        result = self.aggregate(sensors, metric, start, end, step)
+        return result["time"], result["mean"]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_timeseries_store() -> TimeSeriesStore:
+    """获取进程内共享的历史数据存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TimeSeriesStore()
+        return _store
@@ -3,9 +3,36 @@ import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
+import time
 from datetime import datetime, timedelta
 from components.layout import create_page_header, create_recommendation_card, create_sensor_status_badge, create_compact_metric
-from utils.constants import PLANTING_SEASONS, RISK_PREFERENCES, TARGET_USES, SENSOR_CONFIG
+from utils.constants import PLANTING_SEASONS, RISK_PREFERENCES, TARGET_USES, SENSOR_CONFIG, YIELD_PREFERENCES
+from algorithms.recommendation import (
+    IncrementalScorer, cached_recommend_crops, cached_recommend_batch, get_crop_catalog,
+    recommendation_cache_stats, sensor_vector
+)
+from algorithms.rotation import DEFAULT_ROTATION_CROPS, plan_rotation
+from data.sensor_ingest import get_ingest_service, sensor_code
+from algorithms.scenario import run_scenario_sweep
+
+# 可选地块及其土壤环境基线
+PLOT_OPTIONS = [
+    "示范地块A (50亩) - 优质土壤",
+    "试验地块B (30亩) - 中等土壤", 
+    "生产地块C (80亩) - 盐碱土壤",
+    "新开发地块D (45亩) - 改良土壤"
+]
+
+PLOT_SENSOR_BASELINES = {
+    PLOT_OPTIONS[0]: {"temperature": 18.5, "humidity": 65.2, "ph_value": 6.8, "salinity": 0.35,
+                      "nitrogen": 45.2, "phosphorus": 28.1, "potassium": 156.8},
+    PLOT_OPTIONS[1]: {"temperature": 19.2, "humidity": 58.0, "ph_value": 7.2, "salinity": 0.45,
+                      "nitrogen": 32.0, "phosphorus": 20.5, "potassium": 120.0},
+    PLOT_OPTIONS[2]: {"temperature": 20.1, "humidity": 52.0, "ph_value": 8.1, "salinity": 0.85,
+                      "nitrogen": 25.0, "phosphorus": 15.0, "potassium": 140.0},
+    PLOT_OPTIONS[3]: {"temperature": 18.0, "humidity": 62.0, "ph_value": 7.5, "salinity": 0.55,
+                      "nitrogen": 38.0, "phosphorus": 22.0, "potassium": 130.0}
+}
 
 def show():
     """显示作物推荐页面"""
@@ -30,13 +57,7 @@ def show_configuration_panel():
         st.markdown("#### 📋 基本设置")
         
         # 地块选择
-        plot_options = [
-            "示范地块A (50亩) - 优质土壤",
-            "试验地块B (30亩) - 中等土壤", 
-            "生产地块C (80亩) - 盐碱土壤",
-            "新开发地块D (45亩) - 改良土壤"
-        ]
-        selected_plot = st.selectbox("🌾 选择地块", plot_options)
+        selected_plot = st.selectbox("🌾 选择地块", PLOT_OPTIONS)
         
         # 种植参数
         season = st.selectbox("🗓️ 种植季节", PLANTING_SEASONS)
@@ -47,7 +68,7 @@ def show_configuration_panel():
         budget = st.slider("💰 投资预算(元/亩)", min_value=500, max_value=5000, value=1500, step=100)
         
         # 期望产量
-        expected_yield = st.selectbox("📈 期望产量水平", ["高产优先", "稳产优先", "成本优先"])
+        expected_yield = st.selectbox("📈 期望产量水平", YIELD_PREFERENCES)
     
     # 传感器配置
     st.markdown("#### 📡 传感器配置")
@@ -63,13 +84,20 @@ def show_configuration_panel():
         if "自动获取" in data_mode:
             # 自动获取模式
             st.success("🔄 自动从传感器网络获取实时数据")
+            live = get_ingest_service().store.latest(sensor_code(sensor_id))
             
             # 传感器状态
             col1, col2 = st.columns(2)
             with col1:
-                st.markdown(create_compact_metric("在线状态", "正常", "#28a745"), unsafe_allow_html=True)
+                if live["timestamp"] is None:
+                    st.markdown(create_compact_metric("在线状态", "离线", "#dc3545"), unsafe_allow_html=True)
+                elif live["stale"]:
+                    st.markdown(create_compact_metric("在线状态", "数据过期", "#ffc107"), unsafe_allow_html=True)
+                else:
+                    st.markdown(create_compact_metric("在线状态", "正常", "#28a745"), unsafe_allow_html=True)
             with col2:
-                st.markdown(create_compact_metric("更新时间", "30秒前", "#17a2b8"), unsafe_allow_html=True)
+                age = "--" if live["timestamp"] is None else f"{max(time.time() - live['timestamp'], 0):.0f}秒前"
+                st.markdown(create_compact_metric("更新时间", age, "#17a2b8"), unsafe_allow_html=True)
             
             # 实时数据同步
             if st.button("🔄 立即同步数据", use_container_width=True):
@@ -79,12 +107,27 @@ def show_configuration_panel():
                 st.rerun()
             
             # 显示当前传感器读数
-            show_sensor_readings()
+            sensor_readings = show_sensor_readings(live["values"])
         
         else:
             # 手动输入模式
             st.info("📝 手动输入环境参数")
-            show_manual_input()
+            sensor_readings = show_manual_input()
+    
+    # 汇总推荐配置
+    config = {
+        "plot": selected_plot,
+        "season": season,
+        "target_use": target_use,
+        "risk_preference": risk_preference,
+        "budget": budget,
+        "expected_yield": expected_yield,
+        "sensor": sensor_readings
+    }
+    
+    # 已生成推荐后，配置变化(如拖动预算滑块)时增量刷新结果
+    if st.session_state.get('recommendations_ready', False):
+        refresh_recommendations(config)
     
     # 推荐执行按钮
     st.markdown("#### 🚀 生成推荐")
@@ -97,24 +140,27 @@ def show_configuration_panel():
     
     with col2:
         if st.button("🌱 智能推荐", use_container_width=True, type="primary"):
-            generate_recommendations()
+            generate_recommendations(config)
 
 
-def show_sensor_readings():
-    """显示传感器实时读数"""
+def show_sensor_readings(live_values=None):
+    """显示传感器实时读数, 接入服务尚未收到的指标显示默认值"""
     st.markdown("**📊 实时环境数据**")
     
-    # 模拟传感器数据
+    # 默认传感器数据
     sensor_data = {
-        "温度": {"value": 18.5, "unit": "°C", "status": "正常"},
-        "湿度": {"value": 65.2, "unit": "%", "status": "正常"},
-        "pH值": {"value": 6.8, "unit": "", "status": "偏碱"},
-        "盐碱度": {"value": 0.35, "unit": "‰", "status": "轻微"},
-        "氮含量": {"value": 45.2, "unit": "mg/kg", "status": "中等"},
-        "磷含量": {"value": 28.1, "unit": "mg/kg", "status": "充足"},
-        "钾含量": {"value": 156.8, "unit": "mg/kg", "status": "丰富"},
-        "有机质": {"value": 2.8, "unit": "%", "status": "良好"}
+        "温度": {"key": "temperature", "value": 18.5, "unit": "°C", "status": "正常"},
+        "湿度": {"key": "humidity", "value": 65.2, "unit": "%", "status": "正常"},
+        "pH值": {"key": "ph_value", "value": 6.8, "unit": "", "status": "偏碱"},
+        "盐碱度": {"key": "salinity", "value": 0.35, "unit": "‰", "status": "轻微"},
+        "氮含量": {"key": "nitrogen", "value": 45.2, "unit": "mg/kg", "status": "中等"},
+        "磷含量": {"key": "phosphorus", "value": 28.1, "unit": "mg/kg", "status": "充足"},
+        "钾含量": {"key": "potassium", "value": 156.8, "unit": "mg/kg", "status": "丰富"},
+        "有机质": {"key": "organic_matter", "value": 2.8, "unit": "%", "status": "良好"}
     }
+    for data in sensor_data.values():
+        if live_values and data["key"] in live_values:
+            data["value"] = round(live_values[data["key"]], 2)
     
     # 显示传感器数据
     for param, data in sensor_data.items():
@@ -131,6 +177,8 @@ def show_sensor_readings():
             </div>
         </div>
         """, unsafe_allow_html=True)
+    
+    return {data["key"]: data["value"] for data in sensor_data.values()}
 
 
 def show_manual_input():
@@ -147,6 +195,12 @@ def show_manual_input():
     phosphorus = st.number_input("🔵 磷含量 (mg/kg)", min_value=0.0, max_value=100.0, value=28.1, step=1.0)
     potassium = st.number_input("🟡 钾含量 (mg/kg)", min_value=0.0, max_value=300.0, value=156.8, step=1.0)
     organic_matter = st.number_input("🟤 有机质 (%)", min_value=0.0, max_value=10.0, value=2.8, step=0.1)
+    
+    return {
+        "temperature": temperature, "humidity": humidity, "ph_value": ph_value, "salinity": salinity,
+        "nitrogen": nitrogen, "phosphorus": phosphorus, "potassium": potassium,
+        "organic_matter": organic_matter
+    }
 
 
 def validate_configuration():
@@ -160,12 +214,23 @@ def validate_configuration():
     st.session_state.config_validated = True
 
 
-def generate_recommendations():
+def get_session_scorer():
+    """获取当前会话的增量评分器"""
+    if 'recommendation_scorer' not in st.session_state:
+        st.session_state.recommendation_scorer = IncrementalScorer()
+    return st.session_state.recommendation_scorer
+
+
+def refresh_recommendations(config):
+    """计算推荐结果: 先查跨会话缓存，未命中时只重算受影响的评分维度"""
+    # 向量化评分引擎对全部品种一次性打分，量化配置相同的请求跨会话共享缓存
+    st.session_state.recommendations = cached_recommend_crops(config, top_k=3, scorer=get_session_scorer())
+    st.session_state.recommendation_config = config
+
+
+def generate_recommendations(config):
     """生成作物推荐"""
-    with st.spinner("AI正在分析环境数据，生成智能推荐..."):
-        # 模拟AI分析过程
-        import time
-        time.sleep(2)
+    refresh_recommendations(config)
     
     st.success("🌱 智能推荐已生成")
     st.session_state.recommendations_ready = True
@@ -210,49 +275,121 @@ def show_recommendation_results():
     st.markdown("### 📋 详细推荐方案")
     
     # 推荐作物选择
-    selected_crop_tab = st.selectbox(
+    recommendations = st.session_state.get('recommendations', [])
+    if not recommendations:
+        return
+    
+    selected_crop = st.selectbox(
         "选择查看详细方案", 
-        ["🌽 玉米 - 郑单958", "🌿 大豆 - 东农42", "🌻 向日葵 - 三瑞3号"],
+        recommendations,
+        format_func=lambda crop: f"{crop['emoji']} {crop['name']} - {crop['variety']}",
         key="crop_detail_selector"
     )
     
     # 根据选择显示详细方案
-    crop_name = selected_crop_tab.split(" - ")[0].replace("🌽 ", "").replace("🌿 ", "").replace("🌻 ", "")
-    show_detailed_crop_plan(crop_name)
+    show_detailed_crop_plan(selected_crop['name'])
+    
+    # 全部地块批量推荐
+    show_all_plots_overview()
+    
+    # 情景推演
+    show_scenario_sweep()
+
+
+def show_all_plots_overview():
+    """全部地块推荐概览(批量评分)"""
+    config = st.session_state.get('recommendation_config')
+    if not config:
+        return
+    
+    st.markdown("### 🗂️ 全部地块推荐概览")
+    
+    conditions = pd.DataFrame.from_dict(PLOT_SENSOR_BASELINES, orient="index")
+    result = cached_recommend_batch(conditions, config, top_k=3)
+    catalog = get_crop_catalog()
+    
+    overview = pd.DataFrame({"地块": conditions.index})
+    for rank in range(result["indices"].shape[1]):
+        # 可行作物不足时多出的名次下标为 -1
+        overview[f"推荐{rank + 1}"] = [
+            f"{catalog.names[i]} ({score * 100:.1f})" if i >= 0 else "—"
+            for i, score in zip(result["indices"][:, rank], result["scores"][:, rank])
+        ]
+    
+    st.dataframe(overview, use_container_width=True, hide_index=True)
+    
+    cache_stats = recommendation_cache_stats()
+    st.caption(
+        f"推荐缓存: 命中 {cache_stats['hits']} 次 / 未命中 {cache_stats['misses']} 次 "
+        f"(命中率 {cache_stats['hit_rate'] * 100:.1f}%, 条目 {cache_stats['size']}/{cache_stats['maxsize']})"
+    )
+
+
+def show_scenario_sweep():
+    """预算 × 风险偏好 × 季节情景推演"""
+    config = st.session_state.get('recommendation_config')
+    if not config:
+        return
+    
+    st.markdown("### 🔀 情景推演")
+    st.caption("在全部预算档位、风险偏好与种植季节组合下推演前3推荐，观察推荐结果的稳定性")
+    
+    if st.button("▶️ 运行情景推演", use_container_width=True):
+        st.session_state.scenario_sweep = run_scenario_sweep(config, top_k=3)
+    
+    sweep = st.session_state.get('scenario_sweep')
+    if not sweep:
+        return
+    
+    # 每行一个(季节, 风险偏好)组合，每列一个预算档位
+    overlap = sweep["overlap"]
+    row_labels = [
+        f"{season} · {risk}"
+        for risk in sweep["risk_preferences"] for season in sweep["seasons"]
+    ]
+    z = overlap.reshape(overlap.shape[0], -1).T
+    names = sweep["names"]
+    hover = [
+        [" / ".join(names[i] for i in sweep["top_indices"][b, r, s]) for b in range(len(sweep["budgets"]))]
+        for r in range(len(sweep["risk_preferences"])) for s in range(len(sweep["seasons"]))
+    ]
+    
+    fig_sweep = go.Figure(data=go.Heatmap(
+        z=z * 100,
+        x=sweep["budgets"],
+        y=row_labels,
+        text=hover,
+        hovertemplate="预算: %{x}元/亩<br>%{y}<br>重合度: %{z:.0f}%<br>%{text}<extra></extra>",
+        colorscale='Greens',
+        zmin=0,
+        zmax=100,
+        colorbar=dict(title="重合度(%)")
+    ))
+    
+    fig_sweep.update_layout(
+        title=f"前3推荐相对参考预算({sweep['reference_budget']}元/亩)的排名稳定性",
+        xaxis_title="投资预算(元/亩)",
+        font=dict(family="SimHei", size=10),
+        height=420,
+        margin=dict(l=0, r=0, t=30, b=0)
+    )
+    
+    st.plotly_chart(fig_sweep, use_container_width=True)
 
 
 def show_top_recommendations():
     """显示顶部推荐作物卡片"""
-    # 推荐作物数据
-    recommendations = [
-        {
-            "name": "玉米", "variety": "郑单958", "emoji": "🌽",
-            "suitability": 95, "profit": 88, "risk": 12,
-            "yield": "650kg/亩", "revenue": "1600元/亩",
-            "image": "https://images.unsplash.com/photo-1551754655-cd27e38d2076?w=200&h=150&fit=crop",
-            "description": "高产优质玉米品种，适应性强"
-        },
-        {
-            "name": "大豆", "variety": "东农42", "emoji": "🌿", 
-            "suitability": 88, "profit": 78, "risk": 22,
-            "yield": "280kg/亩", "revenue": "1250元/亩",
-            "image": "https://images.unsplash.com/photo-1605030753481-bb38b08c384a?w=200&h=150&fit=crop",
-            "description": "优质高蛋白大豆，市场需求稳定"
-        },
-        {
-            "name": "向日葵", "variety": "三瑞3号", "emoji": "🌻",
-            "suitability": 82, "profit": 72, "risk": 28,
-            "yield": "320kg/亩", "revenue": "1150元/亩", 
-            "image": "https://images.unsplash.com/photo-1508296695146-257a814070b4?w=200&h=150&fit=crop",
-            "description": "耐盐碱向日葵品种，油脂含量高"
-        }
-    ]
+    # 推荐作物数据(由评分引擎生成)
+    recommendations = st.session_state.get('recommendations', [])
+    if not recommendations:
+        st.info("暂无推荐结果，请重新点击\"智能推荐\"")
+        return
     
     # 显示推荐卡片
-    col1, col2, col3 = st.columns(3)
+    columns = st.columns(len(recommendations))
     
     for i, crop in enumerate(recommendations):
-        with [col1, col2, col3][i]:
+        with columns[i]:
             # 获取适应性等级颜色
             if crop["suitability"] >= 90:
                 suitability_color = "#28a745"
@@ -281,12 +418,25 @@ def show_top_recommendations():
                 <div style="font-size: 0.8em; color: #333; margin-top: 8px;">
                     📊 预期产量: {crop['yield']}<br>
                     💰 预期收益: {crop['revenue']}<br>
-                    ⚠️ 风险指数: {crop['risk']}%
+                    ⚠️ 风险指数: {crop['risk']}%（亏损概率 {crop['loss_probability']}%）<br>
+                    📉 VaR/CVaR({crop['confidence']}%): {crop['var']} / {crop['cvar']}<br>
+                    🏅 综合评分: {crop['score']}
                 </div>
             </div>
             """, unsafe_allow_html=True)
 
 
+def plan_crop_rotation(crop_name, years=3):
+    """以所选作物为首年作物, 按当前地块读数规划多年轮作(每亩收益)"""
+    config = st.session_state.get('recommendation_config') or {}
+    crops = tuple(dict.fromkeys((crop_name,) + DEFAULT_ROTATION_CROPS))
+    conditions = sensor_vector(config.get('sensor', {}))
+    return plan_rotation(
+        conditions, zone_areas=1.0, crops=crops, years=years, first_crops=[crop_name],
+        season=config.get('season', PLANTING_SEASONS[0])
+    )
+
+
 def show_detailed_crop_plan(crop_name):
     """显示详细的作物种植方案"""
     # 根据作物类型设置详细信息
@@ -353,6 +503,8 @@ def show_detailed_crop_plan(crop_name):
         }
     }
     
+    # 轮作规划使用用户实际选择的作物, 详情卡片缺省时才回退为玉米
+    selected_crop = crop_name
     if crop_name not in crop_details:
         crop_name = "玉米"  # 默认显示玉米
     
@@ -425,12 +577,15 @@ def show_detailed_crop_plan(crop_name):
         """)
     
     with multi_crop_col2:
-        st.info("""
+        rotation = plan_crop_rotation(selected_crop)
+        year_lines = "\n".join(
+            f"        - 第{year}年: {crop}（{profit:.0f}元/亩）"
+            for year, (crop, profit) in enumerate(zip(rotation["sequence"][0], rotation["yearly_profit"][0]), start=1)
+        )
+        st.info(f"""
         **🔄 多轮作保种方案**
-        - 第一年: 玉米-大豆轮作
-        - 第二年: 向日葵-小麦轮作  
-        - 第三年: 绿肥作物休耕
-        - 轮作周期: 3年一循环
+{year_lines}
+        - 轮作周期: {len(rotation["sequence"][0])}年一循环，累计收益{rotation["total_profit"][0]:.0f}元/亩
         """)
     
     # 管理建议
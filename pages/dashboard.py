@@ -2,8 +2,17 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from components.layout import create_page_header, create_metric_card, create_feature_button, create_info_panel, create_compact_metric
+from data.live_values import METRIC_NAMES
+from data.sensor_ingest import get_ingest_service, sensor_code, simulated_sensor_ids
+
+def fresh_mean(live, metric):
+    """最新读数表中某一指标未过期读数的均值, 没有时为 NaN"""
+    column = METRIC_NAMES.index(metric)
+    fresh = ~live["stale"][:, column]
+    return float(live["values"][fresh, column].mean()) if fresh.any() else float("nan")
 
 def show():
     """显示首页/仪表板"""
@@ -130,22 +139,28 @@ def show():
             else:
                 st.info(f"ℹ️ **{notif['title']}**\n{notif['content']}")
         
-        # 实时状态 - 紧凑显示
+        # 实时状态 - 紧凑显示(无锁读取接入服务的最新读数表, 不访问历史存储)
         st.markdown("### 🌤️ 实时状态")
+        live = get_ingest_service().store.live.read([sensor_code(s) for s in simulated_sensor_ids()])
+        temperature = fresh_mean(live, "temperature")
+        humidity = fresh_mean(live, "humidity")
         
         # 使用紧凑指标显示
-        st.markdown(create_compact_metric("温度", "18°C"), unsafe_allow_html=True)
-        st.markdown(create_compact_metric("湿度", "65%"), unsafe_allow_html=True)
+        st.markdown(create_compact_metric("温度", "--" if np.isnan(temperature) else f"{temperature:.0f}°C"), unsafe_allow_html=True)
+        st.markdown(create_compact_metric("湿度", "--" if np.isnan(humidity) else f"{humidity:.0f}%"), unsafe_allow_html=True)
         st.markdown(create_compact_metric("风速", "2.1m/s"), unsafe_allow_html=True)
         
-        # 传感器状态
+        # 传感器状态: 有未过期读数的传感器视为在线
         st.markdown("### 📡 传感器")
+        online = int((~live["stale"]).any(axis=1).sum())
         
         col_a, col_b = st.columns(2)
         with col_a:
-            st.metric("在线", "15", delta=None)
+            st.metric("在线", str(online), delta=None)
         with col_b:
-            st.metric("离线", "3", delta=None)
+            st.metric("离线", str(len(live["stale"]) - online), delta=None)
+        if get_ingest_service().simulator_error is not None:
+            st.error(f"网关模拟器已停止: {get_ingest_service().simulator_error!r}")
     
     # 底部统计图表 - 紧凑版
     st.markdown("## 📊 统计概览")
@@ -3,8 +3,23 @@ import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
+import time
 from datetime import datetime, timedelta
 from components.layout import create_page_header, create_metric_card
+from data.sensor_ingest import get_ingest_service, sensor_code, simulated_sensor_ids
+from data.data_manager import get_data_manager
+from utils.constants import DATA_LAYER_CONFIG, HISTORY_CONFIG
+
+# 环境监测指标: 显示名称 -> (传感器指标, 单位, 曲线颜色)
+ENVIRONMENT_METRICS = {
+    "温度": ("temperature", "°C", 'red'),
+    "湿度": ("humidity", "%", 'blue'),
+    "pH值": ("ph_value", "", 'green'),
+    "盐碱度": ("salinity", "‰", 'orange'),
+    "氮含量": ("nitrogen", "mg/kg", 'purple'),
+    "磷含量": ("phosphorus", "mg/kg", 'purple'),
+    "钾含量": ("potassium", "mg/kg", 'purple')
+}
 
 def show():
     """显示数据分析页面"""
@@ -62,13 +77,34 @@ def show_comprehensive_analysis():
     st.markdown("### 📊 关键指标趋势")
     
     # 生成模拟数据
-    dates = pd.date_range(start=start_date, end=end_date, freq='M')
+    dates = pd.date_range(start=start_date, end=end_date, freq='ME')
     success_rate = np.random.normal(91, 3, len(dates))
     user_satisfaction = np.random.normal(94, 2, len(dates))
     avg_profit = np.random.normal(1350, 100, len(dates))
     
+    # 数据完整度: 由逐日预聚合的读数条数与应有条数之比按月汇总
+    history = get_ingest_service().history
+    sensors = [sensor_code(sensor_id) for sensor_id in simulated_sensor_ids()]
+    start = time.mktime(start_date.timetuple())
+    end = time.mktime(end_date.timetuple()) + 86400
+    daily = history.aggregate(sensors, "temperature", start, end, 86400)
+    expected = len(sensors) * 86400 / HISTORY_CONFIG["backfill_step"]
+    completeness = pd.Series(
+        np.minimum(daily["count"] / expected, 1.0) * 100,
+        index=pd.to_datetime([datetime.fromtimestamp(t) for t in daily["time"]])
+    ).resample('ME').mean()
+    
     fig = go.Figure()
     
+    fig.add_trace(go.Scatter(
+        x=completeness.index,
+        y=completeness.values,
+        mode='lines+markers',
+        name='数据完整度(%)',
+        line=dict(color='purple', width=3),
+        yaxis='y1'
+    ))
+    
     fig.add_trace(go.Scatter(
         x=dates,
         y=success_rate,
@@ -99,7 +135,7 @@ def show_comprehensive_analysis():
     fig.update_layout(
         title='关键指标趋势分析',
         xaxis=dict(title='时间'),
-        yaxis=dict(title='成功率/满意度(%)', side='left'),
+        yaxis=dict(title='成功率/满意度/完整度(%)', side='left'),
         yaxis2=dict(title='收益(元/亩)', side='right', overlaying='y'),
         font=dict(family="SimHei", size=12),
         height=500,
@@ -372,6 +408,15 @@ def show_yield_analysis():
     
     st.plotly_chart(fig_heatmap, use_container_width=True)
 
+def get_environment_trend(metric, start, end):
+    """全部传感器某一指标的趋势, 由查询规划按时间跨度选择预聚合层级"""
+    def build():
+        sensors = [sensor_code(sensor_id) for sensor_id in simulated_sensor_ids()]
+        return get_ingest_service().history.query(sensors, metric, start, end)
+    
+    return get_data_manager().get(("environment_trend", metric, start, end), build,
+                                  ttl=DATA_LAYER_CONFIG["live_ttl"])
+
 def show_environmental_analysis():
     """环境数据分析"""
     st.markdown("## 🌡️ 环境数据分析")
@@ -379,37 +424,25 @@ def show_environmental_analysis():
     # 环境监测指标选择
     selected_metrics = st.multiselect(
         "选择监测指标",
-        ["温度", "湿度", "pH值", "盐碱度", "氮含量", "磷含量", "钾含量"],
+        list(ENVIRONMENT_METRICS),
         default=["温度", "湿度", "pH值"]
     )
     
+    trend_ranges = list(HISTORY_CONFIG["trend_ranges"])
+    trend_range = st.selectbox("时间范围", trend_ranges, index=trend_ranges.index("30天"))
+    
     if selected_metrics:
-        # 生成环境数据时间序列
-        dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
+        # 全部传感器的趋势由共享数据层按 (指标, 时间窗口) 缓存, 各会话共用
+        end = time.time() // 3600 * 3600 + 3600
+        start = end - HISTORY_CONFIG["trend_ranges"][trend_range] * 86400
         
         fig_env = go.Figure()
         
         for metric in selected_metrics:
-            if metric == "温度":
-                data = np.random.normal(18, 3, len(dates))
-                unit = "°C"
-                color = 'red'
-            elif metric == "湿度":
-                data = np.random.normal(65, 8, len(dates))
-                unit = "%"
-                color = 'blue'
-            elif metric == "pH值":
-                data = np.random.normal(6.8, 0.3, len(dates))
-                unit = ""
-                color = 'green'
-            elif metric == "盐碱度":
-                data = np.random.normal(0.3, 0.1, len(dates))
-                unit = "‰"
-                color = 'orange'
-            else:
-                data = np.random.normal(50, 10, len(dates))
-                unit = "mg/kg"
-                color = 'purple'
+            key, unit, color = ENVIRONMENT_METRICS[metric]
+            result = get_environment_trend(key, start, end)
+            dates = [datetime.fromtimestamp(t) for t in result["time"]]
+            data = result["mean"]
             
             fig_env.add_trace(go.Scatter(
                 x=dates,
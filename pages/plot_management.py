@@ -3,8 +3,65 @@ import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from components.layout import create_page_header, create_sensor_status_badge, create_info_panel, create_compact_metric
+from algorithms.allocation import allocate_zones
+from algorithms.rotation import plan_rotation, summarize_rotation
+from data.sensor_ingest import get_ingest_service, plot_sensor_ids, sensor_code
+from algorithms.recommendation import FEATURE_NAMES
+from algorithms.sensor_fusion import SensorDataFusion
+from algorithms.spatial_index import ZoneIndex, zone_layout
+from algorithms.interpolation import cached_interpolate_field, METHOD_NAMES
+from algorithms.zonal_stats import rasterize_boxes, zonal_stats
+from data.data_manager import get_data_manager
+from algorithms.change_detection import bin_changes
+from algorithms.pest_classifier import HEALTHY, PEST_CLASSES
+from data.pest_survey import survey_pests
+from data.raster_store import (
+    INDEX_NAMES, compute_index, detect_changes, flight_time, load_flights, rasterize_zones,
+    simulate_next_flight, tiled_zonal_stats
+)
+from data.tile_pyramid import LEVELS, TilePyramid, colormap_lut, plotly_colorscale, quantize
+from data.models import STATUS_NAMES, SENSOR_TYPES, empty_records, encode, records_to_frame, set_metrics
+from utils.constants import DATA_LAYER_CONFIG, HISTORY_CONFIG, INGEST_CONFIG, PEST_CONFIG, PYRAMID_CONFIG, SENSOR_CONFIG
+
+# 每个微区部署的传感器类型(见 SENSOR_CONFIG["supported_types"])
+ZONE_SENSOR_TYPES = INGEST_CONFIG["zone_sensor_types"]
+
+# 地块的微区数, 与网关模拟器上报的地块一致
+PLOT_ZONES = INGEST_CONFIG["simulated_plots"]
+
+# 传感器指标的显示名称
+METRIC_LABELS = {
+    "temperature": "温度", "humidity": "湿度", "ph_value": "pH值", "salinity": "盐碱度",
+    "nitrogen": "氮含量", "phosphorus": "磷含量", "potassium": "钾含量"
+}
+
+# 微区传感器读数的基准值与微区间差异幅度
+ZONE_SENSOR_BASELINE = {
+    "temperature": 18.5, "humidity": 65.0, "ph_value": 6.8, "salinity": 0.3,
+    "nitrogen": 120.0, "phosphorus": 40.0, "potassium": 150.0
+}
+ZONE_SENSOR_SPREAD = {
+    "temperature": 1.5, "humidity": 6.0, "ph_value": 0.5, "salinity": 0.15,
+    "nitrogen": 25.0, "phosphorus": 8.0, "potassium": 25.0
+}
+
+# 植被指数热力图的色阶(量化编码 0 为无数据, 透明)
+INDEX_COLORSCALE = plotly_colorscale(colormap_lut("RdYlGn"))
+
+# 微区土壤分析使用的插值场指标
+SOIL_METRICS = ("nitrogen", "phosphorus", "potassium", "ph_value", "salinity", "humidity")
+
+# 各类病虫害的常规防治措施与成本
+PEST_CONTROL = {
+    "玉米螟": {"措施": "生物防治", "成本": "50元/亩"},
+    "蚜虫": {"措施": "天敌释放", "成本": "30元/亩"},
+    "叶斑病": {"措施": "预防喷药", "成本": "25元/亩"}
+}
+PEST_COLORS = {"健康": "#28a745", "玉米螟": "#fd7e14", "蚜虫": "#ffc107", "叶斑病": "#dc3545"}
+
 
 def show():
     """显示智能微区精细种植管理页面"""
@@ -41,21 +98,8 @@ def show():
         # 地块列表 - 增强版
         st.markdown("### 📍 智能地块")
         
-        # 模拟增强的地块数据
-        plots_data = [
-            {
-                "id": "P001", "name": "示范地块A", "area": 50, "zones": 8, "status": "同田异种",
-                "drone_coverage": 100, "sensor_density": 16, "crop_diversity": 3, "ai_score": 95
-            },
-            {
-                "id": "P002", "name": "试验地块B", "area": 30, "zones": 6, "status": "精准管理",
-                "drone_coverage": 95, "sensor_density": 12, "crop_diversity": 2, "ai_score": 88
-            },
-            {
-                "id": "P003", "name": "生产地块C", "area": 80, "zones": 12, "status": "同田异种",
-                "drone_coverage": 90, "sensor_density": 24, "crop_diversity": 4, "ai_score": 92
-            }
-        ]
+        # 地块清单由共享数据层构建一次, 所有会话共用
+        plots_data = get_data_manager().get(("plots",), build_plots_data)
         
         # 地块选择
         selected_plot = st.selectbox(
@@ -64,6 +108,8 @@ def show():
             format_func=lambda x: f"{x['name']} - {x['area']}亩 (AI评分:{x['ai_score']})",
             key="plot_selector"
         )
+        if st.button("🔄 刷新地块数据", use_container_width=True, key="refresh_plot_data"):
+            get_data_manager().invalidate(prefix=("plot", selected_plot['id']))
         
         # 显示增强地块卡片
         for plot in plots_data:
@@ -104,41 +150,74 @@ def show():
                 show_precision_management(selected_plot)
 
 
+def build_plots_data():
+    """模拟增强的地块数据"""
+    return [
+        {
+            "id": "P001", "name": "示范地块A", "area": 50, "zones": PLOT_ZONES["P001"], "status": "同田异种",
+            "drone_coverage": 100, "sensor_density": PLOT_ZONES["P001"] * len(ZONE_SENSOR_TYPES),
+            "crop_diversity": 3, "ai_score": 95
+        },
+        {
+            "id": "P002", "name": "试验地块B", "area": 30, "zones": PLOT_ZONES["P002"], "status": "精准管理",
+            "drone_coverage": 95, "sensor_density": PLOT_ZONES["P002"] * len(ZONE_SENSOR_TYPES),
+            "crop_diversity": 2, "ai_score": 88
+        },
+        {
+            "id": "P003", "name": "生产地块C", "area": 80, "zones": PLOT_ZONES["P003"], "status": "同田异种",
+            "drone_coverage": 90, "sensor_density": PLOT_ZONES["P003"] * len(ZONE_SENSOR_TYPES),
+            "crop_diversity": 4, "ai_score": 92
+        }
+    ]
+
+
 def show_drone_sensing(plot_data):
     """无人机遥感监测模块"""
     st.markdown(f"### 🛩️ {plot_data['name']} - 无人机遥感")
     
     # 遥感数据采集状态
+    flights = plot_flights(plot_data)
     col1, col2, col3 = st.columns(3)
     with col1:
         st.markdown(create_compact_metric("覆盖率", f"{plot_data['drone_coverage']}%", "#28a745"), unsafe_allow_html=True)
     with col2:
-        st.markdown(create_compact_metric("最新飞行", "2小时前", "#17a2b8"), unsafe_allow_html=True)
+        latest_age = format_duration(time.time() - flight_time(flights[-1]))
+        st.markdown(create_compact_metric("最新飞行", f"{latest_age}前", "#17a2b8"), unsafe_allow_html=True)
     with col3:
         st.markdown(create_compact_metric("数据质量", "优秀", "#28a745"), unsafe_allow_html=True)
     
     # 遥感图像分析
     st.markdown("#### 📸 多光谱遥感分析")
     
-    tab1, tab2, tab3 = st.tabs(["植被指数", "土壤分析", "病虫害识别"])
+    tab1, tab2, tab3, tab4 = st.tabs(["植被指数", "土壤分析", "病虫害识别", "变化检测"])
     
     with tab1:
-        # NDVI植被指数热力图
-        st.markdown("**NDVI植被指数分布**")
+        # 植被指数由分块航拍影像逐块计算, 热力图按视口从瓦片金字塔取 uint8 编码
+        index = st.selectbox("植被指数", list(INDEX_NAMES), format_func=INDEX_NAMES.get, key="vegetation_index")
+        st.markdown(f"**{INDEX_NAMES[index]}植被指数分布**")
+        vegetation = get_vegetation_index(plot_data, index)
+        pyramid = vegetation['pyramid']
         
-        # 生成模拟NDVI数据
-        np.random.seed(42)
-        x = np.linspace(0, 100, 20)
-        y = np.linspace(0, 80, 16)
-        X, Y = np.meshgrid(x, y)
-        ndvi_data = 0.3 + 0.5 * np.exp(-((X-50)**2 + (Y-40)**2) / 800) + np.random.normal(0, 0.1, X.shape)
+        width_m = round(vegetation['width'] * vegetation['pixel_size'], 1)
+        height_m = round(vegetation['height'] * vegetation['pixel_size'], 1)
+        col_x, col_y = st.columns(2)
+        with col_x:
+            x_range = st.slider("东西范围(米)", 0.0, width_m, (0.0, width_m), key=f"vegetation_x_{plot_data['id']}")
+        with col_y:
+            y_range = st.slider("南北范围(米)", 0.0, height_m, (0.0, height_m), key=f"vegetation_y_{plot_data['id']}")
+        view = pyramid.read(extent=x_range + y_range)
+        tick_values = np.linspace(*pyramid.value_range, 5)
         
         fig_ndvi = go.Figure(data=go.Heatmap(
-            z=ndvi_data,
-            x=x,
-            y=y,
-            colorscale='RdYlGn',
-            colorbar=dict(title="NDVI值")
+            z=view['codes'],
+            x=view['x'],
+            y=view['y'],
+            colorscale=INDEX_COLORSCALE,
+            zmin=0,
+            zmax=LEVELS,
+            hovertemplate="东 %{x:.0f}米, 北 %{y:.0f}米<extra></extra>",
+            colorbar=dict(title=f"{INDEX_NAMES[index]}值", tickvals=quantize(tick_values, pyramid.value_range),
+                          ticktext=[f"{value:.1f}" for value in tick_values])
         ))
         
         fig_ndvi.update_layout(
@@ -151,45 +230,82 @@ def show_drone_sensing(plot_data):
         )
         
         st.plotly_chart(fig_ndvi, use_container_width=True)
+        st.caption(f"影像 {vegetation['height']}×{vegetation['width']} 像元 · {vegetation['pixel_size']}米/像元 · "
+                   f"金字塔第{view['level']}级 · {view['codes'].nbytes / 1024:.1f}KB · 均值 {vegetation['mean']:.2f}")
         
-        # NDVI分析结果
+        # 植被指数分级占比(由逐块累加的直方图得到)
+        lower = vegetation['edges'][:-1]
+        share = vegetation['histogram'] / max(vegetation['valid'], 1)
+        high_share = share[lower >= 0.7].sum()
+        mid_share = share[(lower >= 0.4) & (lower < 0.7)].sum()
         col_a, col_b = st.columns(2)
         with col_a:
-            st.info("🌱 **高NDVI区域** (>0.7)\n适合高产作物种植")
+            st.info(f"🌱 **高{INDEX_NAMES[index]}区域** (>0.7) 占 {high_share:.0%}\n适合高产作物种植")
         with col_b:
-            st.warning("🟡 **中NDVI区域** (0.4-0.7)\n需要精准施肥管理")
+            st.warning(f"🟡 **中{INDEX_NAMES[index]}区域** (0.4-0.7) 占 {mid_share:.0%}\n需要精准施肥管理")
     
     with tab2:
-        # 土壤成分分析
-        st.markdown("**高光谱土壤成分检测**")
+        # 传感器读数插值得到的连续场分布
+        st.markdown("**传感器插值场分布**")
+        col_metric, col_method = st.columns(2)
+        with col_metric:
+            field_metric = st.selectbox("指标", list(METRIC_LABELS), format_func=METRIC_LABELS.get,
+                                        key="field_metric")
+        with col_method:
+            field_method = st.radio("插值方法", list(METHOD_NAMES), format_func=METHOD_NAMES.get,
+                                    horizontal=True, key="field_method")
+        field = get_sensor_field(plot_data, field_metric, field_method)
+        layout, _ = plot_layout(plot_data)
         
-        # 土壤成分分布
+        fig_field = go.Figure(data=go.Heatmap(
+            z=field['z'],
+            x=field['lon'],
+            y=field['lat'],
+            colorscale='Viridis',
+            colorbar=dict(title=METRIC_LABELS[field_metric])
+        ))
+        fig_field.add_trace(go.Scatter(
+            x=layout['sensor_lon'], y=layout['sensor_lat'], mode='markers',
+            marker=dict(color='white', size=5, line=dict(color='black', width=1)),
+            name='传感器', showlegend=False
+        ))
+        fig_field.update_layout(
+            title=f"{METRIC_LABELS[field_metric]}空间分布（{METHOD_NAMES[field['method']]}）",
+            xaxis_title="经度",
+            yaxis_title="纬度",
+            font=dict(family="SimHei", size=10),
+            height=300,
+            margin=dict(l=0, r=0, t=30, b=0)
+        )
+        st.plotly_chart(fig_field, use_container_width=True)
+        
+        # 微区分区统计: 土壤指标取插值场, 植被指数取航拍影像
+        st.markdown("**微区土壤与植被分区统计**")
+        
+        soil_stats = get_zone_soil_stats(plot_data)
+        zone_ndvi = get_vegetation_index(plot_data, "ndvi")['zones']
         soil_zones = pd.DataFrame({
-            '微区': [f'Z{i:02d}' for i in range(1, 9)],
-            '有机质(%)': np.random.uniform(1.5, 4.2, 8),
-            '全氮(g/kg)': np.random.uniform(0.8, 2.1, 8),
-            '有效磷(mg/kg)': np.random.uniform(15, 45, 8),
-            '速效钾(mg/kg)': np.random.uniform(80, 180, 8),
-            '含水率(%)': np.random.uniform(15, 35, 8)
+            '微区': [f'Z{i+1:02d}' for i in range(plot_data['zones'])],
+            'NDVI': zone_ndvi['mean'].round(2),
+            **{f"{METRIC_LABELS[metric]}({SENSOR_CONFIG['data_ranges'][metric]['unit'] or '-'})":
+               soil_stats[metric]['mean'].round(2) for metric in SOIL_METRICS}
         })
+        st.dataframe(soil_zones, use_container_width=True, hide_index=True, height=180)
         
-        # 土壤养分雷达图
+        # 土壤养分雷达图(各指标按传感器量程标准化到0-100)
         fig_soil = go.Figure()
+        data_ranges = SENSOR_CONFIG['data_ranges']
         
-        for i, zone in enumerate(['Z01', 'Z04', 'Z08']):  # 选择3个代表性微区
-            zone_data = soil_zones[soil_zones['微区'] == zone].iloc[0]
-            
+        for i in sorted({0, plot_data['zones'] // 2, plot_data['zones'] - 1}):  # 选择代表性微区
             fig_soil.add_trace(go.Scatterpolar(
-                r=[
-                    zone_data['有机质(%)'] * 25,  # 标准化到0-100
-                    zone_data['全氮(g/kg)'] * 50,
-                    zone_data['有效磷(mg/kg)'] * 2,
-                    zone_data['速效钾(mg/kg)'] * 0.6,
-                    zone_data['含水率(%)'] * 3
+                r=[zone_ndvi['mean'][i] * 100] + [
+                    (soil_stats[metric]['mean'][i] - data_ranges[metric]['min'])
+                    / (data_ranges[metric]['max'] - data_ranges[metric]['min']) * 100
+                    for metric in SOIL_METRICS
                 ],
-                theta=['有机质', '全氮', '有效磷', '速效钾', '含水率'],
+                theta=['NDVI'] + [METRIC_LABELS[metric] for metric in SOIL_METRICS],
                 fill='toself',
-                name=zone,
+                name=f'Z{i+1:02d}',
                 line=dict(width=2)
             ))
         
@@ -204,18 +320,20 @@ def show_drone_sensing(plot_data):
         st.plotly_chart(fig_soil, use_container_width=True)
     
     with tab3:
-        # AI病虫害识别
+        # 最新航拍切分为图块后整批分类, 按微区汇总识别结果
         st.markdown("**AI病虫害智能识别**")
+        pests = get_pest_survey(plot_data)
+        patch_m = PEST_CONFIG['patch_size'] * vegetation['pixel_size']
+        st.caption(f"共识别 {pests['n_patches']} 个约 {patch_m:g} 米见方的图块, 用时 {pests['seconds']:.2f} 秒"
+                   f"({pests['n_patches'] / max(pests['seconds'], 1e-6):,.0f} 块/秒)")
         
         col_a, col_b = st.columns(2)
         
         with col_a:
             # 病虫害检测结果
-            pest_data = [
-                {"区域": "Z02", "类型": "玉米螟", "严重程度": "轻微", "置信度": 92, "建议": "生物防治"},
-                {"区域": "Z05", "类型": "蚜虫", "严重程度": "中等", "置信度": 88, "建议": "化学防治"},
-                {"区域": "Z07", "类型": "叶斑病", "严重程度": "轻微", "置信度": 95, "建议": "预防为主"}
-            ]
+            pest_data = pest_findings(pests)[:5]
+            if not pest_data:
+                st.success("各微区均未识别到病虫害")
             
             for pest in pest_data:
                 severity_colors = {"轻微": "green", "中等": "orange", "严重": "red"}
@@ -225,26 +343,22 @@ def show_drone_sensing(plot_data):
                 <div style="border: 1px solid {color}; border-radius: 6px; padding: 8px; margin: 5px 0;">
                     <div style="font-weight: bold; color: {color};">🐛 {pest['类型']} - {pest['区域']}</div>
                     <div style="font-size: 0.8em; color: #666;">
-                        严重程度: {pest['严重程度']} | 置信度: {pest['置信度']}%<br>
+                        严重程度: {pest['严重程度']} | 受害图块: {pest['占比']:.0%} | 置信度: {pest['置信度']}%<br>
                         建议: {pest['建议']}
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
         
         with col_b:
-            # 健康度分布饼图
-            health_data = {"健康": 70, "轻微异常": 20, "需要关注": 8, "严重问题": 2}
+            # 图块识别结果分布饼图
+            health_data = dict(zip(PEST_CLASSES, pests['classes']))
             
             fig_health = px.pie(
                 values=list(health_data.values()),
                 names=list(health_data.keys()),
-                title="地块健康度分布",
-                color_discrete_map={
-                    "健康": "#28a745",
-                    "轻微异常": "#ffc107", 
-                    "需要关注": "#fd7e14",
-                    "严重问题": "#dc3545"
-                }
+                title="地块图块识别结果分布",
+                color=list(health_data.keys()),
+                color_discrete_map=PEST_COLORS
             )
             
             fig_health.update_layout(
@@ -254,18 +368,80 @@ def show_drone_sensing(plot_data):
             )
             
             st.plotly_chart(fig_health, use_container_width=True)
+    
+    with tab4:
+        # 相邻两次航拍逐块比较, 只处理内容变化的瓦片
+        st.markdown(f"**相邻两次航拍的{INDEX_NAMES[index]}变化**")
+        col_info, col_button = st.columns([3, 1])
+        with col_button:
+            if st.button("🛩️ 模拟新航拍", use_container_width=True, key=f"new_flight_{plot_data['id']}"):
+                simulate_next_flight(plot_data['id'], seed=int(plot_data['id'][1:]) * 1000 + len(flights))
+                for derived in ("vegetation", "changes", "pests"):
+                    get_data_manager().invalidate(prefix=("plot", plot_data['id'], derived))
+                st.rerun()
+        changes = get_flight_changes(plot_data, index)
+        
+        with col_info:
+            if changes is None:
+                st.info("目前只有一次航拍记录, 完成下一次航拍后显示变化")
+            else:
+                st.markdown(f"共 {len(flights)} 次航拍, 与上一次间隔 {format_duration(changes['interval'])} · "
+                            f"比较瓦片 {changes['compared']} 个, 跳过未变化瓦片 {changes['skipped']} 个")
+        
+        if changes is not None:
+            # 稀疏变化掩膜按热力图可容纳的分辨率汇总为平均变化
+            height, width = changes['shape']
+            factor = 2 ** pyramid.choose_level(height, width, PYRAMID_CONFIG['chart_width'],
+                                               PYRAMID_CONFIG['chart_height'], PYRAMID_CONFIG['byte_budget'])
+            mask = changes['mask']
+            change_grid = bin_changes(mask['rows'], mask['cols'], mask['delta'], (height, width), factor)[::-1]
+            step = factor * changes['pixel_size']
+            
+            fig_change = go.Figure(data=go.Heatmap(
+                z=change_grid,
+                x=(np.arange(change_grid.shape[1]) + 0.5) * step,
+                y=(np.arange(change_grid.shape[0]) + 0.5) * step,
+                colorscale='RdYlGn',
+                zmid=0,
+                colorbar=dict(title=f"Δ{INDEX_NAMES[index]}")
+            ))
+            fig_change.update_layout(
+                title=f"显著变化区域(|Δ| ≥ {changes['threshold']})",
+                xaxis_title="东西方向(米)",
+                yaxis_title="南北方向(米)",
+                font=dict(family="SimHei", size=10),
+                height=300,
+                margin=dict(l=0, r=0, t=30, b=0)
+            )
+            st.plotly_chart(fig_change, use_container_width=True)
+            
+            # 各微区变化汇总
+            zone_pixels = np.maximum(vegetation['zones']['count'], 1)
+            zone_changes = pd.DataFrame({
+                '微区': [f'Z{i+1:02d}' for i in range(plot_data['zones'])],
+                '平均变化': (changes['zones']['delta_sum'] / zone_pixels).round(3),
+                '长势增强(%)': (changes['zones']['gain'] / zone_pixels * 100).round(1),
+                '长势受损(%)': (changes['zones']['loss'] / zone_pixels * 100).round(1)
+            })
+            st.dataframe(zone_changes, use_container_width=True, hide_index=True, height=180)
 
 
 def show_micro_sensors(plot_data):
     """微传感器网络监测"""
     st.markdown(f"### 📡 {plot_data['name']} - 微传感器网络")
     
+    # 传感器状态由接入服务的流式异常检测器给出(每个微区2个传感器)
+    detector = get_ingest_service().detector
+    sensor_ids = plot_sensor_ids(plot_data['id'], plot_data['zones'])
+    sensor_codes = [sensor_code(sensor_id) for sensor_id in sensor_ids]
+    sensor_status = detector.status(sensor_codes)
+    
     # 传感器网络状态
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.markdown(create_compact_metric("传感器总数", f"{plot_data['sensor_density']}个", "#17a2b8"), unsafe_allow_html=True)
     with col2:
-        online_sensors = int(plot_data['sensor_density'] * 0.95)
+        online_sensors = int((sensor_status != '离线').sum())
         st.markdown(create_compact_metric("在线数量", f"{online_sensors}个", "#28a745"), unsafe_allow_html=True)
     with col3:
         st.markdown(create_compact_metric("数据密度", "2米/个", "#6f42c1"), unsafe_allow_html=True)
@@ -275,24 +451,8 @@ def show_micro_sensors(plot_data):
     # 实时传感器数据
     st.markdown("#### 📊 实时环境监测")
     
-    # 生成传感器网格数据
-    sensor_grid = []
-    for i in range(plot_data['zones']):
-        for j in range(2):  # 每个微区2个传感器
-            sensor_grid.append({
-                'sensor_id': f"S{i+1:02d}-{j+1}",
-                'zone': f"Z{i+1:02d}",
-                'lat': 39.9042 + (i % 4) * 0.0005 + j * 0.0002,
-                'lon': 116.4074 + (i // 4) * 0.0005 + j * 0.0002,
-                'temperature': round(np.random.normal(20, 2), 1),
-                'humidity': round(np.random.normal(65, 5), 1),
-                'ph': round(np.random.uniform(6.2, 7.8), 1),
-                'salinity': round(np.random.uniform(0.1, 0.6), 2),
-                'ec': round(np.random.uniform(0.5, 2.0), 2),
-                'status': np.random.choice(['正常', '正常', '正常', '警告'], p=[0.85, 0.1, 0.04, 0.01])
-            })
-    
-    sensor_df = pd.DataFrame(sensor_grid)
+    # 传感器网格: 共享数据层中的紧凑记录副本, 填入最新读数表中的读数与实时状态
+    sensor_df = get_sensor_frame(plot_data, sensor_status)
     
     # 传感器分布地图
     col_a, col_b = st.columns([3, 2])
@@ -301,7 +461,7 @@ def show_micro_sensors(plot_data):
         st.markdown("**传感器网络分布**")
         
         # 根据状态设置颜色
-        color_map = {'正常': 'green', '警告': 'orange', '异常': 'red'}
+        color_map = {'正常': 'green', '警告': 'orange', '异常': 'red', '离线': 'gray'}
         sensor_df['color'] = sensor_df['status'].map(color_map)
         
         fig_sensors = px.scatter_mapbox(
@@ -311,7 +471,7 @@ def show_micro_sensors(plot_data):
             color='status',
             size='temperature',
             hover_name='sensor_id',
-            hover_data=['zone', 'temperature', 'humidity', 'ph'],
+            hover_data=['zone', 'type', 'temperature', 'humidity', 'ph_value'],
             mapbox_style='open-street-map',
             zoom=16,
             height=350,
@@ -332,9 +492,9 @@ def show_micro_sensors(plot_data):
         param_stats = {
             '温度': {'avg': sensor_df['temperature'].mean(), 'std': sensor_df['temperature'].std(), 'unit': '°C'},
             '湿度': {'avg': sensor_df['humidity'].mean(), 'std': sensor_df['humidity'].std(), 'unit': '%'},
-            'pH值': {'avg': sensor_df['ph'].mean(), 'std': sensor_df['ph'].std(), 'unit': ''},
+            'pH值': {'avg': sensor_df['ph_value'].mean(), 'std': sensor_df['ph_value'].std(), 'unit': ''},
             '盐碱度': {'avg': sensor_df['salinity'].mean(), 'std': sensor_df['salinity'].std(), 'unit': '‰'},
-            '电导率': {'avg': sensor_df['ec'].mean(), 'std': sensor_df['ec'].std(), 'unit': 'mS/cm'}
+            '氮含量': {'avg': sensor_df['nitrogen'].mean(), 'std': sensor_df['nitrogen'].std(), 'unit': 'mg/kg'}
         }
         
         for param, stats in param_stats.items():
@@ -348,28 +508,28 @@ def show_micro_sensors(plot_data):
             </div>
             """, unsafe_allow_html=True)
         
-        # 异常传感器告警
+        # 异常传感器告警(检测器告警缓冲区中本地块的最近告警)
         st.markdown("**异常告警**")
-        abnormal_sensors = sensor_df[sensor_df['status'] != '正常']
+        sensor_names = dict(zip(sensor_codes, sensor_ids))
+        alerts = detector.alerts(codes=sensor_codes, limit=5)
+        offline = sensor_df['sensor_id'][sensor_df['status'] == '离线']
         
-        if len(abnormal_sensors) > 0:
-            for _, sensor in abnormal_sensors.iterrows():
-                st.warning(f"⚠️ {sensor['sensor_id']}: {sensor['status']}")
+        if alerts or len(offline) > 0:
+            for alert in alerts:
+                alert_time = datetime.fromtimestamp(alert['timestamp']).strftime('%H:%M:%S')
+                st.warning(f"⚠️ {sensor_names[alert['sensor']]}: {METRIC_LABELS[alert['metric']]}{alert['kind']}"
+                           f"（{alert['value']:.2f}, {alert_time}）")
+            if len(offline) > 0:
+                st.warning(f"⚠️ 离线传感器 {len(offline)} 个: {'、'.join(offline)}")
         else:
             st.success("✅ 所有传感器运行正常")
     
     # 数据趋势分析
     st.markdown("#### 📈 历史趋势分析")
     
-    # 生成24小时趋势数据
-    hours = pd.date_range(start=datetime.now() - timedelta(hours=23), end=datetime.now(), freq='H')
-    trend_data = pd.DataFrame({
-        'time': hours,
-        'avg_temp': np.random.normal(20, 2, len(hours)) + 3 * np.sin(np.arange(len(hours)) * 2 * np.pi / 24),
-        'avg_humidity': np.random.normal(65, 3, len(hours)) - 2 * np.sin(np.arange(len(hours)) * 2 * np.pi / 24),
-        'avg_ph': np.random.normal(6.8, 0.1, len(hours)),
-        'avg_salinity': np.random.normal(0.35, 0.05, len(hours))
-    })
+    trend_range = st.selectbox("时间范围", list(HISTORY_CONFIG["trend_ranges"]), key="micro_trend_range")
+    
+    trend_data = get_sensor_trend(plot_data, trend_range)
     
     # 多参数趋势图
     fig_trend = go.Figure()
@@ -393,7 +553,7 @@ def show_micro_sensors(plot_data):
     ))
     
     fig_trend.update_layout(
-        title='24小时环境参数趋势',
+        title=f'{trend_range}环境参数趋势',
         xaxis=dict(title='时间'),
         yaxis=dict(title='温度(°C)', side='left'),
         yaxis2=dict(title='湿度(%)', side='right', overlaying='y'),
@@ -424,37 +584,12 @@ def show_multi_crop_management(plot_data):
     # 微区作物分配图
     st.markdown("#### 🗺️ 微区作物智能分配")
     
-    # 生成微区作物分配数据
-    np.random.seed(42)
-    crop_allocation = []
-    crop_types = ['玉米', '大豆', '向日葵', '小麦']
+    # 在多样性与面积约束下求解的微区作物分配(共享数据层中按地块缓存)
     crop_colors = {'玉米': '#FFD700', '大豆': '#90EE90', '向日葵': '#FFA500', '小麦': '#F4A460'}
-    
-    for i in range(plot_data['zones']):
-        # 基于土壤条件智能分配作物
-        soil_score = np.random.uniform(0.6, 1.0)
-        if soil_score > 0.9:
-            crop = '玉米'  # 最适合高产作物
-        elif soil_score > 0.8:
-            crop = '大豆'
-        elif soil_score > 0.7:
-            crop = '向日葵'
-        else:
-            crop = '小麦'
-        
-        crop_allocation.append({
-            'zone_id': f"Z{i+1:02d}",
-            'crop': crop,
-            'variety': f"{crop}_优选品种{np.random.randint(1,4)}",
-            'lat': 39.9042 + (i % 4) * 0.0008,
-            'lon': 116.4074 + (i // 4) * 0.0008,
-            'soil_score': round(soil_score, 2),
-            'expected_yield': round(np.random.uniform(400, 800), 0),
-            'planting_date': f"3月{15 + i % 15}日",
-            'growth_stage': np.random.choice(['播种期', '出苗期', '拔节期', '开花期'])
-        })
-    
-    allocation_df = pd.DataFrame(crop_allocation)
+    zone_plan = get_zone_plan(plot_data)
+    crop_types = list(zone_plan['crop_types'])
+    allocation = zone_plan['allocation']
+    allocation_df = zone_plan['frame']
     
     col_a, col_b = st.columns([3, 2])
     
@@ -526,8 +661,8 @@ def show_multi_crop_management(plot_data):
     # 增强的微区管理表格
     management_df = allocation_df.copy()
     management_df['管理建议'] = management_df.apply(lambda row: get_management_advice(row), axis=1)
-    management_df['投入成本'] = np.random.uniform(600, 1000, len(management_df)).round(0)
-    management_df['预期收益'] = (management_df['expected_yield'] * np.random.uniform(2.5, 4.0)).round(0)
+    management_df['投入成本'] = allocation['cost'].round(0)
+    management_df['预期收益'] = allocation['revenue'].round(0)
     
     display_columns = ['zone_id', 'crop', 'variety', 'growth_stage', 'soil_score', 
                       'expected_yield', '投入成本', '预期收益', '管理建议']
@@ -538,17 +673,27 @@ def show_multi_crop_management(plot_data):
     
     st.dataframe(display_df, use_container_width=True, height=200)
     
+    # 轮作保种规划: 首年沿用当前分配, 后续年份由动态规划求解
+    st.markdown("#### 🔄 轮作保种规划")
+    
+    rotation = zone_plan['rotation']
+    rotation_df = pd.DataFrame(rotation['sequence'], columns=['第1年', '第2年', '第3年'])
+    rotation_df.insert(0, '微区', allocation_df['zone_id'])
+    rotation_df['三年累计收益'] = rotation['total_profit'].round(0)
+    
+    st.dataframe(rotation_df, use_container_width=True, height=200)
+    
     # 智能优化建议
     st.markdown("#### 🤖 AI优化建议")
     
     col_1, col_2 = st.columns(2)
     
     with col_1:
-        st.success("""
+        st.success(f"""
         **🎯 优化策略**
         - Z02、Z06微区土壤条件优秀，建议种植高产玉米
         - Z03、Z07微区适合豆科作物，可提升土壤肥力
-        - 建议轮作方案：玉米-大豆-向日葵循环
+        - 建议轮作方案：{summarize_rotation(rotation)}循环
         """)
         
         st.info("""
@@ -574,6 +719,247 @@ def show_multi_crop_management(plot_data):
         """)
 
 
+def plot_sensor_codes(plot_data):
+    """地块内传感器的编码"""
+    return [sensor_code(sensor_id) for sensor_id in plot_sensor_ids(plot_data['id'], plot_data['zones'])]
+
+
+def plot_layout(plot_data):
+    """地块内微区与传感器的坐标布局, 以及微区几何的空间索引(共享数据层中按地块缓存)"""
+    def build():
+        layout = zone_layout(plot_data['zones'], len(ZONE_SENSOR_TYPES))
+        zones = ZoneIndex(layout['south'], layout['west'], layout['north'], layout['east'])
+        return layout, zones
+    
+    return get_data_manager().get(("plot", plot_data['id'], "layout", plot_data['zones']), build)
+
+
+def format_duration(seconds):
+    """时长的简短表示, 如 35分钟、2小时、3天"""
+    if seconds < 3600:
+        return f"{max(int(seconds // 60), 1)}分钟"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}小时"
+    return f"{int(seconds // 86400)}天"
+
+
+def plot_flights(plot_data):
+    """地块的全部航拍影像(按拍摄先后), 尚无影像时生成首次模拟航拍"""
+    layout, _ = plot_layout(plot_data)
+    bounds = (layout['south'].min(), layout['west'].min(), layout['north'].max(), layout['east'].max())
+    return load_flights(plot_data['id'], bounds, seed=int(plot_data['id'][1:]))
+
+
+def get_vegetation_index(plot_data, index="ndvi"):
+    """地块最近一次航拍的植被指数金字塔与统计(共享数据层中按地块缓存)
+
+    航拍影像以分块内存映射方式存储, 指数逐块流式计算并构建瓦片金字塔(有上一次航拍时
+    只重算变化的瓦片), 缓存中只保留金字塔句柄、直方图与各微区的分区统计, 不保留整幅影像。
+    """
+    def build():
+        layout, _ = plot_layout(plot_data)
+        flights = plot_flights(plot_data)
+        flight = flights[-1]
+        result = compute_index(flight, index, previous=flights[-2] if len(flights) > 1 else None)
+        labels = rasterize_zones(flight, layout['south'], layout['west'], layout['north'], layout['east'])
+        return {
+            'zones': tiled_zonal_stats(labels, result['raster'], index, plot_data['zones'], value_range=(-1, 1)),
+            'pyramid': TilePyramid.build(result['raster'], index, value_range=(-1, 1), changed=result['changed']),
+            'histogram': result['histogram'], 'edges': result['edges'], 'mean': result['mean'],
+            'valid': result['valid'], 'height': flight.height, 'width': flight.width,
+            'pixel_size': flight.pixel_size
+        }
+    
+    return get_data_manager().get(("plot", plot_data['id'], "vegetation", index), build)
+
+
+def get_flight_changes(plot_data, index="ndvi"):
+    """最近两次航拍的植被指数变化(共享数据层中按地块缓存), 只有一次航拍时为 None"""
+    def build():
+        flights = plot_flights(plot_data)
+        if len(flights) < 2:
+            return None
+        layout, _ = plot_layout(plot_data)
+        previous = compute_index(flights[-2], index, previous=flights[-3] if len(flights) > 2 else None)
+        current = compute_index(flights[-1], index, previous=flights[-2])
+        labels = rasterize_zones(flights[-1], layout['south'], layout['west'], layout['north'], layout['east'])
+        changes = detect_changes(previous['raster'], current['raster'], index, labels, plot_data['zones'])
+        return {
+            **changes,
+            'interval': flight_time(flights[-1]) - flight_time(flights[-2]),
+            'shape': (flights[-1].height, flights[-1].width),
+            'pixel_size': flights[-1].pixel_size
+        }
+    
+    return get_data_manager().get(("plot", plot_data['id'], "changes", index), build)
+
+
+def get_pest_survey(plot_data):
+    """最新一次航拍的病虫害识别结果(共享数据层中按地块缓存)"""
+    def build():
+        layout, _ = plot_layout(plot_data)
+        flight = plot_flights(plot_data)[-1]
+        labels = rasterize_zones(flight, layout['south'], layout['west'], layout['north'], layout['east'])
+        return survey_pests(flight, labels, plot_data['zones'])
+    
+    return get_data_manager().get(("plot", plot_data['id'], "pests"), build)
+
+
+def pest_findings(pests):
+    """判为某类病虫害的图块占比达到 report_share 的微区, 按占比由高到低排列"""
+    findings = []
+    # 类别 0 为健康, 其余为各类病虫害
+    shares = pests['share'][:, HEALTHY + 1:]
+    for zone, label in zip(*np.nonzero(shares >= PEST_CONFIG['report_share'])):
+        pest, share = PEST_CLASSES[label + 1], shares[zone, label]
+        severity = "严重" if share >= 0.3 else "中等" if share >= 0.1 else "轻微"
+        findings.append({
+            "区域": f"Z{zone+1:02d}", "类型": pest, "严重程度": severity, "占比": share,
+            "置信度": round(pests['confidence'][zone, label + 1] * 100),
+            "建议": "化学防治" if severity == "严重" else PEST_CONTROL[pest]["措施"]
+        })
+    return sorted(findings, key=lambda finding: -finding["占比"])
+
+
+def get_sensor_records(plot_data):
+    """地块传感器的基础记录(SENSOR_RECORD_DTYPE): 编码、类型、坐标与所属微区(由传感器坐标经空间索引定位)"""
+    def build():
+        layout, zones = plot_layout(plot_data)
+        records = empty_records(len(layout['sensor_lat']))
+        records['sensor'] = plot_sensor_codes(plot_data)
+        records['zone'] = zones.locate(layout['sensor_lat'], layout['sensor_lon'])
+        records['type'] = encode(np.tile(ZONE_SENSOR_TYPES, plot_data['zones']), SENSOR_TYPES)
+        records['lat'] = layout['sensor_lat']
+        records['lon'] = layout['sensor_lon']
+        return records
+    
+    return get_data_manager().get(("plot", plot_data['id'], "sensor_records"), build)
+
+
+def get_sensor_frame(plot_data, sensor_status):
+    """传感器网格表: 最新读数无锁读取, 尚未上报的指标以所在微区的环境特征补齐"""
+    records = get_sensor_records(plot_data).copy()
+    live = get_ingest_service().store.live.read(records['sensor'])
+    zone_conditions = get_zone_conditions(plot_data)[np.maximum(records['zone'], 0)]
+    set_metrics(records, np.where(np.isnan(live['values']), zone_conditions, live['values']))
+    records['timestamp'] = live['last_seen']
+    records['status'] = encode(sensor_status, STATUS_NAMES)
+    zone_labels = [f"Z{i+1:02d}" for i in range(plot_data['zones'])]
+    return records_to_frame(records, zone_labels).assign(sensor_id=plot_sensor_ids(plot_data['id'], plot_data['zones']))
+
+
+def get_sensor_trend(plot_data, trend_range):
+    """地块传感器的多参数趋势, 分辨率由查询规划按时间跨度选择预聚合层级"""
+    end = time.time() // 3600 * 3600 + 3600
+    start = end - HISTORY_CONFIG["trend_ranges"][trend_range] * 86400
+    
+    def build():
+        history = get_ingest_service().history
+        sensors = plot_sensor_codes(plot_data)
+        trend_columns = {}
+        for column, metric in (('avg_temp', 'temperature'), ('avg_humidity', 'humidity'),
+                               ('avg_ph', 'ph_value'), ('avg_salinity', 'salinity')):
+            result = history.query(sensors, metric, start, end)
+            trend_columns[column] = result["mean"]
+        return pd.DataFrame({'time': [datetime.fromtimestamp(t) for t in result["time"]], **trend_columns})
+    
+    return get_data_manager().get(("plot", plot_data['id'], "trend", trend_range, end), build,
+                                  ttl=DATA_LAYER_CONFIG["live_ttl"])
+
+
+def get_zone_plan(plot_data):
+    """地块微区作物分配与三年轮作规划"""
+    def build():
+        crop_types = ('玉米', '大豆', '向日葵', '小麦')
+        zone_conditions = get_zone_conditions(plot_data)
+        zone_areas = np.full(plot_data['zones'], plot_data['area'] / plot_data['zones'])
+        allocation = allocate_zones(
+            zone_conditions, zone_areas, crops=list(crop_types), crop_diversity=plot_data['crop_diversity']
+        )
+        rng = np.random.default_rng(42)
+        zone_index = np.arange(plot_data['zones'])
+        layout, _ = plot_layout(plot_data)
+        frame = pd.DataFrame({
+            'zone_id': [f"Z{i+1:02d}" for i in zone_index],
+            'crop': allocation['crop'],
+            'variety': allocation['variety'],
+            'lat': layout['zone_lat'],
+            'lon': layout['zone_lon'],
+            'soil_score': allocation['suitability'].round(2),
+            'expected_yield': allocation['yield'].round(0),
+            'planting_date': [f"3月{15 + i % 15}日" for i in zone_index],
+            'growth_stage': rng.choice(['播种期', '出苗期', '拔节期', '开花期'], plot_data['zones'])
+        })
+        rotation = plan_rotation(
+            zone_conditions, zone_areas, crops=list(crop_types), years=3, first_crops=allocation['crop']
+        )
+        return {'crop_types': crop_types, 'zone_conditions': zone_conditions, 'allocation': allocation,
+                'frame': frame, 'rotation': rotation}
+    
+    return get_data_manager().get(("plot", plot_data['id'], "zone_plan"), build,
+                                  ttl=DATA_LAYER_CONFIG["live_ttl"])
+
+
+def get_sensor_field(plot_data, metric, method="idw"):
+    """地块内某一指标的插值场栅格, 按 (地块, 指标, 时间桶) 缓存
+
+    尚无读数的传感器以所在微区的环境特征补齐。
+    """
+    layout, zones = plot_layout(plot_data)
+    bounds = (layout['south'].min(), layout['west'].min(), layout['north'].max(), layout['east'].max())
+    
+    def sensor_values():
+        values, _ = get_ingest_service().store.snapshot(plot_sensor_codes(plot_data))
+        column = FEATURE_NAMES.index(metric)
+        sensor_zone = zones.locate(layout['sensor_lat'], layout['sensor_lon'])
+        fallback = get_zone_conditions(plot_data)[np.maximum(sensor_zone, 0), column]
+        return np.where(np.isnan(values[:, column]), fallback, values[:, column])
+    
+    return cached_interpolate_field(
+        plot_data['id'], metric, layout['sensor_lat'], layout['sensor_lon'], sensor_values,
+        bounds, method=method
+    )
+
+
+def get_zone_soil_stats(plot_data):
+    """各微区土壤指标的分区统计: 传感器插值场栅格按微区汇总, 微区标签栅格按地块缓存"""
+    layout, _ = plot_layout(plot_data)
+    stats = {}
+    for metric in SOIL_METRICS:
+        field = get_sensor_field(plot_data, metric)
+        labels = get_data_manager().get(
+            ("plot", plot_data['id'], "field_labels", field['z'].shape),
+            lambda: rasterize_boxes(layout['south'], layout['west'], layout['north'], layout['east'],
+                                    field['lat'], field['lon'])
+        )
+        stats[metric] = zonal_stats(labels, field['z'], plot_data['zones'])
+    return stats
+
+
+def get_zone_conditions(plot_data):
+    """地块内各微区的环境特征, 列顺序与 FEATURE_NAMES 一致
+
+    由各微区传感器的最新读数融合得到; 尚无有效读数的微区或指标以模拟基准值补齐。
+    """
+    rng = np.random.default_rng(int(plot_data['id'][1:]))
+    baseline = np.array([ZONE_SENSOR_BASELINE[name] for name in FEATURE_NAMES])
+    spread = np.array([ZONE_SENSOR_SPREAD[name] for name in FEATURE_NAMES])
+    simulated = baseline + rng.standard_normal((plot_data['zones'], len(FEATURE_NAMES))) * spread
+    
+    values, timestamps = get_ingest_service().store.snapshot(plot_sensor_codes(plot_data))
+    layout, zones = plot_layout(plot_data)
+    sensor_zone = zones.locate(layout['sensor_lat'], layout['sensor_lon'])
+    located = sensor_zone >= 0
+    fused = SensorDataFusion().fuse(
+        sensor_zone[located],
+        values[located],
+        np.tile(ZONE_SENSOR_TYPES, plot_data['zones'])[located],
+        n_zones=plot_data['zones'],
+        timestamps=timestamps[located]
+    )
+    return np.where(np.isnan(fused['conditions']), simulated, fused['conditions'])
+
+
 def show_precision_management(plot_data):
     """精准管理模块"""
     st.markdown(f"### 🎯 {plot_data['name']} - 精准管理系统")
@@ -612,24 +998,25 @@ def show_variable_fertilization(plot_data):
     st.markdown("**🧪 变量施肥处方图**")
     
     # 生成施肥处方数据
-    np.random.seed(42)
     fertilizer_map = []
+    layout, _ = plot_layout(plot_data)
+    soil_stats = get_zone_soil_stats(plot_data)
     
     for i in range(plot_data['zones']):
-        # 基于土壤检测数据生成施肥处方
-        soil_n = np.random.uniform(0.8, 2.1)  # 氮含量
-        soil_p = np.random.uniform(15, 45)    # 磷含量
-        soil_k = np.random.uniform(80, 180)   # 钾含量
+        # 基于微区土壤养分的分区均值生成施肥处方
+        soil_n = soil_stats['nitrogen']['mean'][i]    # 氮含量(mg/kg)
+        soil_p = soil_stats['phosphorus']['mean'][i]  # 磷含量(mg/kg)
+        soil_k = soil_stats['potassium']['mean'][i]   # 钾含量(mg/kg)
         
         # 计算施肥量（简化算法）
-        n_need = max(0, 120 - soil_n * 60)
+        n_need = max(0, 120 - soil_n * 0.5)
         p_need = max(0, 80 - soil_p * 2)
         k_need = max(0, 100 - soil_k * 0.6)
         
         fertilizer_map.append({
             'zone': f"Z{i+1:02d}",
-            'lat': 39.9042 + (i % 4) * 0.0008,
-            'lon': 116.4074 + (i // 4) * 0.0008,
+            'lat': layout['zone_lat'][i],
+            'lon': layout['zone_lon'][i],
             'nitrogen_kg': round(n_need, 1),
             'phosphorus_kg': round(p_need, 1),
             'potassium_kg': round(k_need, 1),
@@ -736,22 +1123,24 @@ def show_smart_protection(plot_data):
     """智能植保"""
     st.markdown("**🛡️ 智能植保方案**")
     
-    # 植保监测数据
-    protection_data = [
-        {"微区": "Z02", "风险": "玉米螟", "预测概率": "15%", "建议措施": "生物防治", "成本": "50元/亩"},
-        {"微区": "Z05", "风险": "蚜虫", "预测概率": "25%", "建议措施": "天敌释放", "成本": "30元/亩"},
-        {"微区": "Z07", "风险": "叶斑病", "预测概率": "8%", "建议措施": "预防喷药", "成本": "25元/亩"}
-    ]
+    # 植保监测数据: 各微区图块识别的平均病虫害概率, 取风险最高的微区
+    risk = get_pest_survey(plot_data)['probability'][:, HEALTHY + 1:]
+    protection_data = []
+    for zone in np.argsort(-risk.max(axis=1))[:3]:
+        label = int(risk[zone].argmax())
+        pest = PEST_CLASSES[label + 1]
+        protection_data.append({"微区": f"Z{zone+1:02d}", "风险": pest, "预测概率": risk[zone, label],
+                                "建议措施": PEST_CONTROL[pest]["措施"], "成本": PEST_CONTROL[pest]["成本"]})
     
     for data in protection_data:
-        risk_level = "高" if float(data["预测概率"].rstrip('%')) > 20 else "中" if float(data["预测概率"].rstrip('%')) > 10 else "低"
+        risk_level = "高" if data["预测概率"] > 0.2 else "中" if data["预测概率"] > 0.1 else "低"
         color = "#dc3545" if risk_level == "高" else "#ffc107" if risk_level == "中" else "#28a745"
         
         st.markdown(f"""
         <div style="border: 1px solid {color}; border-radius: 8px; padding: 10px; margin: 5px 0;">
             <div style="font-weight: bold; color: {color};">🛡️ {data['微区']} - {data['风险']}</div>
             <div style="font-size: 0.85em; color: #666;">
-                预测概率: {data['预测概率']} | 风险等级: {risk_level}<br>
+                预测概率: {data['预测概率']:.0%} | 风险等级: {risk_level}<br>
                 建议措施: {data['建议措施']} | 预计成本: {data['成本']}
             </div>
         </div>
@@ -61,6 +61,12 @@ TARGET_USES = [
     "观赏作物"
 ]
 
+YIELD_PREFERENCES = [
+    "高产优先",
+    "稳产优先",
+    "成本优先"
+]
+
 # 传感器配置
 SENSOR_CONFIG = {
     "supported_types": [
@@ -78,7 +84,66 @@ SENSOR_CONFIG = {
         "nitrogen": {"min": 0, "max": 300, "unit": "mg/kg"},
         "phosphorus": {"min": 0, "max": 100, "unit": "mg/kg"},
         "potassium": {"min": 0, "max": 300, "unit": "mg/kg"}
-    }
+    },
+    # 数据融合时各类型传感器的置信度权重, 未列出的类型取默认值
+    "confidence_weights": {
+        "多合一传感器": 1.0,
+        "土壤传感器": 0.9,
+        "气象传感器": 0.8
+    },
+    "default_confidence_weight": 0.5
+}
+
+# 传感器数据接入服务配置
+INGEST_CONFIG = {
+    "host": "127.0.0.1",          # 本地网关接入地址
+    "port": 0,                    # 0 表示由系统分配空闲端口
+    "max_frame_readings": 65536,  # 单帧最多读数条数
+    # 内置网关模拟器为这些地块的每个微区传感器上报数据(地块编号: 微区数), 与地块管理页面一致
+    "simulated_plots": {"P001": 8, "P002": 6, "P003": 12},
+    "zone_sensor_types": ("多合一传感器", "土壤传感器"),  # 每个微区部署的传感器类型
+    "simulate_interval": 1.0,     # 模拟器上报间隔(秒)
+    "simulated_spike_rate": 1e-5, # 模拟器注入尖峰读数的比例
+    "stale_after": 300            # 最新读数超过多少秒未更新视为过期
+}
+
+# 传感器历史数据存储配置
+HISTORY_CONFIG = {
+    "root": "runtime/timeseries",  # 列式存储目录(运行时生成, 不纳入版本控制)
+    "backfill_days": 30,           # 模拟器首次启动时回填的历史天数
+    "backfill_step": 300,          # 回填数据的采样间隔(秒)
+    "chart_points": 24,            # 趋势图至少需要的数据点数, 查询规划据此选择预聚合层级
+    "persist_interval": 60,        # 实时读数落盘的最小间隔(秒), 每个序列每个间隔只保留第一条
+    "flush_interval": 1.0,         # 暂存读数批量落盘的周期(秒)
+    "flush_readings": 1 << 20,     # 暂存读数超过该条数时立即落盘
+    "max_pending": 1 << 23,        # 暂存读数的上限(约 140MB), 落盘停滞时丢弃最早的读数
+    "max_open_series": 512,        # 同时保持追加句柄打开的序列数上限(每个序列两个文件)
+    "trend_ranges": {"24小时": 1, "7天": 7, "30天": 30, "1年": 365}  # 趋势图可选时间范围(天)
+}
+
+# 进程级共享数据层配置
+DATA_LAYER_CONFIG = {
+    "memory_budget": 256 * 1024 * 1024,  # 共享数据总内存上限(字节), 超出时淘汰最久未使用的条目
+    "static_ttl": None,                  # 静态数据(地块清单、布局)的过期时间, None 表示不过期
+    "live_ttl": 60                       # 依赖实时读数的派生数据(分配、趋势)的过期时间(秒)
+}
+
+# 传感器流式异常检测配置
+ANOMALY_CONFIG = {
+    "alpha": 0.05,                 # 快速 EWMA 平滑系数(尖峰检测基线)
+    "scale_alpha": 0.01,           # 波动尺度(EW 平均绝对偏差)的平滑系数
+    "drift_alpha": 0.002,          # 慢速 EWMA 平滑系数(漂移检测基线)
+    "huber": 3.0,                  # 基线更新时偏差的截断倍数
+    "spike_z": 6.0,                # 尖峰告警的稳健 z 分数阈值
+    "drift_z": 6.0,                # 漂移告警的偏离倍数阈值(以快速均值的标准误为单位)
+    "warmup": 30,                  # 尖峰检测前的预热读数条数
+    "drift_warmup": 600,           # 漂移检测前的预热读数条数
+    "flatline_readings": 60,       # 连续不变多少条读数判定为卡死
+    "flatline_tolerance": 1e-6,    # 卡死判定的变化容差(占量程比例)
+    "scale_floor": 1e-4,           # 波动尺度下限(占量程比例), 避免零方差时误报
+    "alert_hold": 300,             # 告警后状态保持时间(秒)
+    "offline_after": 300,          # 超过多少秒无数据判定为离线
+    "alert_capacity": 1024         # 告警缓冲区容量(条)
 }
 
 # 作物数据库
@@ -113,7 +178,60 @@ CROPS_DATABASE = {
 ZONE_CONFIG = {
     "default_zone_size": 10,  # 每个微区的面积(亩)
     "max_zones_per_plot": 20, # 每个地块最大微区数
-    "min_zones_per_plot": 1   # 每个地块最小微区数
+    "min_zones_per_plot": 1,  # 每个地块最小微区数
+    "max_crop_share": 0.5,    # 单一作物占地块面积的最大比例
+    "layout_origin": (39.9042, 116.4074),  # 地块微区网格的起点(纬度, 经度)
+    "layout_spacing": 0.0008,  # 相邻微区中心的间距(度)
+    "layout_rows": 4           # 微区网格的行数(按列优先排列)
+}
+
+# 传感器数据空间插值参数
+INTERPOLATION_CONFIG = {
+    "resolution": 5.0,        # 场栅格分辨率(米)
+    "neighbors": 8,           # 每个栅格单元参与插值的近邻传感器数
+    "idw_power": 2.0,         # 反距离加权的幂次
+    "variogram_bins": 12,     # 经验变差函数的距离分箱数
+    "time_bucket": 300,       # 缓存时间桶(秒), 同一时间桶内复用插值结果
+    "cache_maxsize": 64,      # 缓存的栅格数上限
+    "cache_ttl": 900          # 缓存过期时间(秒)
+}
+
+# 无人机多光谱影像存储与处理参数
+RASTER_CONFIG = {
+    "root": "runtime/rasters",     # 分块影像存储目录(运行时生成, 不纳入版本控制)
+    "tile_size": 512,              # 瓦片边长(像元), 逐块计算的单位
+    "bands": ("blue", "green", "red", "red_edge", "nir"),  # 多光谱波段
+    "reflectance_scale": 10000,    # 反射率以 uint16 存储时的缩放系数, 0 表示无数据
+    "pixel_size": 0.2,             # 模拟航拍的地面分辨率(米/像元)
+    "workers": 4,                  # 逐块计算的线程数
+    "histogram_bins": 200          # 植被指数直方图的分箱数(-1 ~ 1)
+}
+
+# 航拍变化检测参数
+CHANGE_CONFIG = {
+    "threshold": 0.1,          # 植被指数变化量达到该值视为显著变化
+    "first_flight_age": 7200   # 首次模拟航拍距当前的时间(秒)
+}
+
+# 航拍病虫害识别参数
+PEST_CONFIG = {
+    "patch_size": 16,          # 识别图块边长(像元), 0.2 米分辨率下约 3.2 米见方
+    "hotspots": 4,             # 模拟航拍中的病虫害发生点数
+    "training_patches": 400,   # 每个类别的合成训练图块数
+    "epochs": 300,             # 分类器训练轮数(全批量梯度下降)
+    "learning_rate": 0.5,      # 梯度下降步长(特征已标准化)
+    "l2": 1e-3,                # 权重的 L2 正则化系数
+    "seed": 7,                 # 合成训练集的随机种子
+    "report_share": 0.02       # 微区内判为某类病虫害的图块占比达到该值才列入识别结果
+}
+
+# 栅格热力图的瓦片金字塔参数
+PYRAMID_CONFIG = {
+    "top_size": 64,            # 金字塔顶层的最大边长(像元), 逐级减半直到不超过该值
+    "byte_budget": 64 * 1024,  # 单张热力图的数据上限(字节, 每个单元 1 字节)
+    "chart_width": 700,        # 图表默认绘图区宽度(像素)
+    "chart_height": 300,       # 图表默认绘图区高度(像素)
+    "colormap": "RdYlGn"       # 默认色带
 }
 
 # 作物分类数据
@@ -162,4 +280,181 @@ PLOT_CONDITIONS = [
     "山地-缓坡",
     "河谷-冲积土",
     "沿海-盐渍土"
-] 
\ No newline at end of file
+] 
+
+# 作物农艺与经济参数(推荐引擎特征来源)
+# optimal_conditions 仅在 CROPS_DATABASE 中缺失该作物时使用
+# legume 标记豆科固氮作物, 轮作规划中为后茬提供氮素
+CROP_PROFILES = {
+    "玉米": {
+        "emoji": "🌽", "description": "高产优质玉米品种，适应性强",
+        "optimal_conditions": {"humidity": {"min": 50, "max": 80}},
+        "yield": 650, "price": 2.5, "cost": 900, "yield_cv": 0.15, "price_cv": 0.12,
+        "difficulty": 0.30, "market": 0.80, "nitrogen_demand": 60,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "大豆": {
+        "emoji": "🌿", "description": "优质高蛋白大豆，市场需求稳定",
+        "optimal_conditions": {"humidity": {"min": 50, "max": 80}},
+        "yield": 280, "price": 4.5, "cost": 600, "yield_cv": 0.20, "price_cv": 0.10,
+        "difficulty": 0.30, "market": 0.85, "nitrogen_demand": 25, "legume": True,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "向日葵": {
+        "emoji": "🌻", "description": "耐盐碱向日葵品种，油脂含量高",
+        "optimal_conditions": {"humidity": {"min": 40, "max": 75}},
+        "yield": 320, "price": 3.6, "cost": 650, "yield_cv": 0.20, "price_cv": 0.15,
+        "difficulty": 0.35, "market": 0.70, "nitrogen_demand": 40,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "小麦": {
+        "emoji": "🌾", "description": "优质强筋小麦，收购价格有保障",
+        "optimal_conditions": {
+            "temperature": {"min": 5, "max": 25}, "ph": {"min": 6.0, "max": 7.8},
+            "salinity": {"max": 0.4}, "humidity": {"min": 45, "max": 75}
+        },
+        "yield": 450, "price": 2.8, "cost": 700, "yield_cv": 0.12, "price_cv": 0.06,
+        "difficulty": 0.25, "market": 0.80, "nitrogen_demand": 55,
+        "seasons": [PLANTING_SEASONS[2], PLANTING_SEASONS[3]]
+    },
+    "水稻": {
+        "emoji": "🍚", "description": "优质粳稻，需充足水源保障",
+        "optimal_conditions": {
+            "temperature": {"min": 20, "max": 35}, "ph": {"min": 5.5, "max": 7.0},
+            "salinity": {"max": 0.3}, "humidity": {"min": 70, "max": 95}
+        },
+        "yield": 550, "price": 2.9, "cost": 1100, "yield_cv": 0.10, "price_cv": 0.06,
+        "difficulty": 0.50, "market": 0.85, "nitrogen_demand": 60,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "棉花": {
+        "emoji": "☁️", "description": "抗逆性强的棉花品种，耐盐碱",
+        "optimal_conditions": {
+            "temperature": {"min": 20, "max": 32}, "ph": {"min": 6.5, "max": 8.5},
+            "salinity": {"max": 0.8}, "humidity": {"min": 40, "max": 70}
+        },
+        "yield": 300, "price": 7.0, "cost": 1300, "yield_cv": 0.22, "price_cv": 0.18,
+        "difficulty": 0.65, "market": 0.60, "nitrogen_demand": 55,
+        "seasons": [PLANTING_SEASONS[0]]
+    },
+    "花生": {
+        "emoji": "🥜", "description": "高油酸花生，适合沙壤土",
+        "optimal_conditions": {
+            "temperature": {"min": 18, "max": 30}, "ph": {"min": 6.0, "max": 7.5},
+            "salinity": {"max": 0.3}, "humidity": {"min": 45, "max": 75}
+        },
+        "yield": 300, "price": 6.5, "cost": 1000, "yield_cv": 0.18, "price_cv": 0.12,
+        "difficulty": 0.45, "market": 0.75, "nitrogen_demand": 25, "legume": True,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "油菜": {
+        "emoji": "🌼", "description": "双低油菜品种，可兼顾观光",
+        "optimal_conditions": {
+            "temperature": {"min": 5, "max": 22}, "ph": {"min": 5.5, "max": 7.5},
+            "salinity": {"max": 0.4}, "humidity": {"min": 50, "max": 80}
+        },
+        "yield": 180, "price": 5.5, "cost": 550, "yield_cv": 0.20, "price_cv": 0.12,
+        "difficulty": 0.35, "market": 0.70, "nitrogen_demand": 50,
+        "seasons": [PLANTING_SEASONS[2], PLANTING_SEASONS[3]]
+    },
+    "芝麻": {
+        "emoji": "🌱", "description": "白芝麻品种，耐旱喜温",
+        "optimal_conditions": {
+            "temperature": {"min": 22, "max": 32}, "ph": {"min": 5.5, "max": 7.5},
+            "salinity": {"max": 0.3}, "humidity": {"min": 40, "max": 70}
+        },
+        "yield": 100, "price": 12.0, "cost": 500, "yield_cv": 0.30, "price_cv": 0.15,
+        "difficulty": 0.50, "market": 0.65, "nitrogen_demand": 35,
+        "seasons": [PLANTING_SEASONS[1]]
+    },
+    "番茄": {
+        "emoji": "🍅", "description": "设施番茄，产值高但管理精细",
+        "optimal_conditions": {
+            "temperature": {"min": 15, "max": 28}, "ph": {"min": 6.0, "max": 7.0},
+            "salinity": {"max": 0.3}, "humidity": {"min": 50, "max": 75}
+        },
+        "yield": 5000, "price": 2.2, "cost": 4500, "yield_cv": 0.25, "price_cv": 0.35,
+        "difficulty": 0.80, "market": 0.70, "nitrogen_demand": 80,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[2]]
+    },
+    "黄瓜": {
+        "emoji": "🥒", "description": "早熟黄瓜品种，上市周期短",
+        "optimal_conditions": {
+            "temperature": {"min": 18, "max": 30}, "ph": {"min": 5.5, "max": 7.2},
+            "salinity": {"max": 0.25}, "humidity": {"min": 60, "max": 90}
+        },
+        "yield": 4500, "price": 2.0, "cost": 4000, "yield_cv": 0.25, "price_cv": 0.35,
+        "difficulty": 0.75, "market": 0.70, "nitrogen_demand": 80,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1], PLANTING_SEASONS[2]]
+    },
+    "白菜": {
+        "emoji": "🥬", "description": "耐储运大白菜，秋季主栽",
+        "optimal_conditions": {
+            "temperature": {"min": 10, "max": 22}, "ph": {"min": 6.5, "max": 7.5},
+            "salinity": {"max": 0.4}, "humidity": {"min": 60, "max": 85}
+        },
+        "yield": 5000, "price": 0.8, "cost": 1500, "yield_cv": 0.20, "price_cv": 0.45,
+        "difficulty": 0.35, "market": 0.55, "nitrogen_demand": 70,
+        "seasons": [PLANTING_SEASONS[2]]
+    },
+    "萝卜": {
+        "emoji": "🥕", "description": "春白玉萝卜，生育期短易管理",
+        "optimal_conditions": {
+            "temperature": {"min": 8, "max": 22}, "ph": {"min": 6.5, "max": 8.0},
+            "salinity": {"max": 0.5}, "humidity": {"min": 55, "max": 85}
+        },
+        "yield": 4000, "price": 0.9, "cost": 1300, "yield_cv": 0.20, "price_cv": 0.40,
+        "difficulty": 0.30, "market": 0.50, "nitrogen_demand": 50,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[2]]
+    },
+    "茄子": {
+        "emoji": "🍆", "description": "杂交茄子，喜温耐热",
+        "optimal_conditions": {
+            "temperature": {"min": 20, "max": 32}, "ph": {"min": 6.0, "max": 7.0},
+            "salinity": {"max": 0.3}, "humidity": {"min": 55, "max": 80}
+        },
+        "yield": 4000, "price": 2.0, "cost": 3800, "yield_cv": 0.25, "price_cv": 0.30,
+        "difficulty": 0.70, "market": 0.65, "nitrogen_demand": 75,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "青贮玉米": {
+        "emoji": "🌽", "description": "全株青贮玉米，配套养殖需求",
+        "optimal_conditions": {
+            "temperature": {"min": 15, "max": 30}, "ph": {"min": 6.0, "max": 7.8},
+            "salinity": {"max": 0.6}, "humidity": {"min": 50, "max": 80}
+        },
+        "yield": 3500, "price": 0.4, "cost": 900, "yield_cv": 0.15, "price_cv": 0.10,
+        "difficulty": 0.25, "market": 0.75, "nitrogen_demand": 60,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[1]]
+    },
+    "苜蓿草": {
+        "emoji": "☘️", "description": "多年生豆科牧草，耐盐碱改土",
+        "optimal_conditions": {
+            "temperature": {"min": 5, "max": 30}, "ph": {"min": 6.5, "max": 8.5},
+            "salinity": {"max": 1.0}, "humidity": {"min": 35, "max": 75}
+        },
+        "yield": 800, "price": 2.0, "cost": 700, "yield_cv": 0.15, "price_cv": 0.12,
+        "difficulty": 0.40, "market": 0.75, "nitrogen_demand": 15, "legume": True,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[2]]
+    },
+    "燕麦草": {
+        "emoji": "🌾", "description": "优质燕麦干草，适口性好",
+        "optimal_conditions": {
+            "temperature": {"min": 5, "max": 25}, "ph": {"min": 5.5, "max": 8.0},
+            "salinity": {"max": 0.8}, "humidity": {"min": 40, "max": 75}
+        },
+        "yield": 600, "price": 2.2, "cost": 600, "yield_cv": 0.15, "price_cv": 0.12,
+        "difficulty": 0.30, "market": 0.65, "nitrogen_demand": 40,
+        "seasons": [PLANTING_SEASONS[0], PLANTING_SEASONS[2]]
+    },
+    "高粱草": {
+        "emoji": "🌿", "description": "高产饲草，耐旱耐盐碱",
+        "optimal_conditions": {
+            "temperature": {"min": 18, "max": 35}, "ph": {"min": 5.5, "max": 8.5},
+            "salinity": {"max": 1.0}, "humidity": {"min": 30, "max": 75}
+        },
+        "yield": 5000, "price": 0.3, "cost": 700, "yield_cv": 0.18, "price_cv": 0.10,
+        "difficulty": 0.25, "market": 0.60, "nitrogen_demand": 45,
+        "seasons": [PLANTING_SEASONS[1]]
+    }
+}